@@ -3,10 +3,12 @@
 """
 import random
 import logging
-from typing import List, Tuple, Dict, Any, Optional
+from typing import Tuple, Dict, Any, Optional
 from datetime import datetime, timedelta
 import math
 
+from bot.reel_codec import SYMBOLS, SYMBOL_IDS, Reels, encode, to_code, to_emoji, match
+
 logger = logging.getLogger(__name__)
 
 class SlotGame:
@@ -58,10 +60,17 @@ class SlotGame:
         self.progressive_jackpot = 1000
         self.jackpot_contribution = 0.01  # 1% of each bet
         
-    def calculate_dynamic_win_probability(self, user_stats: Dict[str, Any]) -> float:
-        """Calculate dynamic win probability based on user performance"""
+    def calculate_dynamic_win_probability(self, user_stats: Dict[str, Any],
+                                          base_probability: Optional[float] = None) -> float:
+        """
+        Calculate dynamic win probability based on user performance.
+        base_probability - admin's win_probability setting (default: base_win_probability).
+        """
         try:
-            base_prob = self.base_win_probability
+            base_prob = self.base_win_probability if base_probability is None else base_probability
+            # The admin's setting itself must stay reachable even outside the default bounds
+            min_prob = min(self.min_win_probability, base_prob)
+            max_prob = max(self.max_win_probability, base_prob)
             
             # Adjust based on total spins
             total_spins = user_stats.get('total_spins', 0)
@@ -94,17 +103,18 @@ class SlotGame:
                 base_prob -= 0.05
             
             # Ensure within bounds
-            return max(self.min_win_probability, min(self.max_win_probability, base_prob))
+            return max(min_prob, min(max_prob, base_prob))
             
         except Exception as e:
             logger.error(f"Error calculating dynamic win probability: {e}")
-            return self.base_win_probability
+            return self.base_win_probability if base_probability is None else base_probability
     
-    def spin_reels(self, user_stats: Optional[Dict[str, Any]] = None) -> List[str]:
-        """Spin the reels with enhanced algorithm"""
+    def spin_reels(self, user_stats: Optional[Dict[str, Any]] = None,
+                   win_probability: Optional[float] = None) -> int:
+        """Spin the reels with enhanced algorithm (returns reel code, see bot.reel_codec)"""
         try:
             # Calculate win probability
-            win_prob = self.calculate_dynamic_win_probability(user_stats or {})
+            win_prob = self.calculate_dynamic_win_probability(user_stats or {}, win_probability)
             
             # Determine if this should be a winning spin
             should_win = random.random() < win_prob
@@ -118,7 +128,7 @@ class SlotGame:
             logger.error(f"Error spinning reels: {e}")
             return self._generate_random_spin()
     
-    def _generate_winning_spin(self) -> List[str]:
+    def _generate_winning_spin(self) -> int:
         """Generate a winning spin with balanced distribution"""
         try:
             # Choose winning combination type
@@ -127,59 +137,49 @@ class SlotGame:
                 weights=[5, 10, 20, 30, 35]  # Rarer combinations have lower weights
             )[0]
             
-            # Extract symbols from combination
-            symbols = list(combo_type)
-            
-            # Ensure we have exactly 3 symbols
-            while len(symbols) < 3:
-                # Add random symbols that don't break the win
-                available_symbols = [s for s in self.symbols.keys() if s not in symbols]
-                if available_symbols:
-                    symbols.append(random.choice(available_symbols))
-            
-            # Shuffle the symbols for randomness
-            random.shuffle(symbols)
-            
-            return symbols[:3]
+            # Winning combinations are three of the same symbol
+            symbol_id = SYMBOL_IDS[to_emoji(combo_type)[0]]
+            return encode((symbol_id, symbol_id, symbol_id))
             
         except Exception as e:
             logger.error(f"Error generating winning spin: {e}")
             return self._generate_random_spin()
     
-    def _generate_losing_spin(self) -> List[str]:
+    def _generate_losing_spin(self) -> int:
         """Generate a losing spin that's close to winning"""
         try:
             # Create a spin that's almost winning
-            symbols = list(self.symbols.keys())
+            symbol_ids = range(len(SYMBOLS))
             
             # Choose 2 different symbols for partial win
             if random.random() < 0.3:  # 30% chance of partial win
-                symbol1 = random.choice(symbols)
-                symbol2 = random.choice([s for s in symbols if s != symbol1])
-                symbol3 = random.choice([s for s in symbols if s not in [symbol1, symbol2]])
-                return [symbol1, symbol2, symbol3]
+                return encode(random.sample(symbol_ids, 3))
             else:
                 # Completely random losing spin
-                return random.choices(symbols, k=3)
+                return encode(random.choices(symbol_ids, k=3))
                 
         except Exception as e:
             logger.error(f"Error generating losing spin: {e}")
             return self._generate_random_spin()
     
-    def _generate_random_spin(self) -> List[str]:
+    def _generate_random_spin(self) -> int:
         """Generate completely random spin as fallback"""
-        symbols = list(self.symbols.keys())
-        return random.choices(symbols, k=3)
+        return encode(random.choices(range(len(SYMBOLS)), k=3))
     
-    def check_win(self, reels: List[str]) -> Tuple[bool, int, str, Dict[str, Any]]:
-        """Check if reels result in a win with enhanced logic"""
+    def check_win(self, reels: Reels) -> Tuple[bool, int, str, Dict[str, Any]]:
+        """Check if reels (code or emoji list) result in a win with enhanced logic"""
         try:
-            if len(reels) != 3:
+            try:
+                code = to_code(reels)
+            except (KeyError, ValueError):
+                return False, 0, "invalid", {}
+            max_count, symbol_id = match(code)
+            if max_count == 0:
                 return False, 0, "invalid", {}
             
             # Check for exact matches first
-            if reels[0] == reels[1] == reels[2]:
-                symbol = reels[0]
+            if max_count == 3:
+                symbol = SYMBOLS[symbol_id]
                 combo = f"{symbol}{symbol}{symbol}"
                 
                 if combo in self.winning_combinations:
@@ -200,12 +200,6 @@ class SlotGame:
                     }
             
             # Check for partial wins
-            symbol_counts = {}
-            for symbol in reels:
-                symbol_counts[symbol] = symbol_counts.get(symbol, 0) + 1
-            
-            # Find most common symbol
-            max_count = max(symbol_counts.values())
             if max_count >= 2:
                 partial_info = self.partial_combinations.get(max_count)
                 if partial_info:
@@ -258,11 +252,12 @@ class SlotGame:
             logger.error(f"Error checking lucky spin: {e}")
             return False
     
-    def play_round(self, user_stats: Dict[str, Any]) -> Tuple[List[str], bool, int, Dict[str, Any]]:
-        """Play a complete round with all features"""
+    def play_round(self, user_stats: Dict[str, Any],
+                   win_probability: Optional[float] = None) -> Tuple[int, bool, int, Dict[str, Any]]:
+        """Play a complete round with all features (win_probability - admin setting)"""
         try:
             # Spin the reels
-            reels = self.spin_reels(user_stats)
+            reels = self.spin_reels(user_stats, win_probability)
             
             # Check for win
             is_winner, stars_won, combo, win_info = self.check_win(reels)
@@ -299,14 +294,15 @@ class SlotGame:
             
         except Exception as e:
             logger.error(f"Error playing round: {e}")
-            return ["🍀", "🍀", "🍀"], False, 0, {"error": str(e)}
+            return encode((0, 0, 0)), False, 0, {"error": str(e)}
     
-    def format_reels_message(self, reels: List[str], is_winner: bool, 
+    def format_reels_message(self, reels: Reels, is_winner: bool, 
                            stars_won: int, extra_info: Dict[str, Any]) -> str:
         """Format reels result message with enhanced information"""
         try:
+            # Emoji faqat shu yerda - xabar chiqarishda olinadi
             message = f"🎰 **SLOT MASHINALARI** 🎰\n\n"
-            message += f"{' '.join(reels)}\n\n"
+            message += f"{' '.join(to_emoji(reels))}\n\n"
             
             if is_winner:
                 win_type = extra_info.get("win_type", "win")
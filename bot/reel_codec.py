@@ -0,0 +1,86 @@
+"""
+🎰 Slot Game Bot — Barabanlar natijasini bitta butun songa kodlash
+
+Har bir belgi 3 bitli ID, uchta baraban bitta 9 bitli son: r0 | r1 << 3 | r2 << 6.
+O'yin mantig'i va baza shu son bilan ishlaydi, emoji faqat xabar chiqarishda olinadi.
+"""
+from typing import List, Sequence, Tuple, Union
+
+# Belgi ID si = indeks. Bazada saqlangan kodlar buzilmasligi uchun tartibni
+# o'zgartirmang, yangi belgilarni faqat oxiriga qo'shing (8 tagacha).
+SYMBOLS: Tuple[str, ...] = ("🍀", "⭐", "🍒", "🔔", "💎")
+SYMBOL_IDS = {symbol: symbol_id for symbol_id, symbol in enumerate(SYMBOLS)}
+
+REEL_COUNT = 3
+REEL_BITS = 3
+REEL_MASK = (1 << REEL_BITS) - 1
+CODE_COUNT = 1 << (REEL_BITS * REEL_COUNT)
+
+Reels = Union[int, str, Sequence[str]]
+
+
+def encode(symbol_ids: Sequence[int]) -> int:
+    """Belgi ID lari (r0, r1, r2) -> kod"""
+    code = 0
+    for position, symbol_id in enumerate(symbol_ids):
+        code |= symbol_id << (position * REEL_BITS)
+    return code
+
+
+def decode(code: int) -> Tuple[int, ...]:
+    """Kod -> belgi ID lari (r0, r1, r2)"""
+    return tuple((code >> (position * REEL_BITS)) & REEL_MASK for position in range(REEL_COUNT))
+
+
+def _is_valid(code: int) -> bool:
+    return all(symbol_id < len(SYMBOLS) for symbol_id in decode(code))
+
+
+# Barcha mumkin bo'lgan kodlar uchun oldindan hisoblangan jadvallar
+_EMOJI: List[Tuple[str, ...]] = [
+    tuple(SYMBOLS[symbol_id] for symbol_id in decode(code)) if _is_valid(code) else ()
+    for code in range(CODE_COUNT)
+]
+
+
+def _best_match(code: int) -> Tuple[int, int]:
+    symbol_ids = decode(code)
+    best = max(symbol_ids, key=symbol_ids.count)
+    return symbol_ids.count(best), best
+
+
+# kod -> (eng ko'p takrorlangan belgi soni, shu belgining ID si)
+_MATCHES: List[Tuple[int, int]] = [
+    _best_match(code) if _is_valid(code) else (0, 0) for code in range(CODE_COUNT)
+]
+
+
+def to_code(reels: Reels) -> int:
+    """Kod, emoji ro'yxati yoki emoji qatori ("💎💎🔔") -> kod"""
+    if isinstance(reels, int):
+        return reels
+    if isinstance(reels, str):
+        symbol_ids = []
+        rest = reels
+        while rest:
+            symbol = next((s for s in SYMBOLS if rest.startswith(s)), None)
+            if symbol is None:
+                raise ValueError(f"Noma'lum belgi: {rest!r}")
+            symbol_ids.append(SYMBOL_IDS[symbol])
+            rest = rest[len(symbol):]
+        return encode(symbol_ids)
+    return encode([SYMBOL_IDS[symbol] for symbol in reels])
+
+
+def to_emoji(reels: Reels) -> List[str]:
+    """Xabar chiqarish uchun: kod (yoki emoji ro'yxati) -> emoji ro'yxati"""
+    if isinstance(reels, int):
+        return list(_EMOJI[reels])
+    if isinstance(reels, str):
+        return to_emoji(to_code(reels))
+    return list(reels)
+
+
+def match(code: int) -> Tuple[int, int]:
+    """Kod -> (eng ko'p bir xil belgilar soni, belgi ID si) - jadvaldan O(1)"""
+    return _MATCHES[code]
@@ -13,8 +13,9 @@ from aiogram.types import TelegramObject, Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from collections import defaultdict, deque
 import asyncio
-from db.database import Database
-from config.settings import ADMIN_IDS, CHANNEL_URL, CHANNEL_SUBSCRIPTION_REQUIRED
+from db.database import get_database
+from db.storage import Storage
+from config.settings import ADMIN_IDS, CHANNEL_URL, CHANNEL_SUBSCRIPTION_REQUIRED, SUBSCRIPTION_WRITE_BATCH
 from keyboards.inline import get_channel_subscription_keyboard
 
 logger = logging.getLogger(__name__)
@@ -283,7 +284,7 @@ class ChannelSubscriptionMiddleware(BaseMiddleware):
     Barcha o'yin va funksional xususiyatlar uchun kanal obunasi talab qilinadi
     """
     
-    def __init__(self, database: Database):
+    def __init__(self, database: Storage):
         super().__init__()
         self.db = database
         
@@ -367,7 +368,7 @@ class AdminOnlyMiddleware(BaseMiddleware):
     Faqat admin foydalanuvchilar uchun ruxsat beruvchi middleware
     """
     
-    def __init__(self, database: Database):
+    def __init__(self, database: Storage):
         super().__init__()
         self.db = database
     
@@ -408,25 +409,29 @@ channel_subscription_middleware = None
 admin_only_middleware = None
 
 
-async def verify_all_channel_subscriptions(bot, database: Database):
+async def verify_all_channel_subscriptions(bot, database: Storage):
     """
     Barcha foydalanuvchilarning kanal obunasini tekshirish va yangilash
     Bu funksiya muntazam ravishda chaqirilishi kerak
     """
     try:
-        # Barcha foydalanuvchilarni olish
-        users = await database.get_all_users()
+        # O'zgarishlar yig'ilib, guruhlab yoziladi
+        changes = []
         
-        for user in users:
+        # Foydalanuvchilarni sahifalab o'qish (hammasini xotiraga yuklamasdan)
+        async for user in database.iter_users():
             user_id = user['telegram_id']
-            current_status = user.get('channel_subscribed', False)
+            current_status = bool(user['channel_subscribed'])
             
             # Kanal obunasini tekshirish
             is_subscribed = await check_channel_subscription(bot, user_id)
             
             # Status o'zgargan bo'lsa yangilash
             if is_subscribed != current_status:
-                await database.set_channel_subscription(user_id, is_subscribed)
+                changes.append((user_id, is_subscribed))
+                if len(changes) >= SUBSCRIPTION_WRITE_BATCH:
+                    await database.set_channel_subscriptions(changes, SUBSCRIPTION_WRITE_BATCH)
+                    changes = []
                 logger.info(f"Foydalanuvchi {user_id} kanal obunasi yangilandi: {current_status} -> {is_subscribed}")
                 
                 # Agar obuna bekor qilingan bo'lsa, foydalanuvchiga xabar yuborish
@@ -443,6 +448,9 @@ async def verify_all_channel_subscriptions(bot, database: Database):
                     except Exception as e:
                         logger.error(f"Foydalanuvchi {user_id} ga xabar yuborishda xato: {e}")
         
+        if changes:
+            await database.set_channel_subscriptions(changes, SUBSCRIPTION_WRITE_BATCH)
+        
         logger.info("Barcha foydalanuvchilarning kanal obunasi tekshirildi")
         
     except Exception as e:
@@ -467,7 +475,7 @@ async def check_channel_subscription(bot, user_id: int) -> bool:
         return False
 
 
-def setup_middleware(database: Database):
+def setup_middleware(database: Storage):
     """Middleware larni sozlash"""
     global channel_subscription_middleware, admin_only_middleware
     
@@ -544,8 +552,7 @@ def validate_user_verified(func):
                 break
         
         if user_id:
-            db = Database()
-            user = await db.get_user(user_id)
+            user = await get_database().get_user(user_id)
             
             if not user or not user.get('is_verified'):
                 for arg in args:
@@ -0,0 +1,65 @@
+"""
+🎰 Slot Game Bot — Foydalanuvchi bo'yicha bitta vaqtda bitta ish (single-flight)
+
+Har bir kalit (odatda telegram_id) uchun asyncio.Lock. Kalit band bo'lsa yangi
+so'rov navbatga qo'yilmaydi - darhol rad etiladi. Qulf faqat ish davomida
+lug'atda turadi: bo'shatilganda yozuv o'chiriladi, shuning uchun xarita faol
+foydalanuvchilar soni bilan chegaralangan.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Any, Hashable
+
+
+class KeyedSingleFlight:
+    """Kalit bo'yicha qulflar xaritasi: band kalitga kelgan chaqiruv tashlanadi"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._acquired = 0
+        self._dropped = 0
+        self._max_in_flight = 0
+
+    def is_busy(self, key: Hashable) -> bool:
+        lock = self._locks.get(key)
+        return lock is not None and lock.locked()
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[bool]:
+        """
+        Kalitni egallashga urinish. True - ish bajarilsin, False - shu kalit
+        bo'yicha ish allaqachon ketmoqda (chaqiruvchi darhol javob berib chiqadi).
+        """
+        if self.is_busy(key):
+            self._dropped += 1
+            yield False
+            return
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        # Qulf bo'sh va tekshiruvdan keyin await yo'q - bu yerda kutish bo'lmaydi
+        await lock.acquire()
+        self._acquired += 1
+        self._max_in_flight = max(self._max_in_flight, len(self._locks))
+        try:
+            yield True
+        finally:
+            lock.release()
+            # Navbat yo'q, shuning uchun bo'shagan qulfni darhol olib tashlash mumkin
+            if self._locks.get(key) is lock and not lock.locked():
+                del self._locks[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self._acquired + self._dropped
+        return {
+            'in_flight': len(self._locks),
+            'max_in_flight': self._max_in_flight,
+            'acquired': self._acquired,
+            'dropped': self._dropped,
+            # Bosishlarning necha foizi band paytga to'g'ri kelib tashlandi
+            'drop_rate': round(self._dropped / total * 100, 2) if total else 0.0
+        }
+
+
+# O'yin aylantirishlari uchun umumiy qo'riqchi (handlers/game_uz.py)
+spin_guard = KeyedSingleFlight("play_slot")
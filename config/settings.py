@@ -48,9 +48,72 @@ FAQ = {
 # Majburiy kanal obunasi
 REQUIRED_CHANNEL = "@premim_002"
 CHANNEL_URL = "https://t.me/premim_002"
+SUBSCRIPTION_WRITE_BATCH = 500  # Obuna tekshiruvi o'zgarishlari shuncha-shuncha yoziladi
 
 # Ma'lumotlar bazasi konfiguratsiyasi
 DATABASE_PATH = "data/slot_game.db"
+# Ombor dvigateli: sqlite (diskda) yoki memory (xotirada - testlar va yuklama o'lchovlari uchun)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite").lower()
+# sqlite: foydalanuvchilar telegram_id % DB_SHARD_COUNT bo'yicha alohida fayllarga bo'linadi
+# (1 - bitta fayl; o'zgartirishdan oldin: python -m db.tools reshard --from N --to M)
+DB_SHARD_COUNT = max(1, int(os.getenv("DB_SHARD_COUNT", "1")))
+
+# Ulanishlar puli: kutish chegarasi, uzoq ushlangan ulanishlar va avtomatik o'lcham
+DB_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("DB_ACQUIRE_TIMEOUT_SECONDS", "10"))  # 0 - cheksiz kutish
+DB_CONNECTION_LEAK_SECONDS = float(os.getenv("DB_CONNECTION_LEAK_SECONDS", "30"))
+DB_POOL_MONITOR_INTERVAL_SECONDS = float(os.getenv("DB_POOL_MONITOR_INTERVAL_SECONDS", "10"))
+DB_POOL_AUTOSIZE = os.getenv("DB_POOL_AUTOSIZE", "false").lower() == "true"
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "4"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "32"))
+DB_POOL_GROW_WAIT_MS = 50  # p95 kutish shundan oshsa pul kattalashadi
+DB_OPTIMIZE_INTERVAL_HOURS = float(os.getenv("DB_OPTIMIZE_INTERVAL_HOURS", "6"))  # PRAGMA optimize oralig'i
+
+# Texnik xizmat: WAL checkpoint, ANALYZE va incremental_vacuum (oraliq 0 - o'chirilgan)
+DB_MAINTENANCE_TICK_SECONDS = float(os.getenv("DB_MAINTENANCE_TICK_SECONDS", "30"))
+DB_WAL_CHECKPOINT_PASSIVE_MB = float(os.getenv("DB_WAL_CHECKPOINT_PASSIVE_MB", "16"))
+DB_WAL_CHECKPOINT_TRUNCATE_MB = float(os.getenv("DB_WAL_CHECKPOINT_TRUNCATE_MB", "64"))
+DB_ANALYZE_INTERVAL_HOURS = float(os.getenv("DB_ANALYZE_INTERVAL_HOURS", "168"))  # To'liq ANALYZE
+DB_VACUUM_INTERVAL_MINUTES = float(os.getenv("DB_VACUUM_INTERVAL_MINUTES", "60"))
+DB_VACUUM_PAGES_PER_STEP = int(os.getenv("DB_VACUUM_PAGES_PER_STEP", "256"))
+DB_VACUUM_MAX_STEPS = 100  # Bitta ishga tushishda qadamlar chegarasi
+DB_VACUUM_PAUSE_MS = 50  # Qadamlar orasidagi tanaffus
+DB_VACUUM_MIN_FREE_PAGES = 1024  # Freelist shundan kichik bo'lsa vacuum qilinmaydi
+
+# Onlayn backup (SQLite backup API): siqilgan nusxalar katalogi va aylantirish
+BACKUP_DIR = os.getenv("BACKUP_DIR", "data/backups")
+BACKUP_INTERVAL_HOURS = float(os.getenv("BACKUP_INTERVAL_HOURS", "24"))  # 0 - o'chirilgan
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))  # Saqlanadigan oxirgi nusxalar
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+BACKUP_STEP_SLEEP_MS = int(os.getenv("BACKUP_STEP_SLEEP_MS", "20"))  # Qadamlar orasidagi tanaffus
+
+# Optimistik yozuvlar (users.version): to'qnashuvdan keyin qayta urinishlar va tasodifiy kutish asosi
+DB_OPTIMISTIC_RETRIES = int(os.getenv("DB_OPTIMISTIC_RETRIES", "5"))
+DB_OPTIMISTIC_BACKOFF_MS = 5
+
+# Foydalanuvchi qatorlari keshi (LRU + TTL)
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+
+# config jadvalidagi o'zgarishlarni tekshirish oralig'i (config_version qatori)
+CONFIG_REFRESH_INTERVAL_SECONDS = float(os.getenv("CONFIG_REFRESH_INTERVAL_SECONDS", "5"))
+
+# O'yin tarixini buferlab yozish (write-behind, guruhli commit)
+GAME_HISTORY_WRITE_BEHIND = os.getenv("GAME_HISTORY_WRITE_BEHIND", "false").lower() == "true"
+WRITE_BEHIND_FLUSH_INTERVAL_MS = int(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL_MS", "200"))
+WRITE_BEHIND_MAX_BATCH = 500  # Shuncha qator yig'ilsa darhol yoziladi
+WRITE_BEHIND_MAX_PENDING = 10000  # Bufer chegarasi (oshsa yozuvchilar kutadi)
+
+# Eski yozuvlarni tozalash (jadval: saqlash muddati kunlarda, 0 - o'chirilmaydi)
+RETENTION_DAYS = {
+    'game_history': int(os.getenv("GAME_HISTORY_RETENTION_DAYS", "30")),
+    'transactions': int(os.getenv("TRANSACTIONS_RETENTION_DAYS", "30")),
+}
+RETENTION_CHUNK_SIZE = 2000  # Bitta tranzaksiyada o'chiriladigan qatorlar
+RETENTION_CHUNK_PAUSE_MS = 50  # Bo'laklar orasidagi tanaffus
+RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR", "")  # Bo'sh - arxivlanmaydi
+
+# Foydalanuvchi statistikasi o'qiydigan o'yin tarixi oylari (oylik bo'laklar)
+GAME_HISTORY_STATS_MONTHS = 3
 
 # O'yin konfiguratsiyasi
 DEFAULT_WIN_PROBABILITY = 0.7  # 70% g'alaba imkoniyati
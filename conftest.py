@@ -0,0 +1,59 @@
+"""
+Umumiy pytest sozlamalari: async testlarni ishga tushirish va vaqtinchalik ombor fabrikasi
+"""
+import asyncio
+import inspect
+import sys
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db.database import Database
+from db.memory import MemoryDatabase
+from db.sharding import ShardedDatabase
+
+ENGINES = ("sqlite", "sharded", "memory")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """async def testlar o'z event loopida bajariladi; False qaytargan skript-test muvaffaqiyatsiz"""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    arguments = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    if asyncio.run(pyfuncitem.obj(**arguments)) is False:
+        pytest.fail(f"{pyfuncitem.name} False qaytardi")
+    return True
+
+
+@pytest.fixture(params=ENGINES)
+def backend(request) -> str:
+    """Test barcha omborlarda bajariladi: sqlite, sharded (2 fayl) va memory"""
+    return request.param
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """
+    Vaqtinchalik katalogdagi ombor: async with storage(backend) as db.
+    Ishga tushirish va yopish test ichida - ombor test event loopiga bog'langan.
+    """
+    @asynccontextmanager
+    async def open_storage(backend: str = "sqlite", name: str = "test.db"):
+        if backend == "sqlite":
+            db = Database(str(tmp_path / name), max_connections=2)
+        elif backend == "sharded":
+            db = ShardedDatabase(str(tmp_path / name), max_connections=4, shard_count=2)
+        else:
+            db = MemoryDatabase()
+        await db.init_db()
+        try:
+            yield db
+        finally:
+            await db.close()
+
+    return open_storage
@@ -0,0 +1,90 @@
+"""
+🎰 Slot Game Bot — Rejali onlayn backup: siqilgan nusxalar va aylantirish
+"""
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+
+class BackupManager:
+    """
+    Database.backup() bilan nusxa olib, uni gzip bilan siqadi va directory
+    da faqat oxirgi keep ta nusxani qoldiradi.
+
+    Nusxalar nomi: <baza>-YYYYmmdd-HHMMSS.db.gz - nom bo'yicha saralash
+    vaqt bo'yicha saralash bilan bir xil.
+    """
+
+    def __init__(self, database, directory: str, keep: int = 7, pages_per_step: int = 256,
+                 step_sleep_ms: int = 20):
+        self.database = database
+        self.directory = directory
+        self.keep = max(1, keep)
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep_ms / 1000
+        self.prefix = os.path.splitext(os.path.basename(database.db_path))[0] + "-"
+        self.last_report: Dict[str, Any] = {}
+
+    def snapshots(self) -> List[str]:
+        """Mavjud siqilgan nusxalar, eskisidan yangisiga"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.startswith(self.prefix) and name.endswith(".db.gz")
+        )
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Bitta nusxa olish, siqish va eskilarini o'chirish.
+        Qaytariladi: Database.backup() hisoboti + {'compressed_path',
+        'compressed_bytes', 'compress_seconds', 'removed'}; xatoda {}.
+        """
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        raw_path = os.path.join(self.directory, f"{self.prefix}{stamp}.db")
+        report = await self.database.backup(raw_path, self.pages_per_step, self.step_sleep)
+        if not report:
+            return {}
+
+        try:
+            started = time.perf_counter()
+            compressed_path = f"{raw_path}.gz"
+            await asyncio.to_thread(self._compress, raw_path, compressed_path)
+            report['compressed_path'] = compressed_path
+            report['compressed_bytes'] = os.path.getsize(compressed_path)
+            report['compress_seconds'] = round(time.perf_counter() - started, 2)
+            report['removed'] = await asyncio.to_thread(self._rotate)
+        except Exception as e:
+            logger.error(f"Backup siqish/aylantirish xatosi ({raw_path}): {e}")
+            return {}
+        finally:
+            if os.path.exists(raw_path):
+                os.remove(raw_path)
+
+        logger.info(f"Backup saqlandi: {report['compressed_path']} - {report['bytes']} -> "
+                    f"{report['compressed_bytes']} bayt, nusxa {report['seconds']}s, "
+                    f"siqish {report['compress_seconds']}s, o'chirildi: {len(report['removed'])}")
+        self.last_report = report
+        return report
+
+    @staticmethod
+    def _compress(source: str, dest: str) -> None:
+        partial = f"{dest}.part"
+        with open(source, 'rb') as raw, gzip.open(partial, 'wb', compresslevel=6) as packed:
+            shutil.copyfileobj(raw, packed, 1024 * 1024)
+        os.replace(partial, dest)
+
+    def _rotate(self) -> List[str]:
+        """keep tadan eski nusxalarni o'chirish"""
+        removed = []
+        for path in self.snapshots()[:-self.keep]:
+            os.remove(path)
+            removed.append(path)
+        return removed
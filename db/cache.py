@@ -0,0 +1,142 @@
+"""
+🎰 Slot Game Bot — Foydalanuvchi qatorlari va konfiguratsiya uchun keshlar
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Iterable
+
+
+class UserCache:
+    """
+    Cheklangan hajmli, TTL bilan LRU kesh (telegram_id -> users qatori).
+
+    Bazadan o'qish va yozish bir vaqtda bo'lsa eski qator keshga tushmasligi
+    uchun o'qish begin_read() tokeni bilan boshlanadi: o'qish davomida
+    invalidate() chaqirilsa, token bekor bo'ladi va put() hech narsa qilmaydi.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._inflight: Dict[int, object] = {}
+
+        # Metrikalar
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Keshdan qatorni olish (yo'q yoki eskirgan bo'lsa None)"""
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        row, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[telegram_id]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(telegram_id)
+        self.hits += 1
+        return row
+
+    def begin_read(self, telegram_id: int) -> object:
+        """Bazadan o'qishdan oldin token olish"""
+        token = object()
+        self._inflight[telegram_id] = token
+        return token
+
+    def put(self, telegram_id: int, row: Dict[str, Any], token: Optional[object] = None):
+        """
+        Qatorni keshga yozish. token berilgan bo'lsa, o'qish davomida
+        invalidatsiya bo'lmagan taqdirdagina yoziladi.
+        """
+        if token is not None:
+            if self._inflight.get(telegram_id) is not token:
+                return
+            del self._inflight[telegram_id]
+        else:
+            # Yozuvdan kelgan yangi qator - parallel o'qishlar eski qatorni yozmasin
+            self._inflight.pop(telegram_id, None)
+
+        if self.max_size <= 0:
+            return
+
+        self._entries[telegram_id] = (row, time.monotonic() + self.ttl)
+        self._entries.move_to_end(telegram_id)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard_read(self, telegram_id: int, token: object):
+        """Natijasi keshlanmaydigan o'qish tokenini tozalash"""
+        if self._inflight.get(telegram_id) is token:
+            del self._inflight[telegram_id]
+
+    def invalidate(self, telegram_id: int):
+        """Bitta foydalanuvchi yozuvini bekor qilish"""
+        self._inflight.pop(telegram_id, None)
+        if self._entries.pop(telegram_id, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_many(self, telegram_ids: Iterable[int]):
+        """Bir nechta foydalanuvchi yozuvlarini bekor qilish"""
+        for telegram_id in telegram_ids:
+            self.invalidate(telegram_id)
+
+    def clear(self):
+        """Butun keshni tozalash"""
+        self._entries.clear()
+        self._inflight.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Keshni o'lchash uchun hit/miss/eviction hisoblagichlari"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
+
+
+class ConfigSnapshot:
+    """
+    config jadvalining jarayon ichidagi nusxasi.
+
+    Qiymatlar bir marta yuklanadi, set_config_value orqali o'zgarganda
+    darhol yangilanadi, boshqa jarayon o'zgartirganda esa config_version
+    kuzatuvchisi qayta yuklaydi. O'qish hech qanday I/O qilmaydi.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, str] = {}
+        self.loaded = False
+        self.version: Optional[int] = None
+        self.reloads = 0
+        self.loaded_at: Optional[float] = None
+
+    def get(self, key: str, default: str = "") -> str:
+        return self.values.get(key, default)
+
+    def set(self, key: str, value: str):
+        self.values[key] = value
+
+    def replace(self, values: Dict[str, str]):
+        """Butun nusxani bazadan o'qilgan qiymatlar bilan almashtirish"""
+        self.values = values
+        self.loaded = True
+        self.loaded_at = time.monotonic()
+        self.reloads += 1
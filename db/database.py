@@ -4,170 +4,661 @@
 import aiosqlite
 import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any, Tuple
-import json
+import os
+import time
+from urllib.parse import quote
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator, Sequence, Iterable, Callable, Awaitable
 from contextlib import asynccontextmanager
 from config.settings import (
-    DATABASE_PATH, DEFAULT_WIN_PROBABILITY, DAILY_BONUS_COOLDOWN,
-    DAILY_BONUS_AMOUNT, REFERRAL_BONUS, REFERRAL_FRIEND_BONUS
+    DATABASE_PATH, DEFAULT_WIN_PROBABILITY,
+    DAILY_BONUS_AMOUNT, REFERRAL_BONUS, REFERRAL_FRIEND_BONUS,
+    USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS, RETENTION_DAYS, RETENTION_CHUNK_SIZE,
+    RETENTION_CHUNK_PAUSE_MS, RETENTION_ARCHIVE_DIR, GAME_HISTORY_STATS_MONTHS,
+    DB_ACQUIRE_TIMEOUT_SECONDS, DB_CONNECTION_LEAK_SECONDS, STORAGE_BACKEND, DB_SHARD_COUNT,
+    DB_OPTIMIZE_INTERVAL_HOURS, DB_MAINTENANCE_TICK_SECONDS, DB_WAL_CHECKPOINT_PASSIVE_MB,
+    DB_WAL_CHECKPOINT_TRUNCATE_MB, DB_ANALYZE_INTERVAL_HOURS, DB_VACUUM_INTERVAL_MINUTES,
+    DB_VACUUM_PAGES_PER_STEP, DB_VACUUM_MAX_STEPS, DB_VACUUM_PAUSE_MS, DB_VACUUM_MIN_FREE_PAGES,
+    DB_OPTIMISTIC_RETRIES, DB_OPTIMISTIC_BACKOFF_MS
 )
+from db.write_behind import GameHistoryBuffer
+from db.cache import UserCache, ConfigSnapshot
+from db.leaderboard import Leaderboard
+from db.retention import RetentionManager, build_policies, ProgressCallback
+from db.partitions import HistoryPartitions
+from db.pool import PoolTelemetry, PoolAutosizer, PoolTimeoutError
+from db.maintenance import MaintenanceScheduler
+from db.optimistic import ConflictStats, CONFLICT, retry_delay
+from db.migrations import run_migrations, rebuild_daily_stats, LATEST_VERSION, DAILY_STATS_MERGE
+from db.storage import Storage, PlayRound
+from db.memory import MemoryDatabase
+from bot.reel_codec import Reels, to_code
 
 logger = logging.getLogger(__name__)
 
 
-class Database:
-    """Optimized database class with connection pooling and query optimization"""
+class Database(Storage):
+    """
+    Optimized database class with connection pooling and query optimization.
+
+    Yozuvlar bitta yozuvchi ulanish orqali navbat bilan bajariladi
+    (_get_connection), o'qishlar esa faqat o'qish uchun ochilgan ulanishlar
+    pulidan (_get_read_connection). max_connections - o'quvchilar chegarasi:
+    ishga tushishda bitta o'quvchi ochiladi, qolganlari faqat bo'sh ulanish
+    qolmaganda ochiladi (avtomatik o'lcham yoqilsa, chegara o'zgarib turadi).
+    """
     
-    def __init__(self, db_path: str = "data/slot_game.db", max_connections: int = 10):
+    def __init__(self, db_path: str = DATABASE_PATH, max_connections: int = 10,
+                 acquire_timeout: float = DB_ACQUIRE_TIMEOUT_SECONDS,
+                 leak_threshold: float = DB_CONNECTION_LEAK_SECONDS,
+                 optimistic_retries: int = DB_OPTIMISTIC_RETRIES):
         self.db_path = db_path
         self.max_connections = max_connections
-        self._connection_pool = asyncio.Queue(maxsize=max_connections)
+        # 0 yoki None - cheksiz kutish
+        self.acquire_timeout = acquire_timeout or None
+        self._connection_pool: asyncio.Queue = asyncio.Queue()
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._writer_stats = PoolTelemetry("writer", 1, leak_threshold)
+        self._reader_stats = PoolTelemetry("readers", max_connections, leak_threshold)
+        self._autosizer: Optional[PoolAutosizer] = None
+        self.optimistic_retries = max(0, optimistic_retries)
+        self._conflicts = ConflictStats()
+        self._pool_monitor_task: Optional[asyncio.Task] = None
         self._pool_initialized = False
+        self._pool_lock = asyncio.Lock()
+        self._write_buffer: Optional[GameHistoryBuffer] = None
+        self._user_cache = UserCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS)
+        self._config = ConfigSnapshot()
+        self._leaderboard = Leaderboard()
+        self._history = HistoryPartitions()
+        self._retention = RetentionManager(
+            self, build_policies(RETENTION_DAYS, {'game_history': self._history}), RETENTION_CHUNK_SIZE,
+            RETENTION_CHUNK_PAUSE_MS, RETENTION_ARCHIVE_DIR
+        )
+        self._maintenance = MaintenanceScheduler(
+            self, DB_MAINTENANCE_TICK_SECONDS, DB_WAL_CHECKPOINT_PASSIVE_MB, DB_WAL_CHECKPOINT_TRUNCATE_MB,
+            DB_OPTIMIZE_INTERVAL_HOURS * 3600, DB_ANALYZE_INTERVAL_HOURS * 3600,
+            DB_VACUUM_INTERVAL_MINUTES * 60, DB_VACUUM_PAGES_PER_STEP, DB_VACUUM_MAX_STEPS,
+            DB_VACUUM_PAUSE_MS, DB_VACUUM_MIN_FREE_PAGES
+        )
+        self._config_watcher_task: Optional[asyncio.Task] = None
         
     async def _init_connection_pool(self):
         """Initialize connection pool"""
-        if self._pool_initialized:
-            return
+        async with self._pool_lock:
+            # Bir vaqtda kelgan birinchi so'rovlar pulni ikki marta ochmasligi uchun
+            if self._pool_initialized:
+                return
+            
+            started = time.perf_counter()
+            # Yagona yozuvchi - bazani (kerak bo'lsa) yaratadi va WAL ni yoqadi.
+            # PRAGMA optimize bu yerda emas - optimize() jarayonda jadval bo'yicha chaqiriladi
+            self._writer = await aiosqlite.connect(self.db_path)
+            # Barcha ulanishlar bir xil qator turi bilan - har olishda o'zgartirilmaydi
+            self._writer.row_factory = aiosqlite.Row
+            # auto_vacuum yangi (bo'sh) faylda darhol, mavjudida VACUUM dan keyin kuchga kiradi
+            await self._writer.executescript("""
+                PRAGMA auto_vacuum=INCREMENTAL;
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                PRAGMA cache_size=10000;
+                PRAGMA temp_store=MEMORY;
+            """)
+            
+            # Bitta o'quvchi darhol, qolganlari _get_read_connection da talab bo'yicha
+            self._connection_pool.put_nowait(await self._open_reader())
+            self._reader_stats.opened = 1
+            self._reader_stats.size = self.max_connections
             
-        for _ in range(self.max_connections):
-            conn = await aiosqlite.connect(self.db_path)
-            await conn.execute("PRAGMA journal_mode=WAL")
-            await conn.execute("PRAGMA synchronous=NORMAL")
-            await conn.execute("PRAGMA cache_size=10000")
-            await conn.execute("PRAGMA temp_store=MEMORY")
-            await conn.execute("PRAGMA mmap_size=268435456")
-            await conn.execute("PRAGMA optimize")
-            self._connection_pool.put_nowait(conn)
+            self._pool_initialized = True
+            logger.info(f"Database connection pool initialized: 1 writer + 1/{self.max_connections} readers "
+                        f"({(time.perf_counter() - started) * 1000:.1f}ms)")
+    
+    async def _open_reader(self) -> aiosqlite.Connection:
+        """O'quvchi ulanish: mode=ro + query_only, yozuvchini hech qachon to'sib qo'ymaydi"""
+        read_uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+        conn = await aiosqlite.connect(read_uri, uri=True)
+        conn.row_factory = aiosqlite.Row
+        await conn.executescript("""
+            PRAGMA query_only=1;
+            PRAGMA cache_size=10000;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+        """)
+        return conn
+    
+    async def _acquire(self, telemetry: PoolTelemetry, acquire, ready: bool, owner: str):
+        """
+        acquire() ni acquire_timeout bilan kutish va metrikalarni yozish.
+        ready - kutmasdan olish mumkin (wait_for ortiqcha vazifa yaratmaydi).
+        """
+        started = time.monotonic()
+        if ready:
+            result = await acquire()
+        else:
+            telemetry.waiting += 1
+            try:
+                result = await asyncio.wait_for(acquire(), self.acquire_timeout)
+            except asyncio.TimeoutError:
+                waited = time.monotonic() - started
+                telemetry.timed_out(waited, owner)
+                raise PoolTimeoutError(f"{telemetry.name}: {waited:.1f}s ichida ulanish olinmadi ({owner})")
+            finally:
+                telemetry.waiting -= 1
+        return result, telemetry.acquired(time.monotonic() - started, owner)
+    
+    @asynccontextmanager
+    async def _get_connection(self, owner: str):
+        """
+        Yozuvchi ulanish. Yozuvlar asyncio.Lock navbati bilan (FIFO) birma-bir
+        bajariladi, shuning uchun jarayon ichida SQLITE_BUSY bo'lmaydi.
+        Ichida yana _get_connection() chaqirmang - navbat o'zini kutib qoladi.
+        acquire_timeout ichida navbat kelmasa PoolTimeoutError.
+        owner - chaqiruvchi amal nomi (pul metrikalari va leak/timeout loglari uchun).
+        """
+        if not self._pool_initialized:
+            await self._init_connection_pool()
         
-        self._pool_initialized = True
-        logger.info(f"Database connection pool initialized with {self.max_connections} connections")
+        # Lock bo'sh ko'rinsa ham navbatda kutayotganlar bo'lishi mumkin - har doim timeout bilan
+        _, token = await self._acquire(
+            self._writer_stats, self._write_lock.acquire, False, owner
+        )
+        try:
+            yield self._writer
+        finally:
+            try:
+                # Yakunlanmagan tranzaksiya keyingi yozuvchiga o'tib ketmasin
+                if self._writer.in_transaction:
+                    await self._writer.rollback()
+            finally:
+                self._writer_stats.released(token)
+                self._write_lock.release()
     
     @asynccontextmanager
-    async def _get_connection(self):
-        """Get connection from pool with context manager"""
+    async def _get_read_connection(self, owner: str):
+        """
+        Faqat o'qish uchun ulanish (pul orqali). Bo'sh ulanish yo'q va chegaraga
+        yetilmagan bo'lsa yangisi ochiladi; aks holda acquire_timeout gacha
+        kutiladi, keyin PoolTimeoutError. owner - chaqiruvchi amal nomi.
+        """
         if not self._pool_initialized:
             await self._init_connection_pool()
-            
-        conn = await self._connection_pool.get()
+        
+        stats = self._reader_stats
+        if self._connection_pool.empty() and stats.opened < self.max_connections:
+            # O'rin ochishdan oldin band qilinadi - parallel so'rovlar chegaradan oshmaydi
+            stats.opened += 1
+            try:
+                conn, token = await self._acquire(stats, self._open_reader, True, owner)
+            except BaseException:
+                stats.opened -= 1
+                raise
+        else:
+            conn, token = await self._acquire(
+                stats, self._connection_pool.get, not self._connection_pool.empty(), owner
+            )
         try:
             yield conn
         finally:
-            self._connection_pool.put_nowait(conn)
+            stats.released(token)
+            if stats.opened > self.max_connections:
+                # Chegara kamaytirilgan - ortiqcha ulanish yopiladi
+                stats.opened -= 1
+                await conn.close()
+            else:
+                self._connection_pool.put_nowait(conn)
     
-    async def init_db(self):
-        """Initialize database with optimized schema and indexes"""
-        async with self._get_connection() as conn:
-            # First, check if we need to migrate existing database
-            await self.migrate_database(conn)
-            
-            # Create tables with optimized structure (only if they don't exist)
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    telegram_id INTEGER PRIMARY KEY,
-                    username TEXT,
-                    first_name TEXT,
-                    last_name TEXT,
-                    balance INTEGER DEFAULT 100,
-                    total_spins INTEGER DEFAULT 0,
-                    total_wins INTEGER DEFAULT 0,
-                    total_losses INTEGER DEFAULT 0,
-                    daily_streak INTEGER DEFAULT 0,
-                    last_daily_bonus TIMESTAMP,
-                    is_verified BOOLEAN DEFAULT FALSE,
-                    is_banned BOOLEAN DEFAULT FALSE,
-                    channel_subscribed BOOLEAN DEFAULT FALSE,
-                    referral_code TEXT,
-                    referred_by INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS game_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    reels TEXT,
-                    is_winner BOOLEAN,
-                    stars_won INTEGER,
-                    stars_lost INTEGER,
-                    win_probability REAL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (telegram_id)
-                )
-            """)
-            
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS transactions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    transaction_type TEXT,
-                    amount INTEGER,
-                    balance_before INTEGER,
-                    balance_after INTEGER,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (telegram_id)
-                )
-            """)
-            
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS config (
-                    key TEXT PRIMARY KEY,
-                    value TEXT,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Insert default configuration
-            await conn.execute("""
-                INSERT OR IGNORE INTO config (key, value) VALUES 
-                ('win_probability', '0.7'),
-                ('daily_bonus_amount', '5'),
-                ('referral_bonus', '10'),
-                ('min_payment_amount', '50'),
-                ('max_payment_amount', '10000')
-            """)
-            
-            # Create basic indexes only (avoid complex migrations for now)
+    # === ULANISHLAR PULI MONITORINGI ===
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Yozuvchi va o'quvchilar puli metrikalari: kutish/ushlash gistogrammalari, saturation, timeout, leak"""
+        return {
+            'writer': self._writer_stats.get_stats(),
+            'readers': self._reader_stats.get_stats(),
+            'acquire_timeout': self.acquire_timeout,
+            'autosize': (
+                {'min_size': self._autosizer.min_size, 'max_size': self._autosizer.max_size}
+                if self._autosizer else None
+            )
+        }
+    
+    def resize_pool(self, max_connections: int) -> bool:
+        """O'quvchilar chegarasini pul ochilishidan oldin o'zgartirish (ochilgan bo'lsa False)"""
+        if self._pool_initialized:
+            return False
+        self.max_connections = self._reader_stats.size = max_connections
+        return True
+    
+    def start_pool_monitor(self, interval: float = 10.0, autosizer: Optional[PoolAutosizer] = None):
+        """
+        Fon vazifasi: har interval soniyada uzoq ushlangan ulanishlarni loglaydi va
+        autosizer berilgan bo'lsa o'quvchilar puli o'lchamini moslaydi.
+        """
+        if self._pool_monitor_task is not None:
+            return
+        self._autosizer = autosizer
+        self._pool_monitor_task = asyncio.create_task(self._pool_monitor_loop(interval))
+        logger.info(f"Ulanishlar puli monitoringi ishga tushdi ({interval}s"
+                    + (f", o'lcham {autosizer.min_size}..{autosizer.max_size}" if autosizer else "") + ")")
+    
+    async def stop_pool_monitor(self):
+        """Pul monitoringini to'xtatish"""
+        if self._pool_monitor_task is not None:
+            self._pool_monitor_task.cancel()
+            try:
+                await self._pool_monitor_task
+            except asyncio.CancelledError:
+                pass
+            self._pool_monitor_task = None
+    
+    async def _pool_monitor_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
             try:
-                await conn.execute("CREATE INDEX IF NOT EXISTS idx_users_telegram_id ON users(telegram_id)")
-                await conn.execute("CREATE INDEX IF NOT EXISTS idx_game_history_user_id ON game_history(user_id)")
-                await conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions(user_id)")
+                self._writer_stats.find_leaks()
+                self._reader_stats.find_leaks()
+                if self._autosizer and self._pool_initialized:
+                    await self._resize_read_pool(self._autosizer.target_size(self._reader_stats))
             except Exception as e:
-                logger.warning(f"Index creation failed: {e}")
-            
-            await conn.commit()
-            logger.info("Database initialized successfully")
+                logger.error(f"Ulanishlar puli monitoringida xato: {e}")
+    
+    async def _resize_read_pool(self, target: int):
+        """
+        O'quvchilar chegarasini target ga o'zgartirish. Yangi ulanishlar talab
+        bo'yicha ochiladi; ortiqcha bo'shlari hozir, bandlari qaytarilganda yopiladi.
+        """
+        size = self.max_connections
+        while self._reader_stats.opened > target and not self._connection_pool.empty():
+            await self._connection_pool.get_nowait().close()
+            self._reader_stats.opened -= 1
+        if target != size:
+            self._reader_stats.size = self.max_connections = target
+            logger.info(f"O'quvchilar puli o'lchami: {size} -> {target}")
+    
+    async def optimize(self) -> bool:
+        """
+        PRAGMA optimize - rejalashtiruvchi statistikasini kerak bo'lgan jadvallar
+        uchun yangilash. Har ulanishda emas, jarayonda vaqti-vaqti bilan chaqiriladi.
+        """
+        try:
+            started = time.perf_counter()
+            async with self._get_connection("optimize") as conn:
+                await conn.execute("PRAGMA optimize")
+                await conn.commit()
+            logger.info(f"PRAGMA optimize bajarildi ({(time.perf_counter() - started) * 1000:.1f}ms)")
+            return True
+        except Exception as e:
+            logger.error(f"PRAGMA optimize xatosi: {e}")
+            return False
+
+    # === TEXNIK XIZMAT ===
+
+    def start_maintenance(self):
+        """WAL checkpoint / optimize / ANALYZE / incremental_vacuum rejalashtiruvchisini ishga tushirish"""
+        self._maintenance.start()
+
+    async def stop_maintenance(self):
+        await self._maintenance.stop()
+
+    async def run_maintenance(self, job: str) -> Any:
+        """Bitta ishni darhol bajarish: checkpoint, optimize, analyze yoki incremental_vacuum"""
+        return await self._maintenance.run_now(job)
+
+    def get_maintenance_stats(self) -> Dict[str, Any]:
+        return self._maintenance.get_stats()
+
+    async def analyze(self) -> bool:
+        """To'liq ANALYZE - barcha jadval va indekslar statistikasini qayta yig'ish (kamdan-kam)"""
+        try:
+            started = time.perf_counter()
+            async with self._get_connection("analyze") as conn:
+                await conn.execute("ANALYZE")
+                await conn.commit()
+            logger.info(f"ANALYZE bajarildi ({(time.perf_counter() - started) * 1000:.1f}ms)")
+            return True
+        except Exception as e:
+            logger.error(f"ANALYZE xatosi: {e}")
+            return False
+
+    def wal_size(self) -> int:
+        """-wal faylining joriy hajmi (bayt), fayl bo'lmasa 0"""
+        try:
+            return os.path.getsize(f"{self.db_path}-wal")
+        except OSError:
+            return 0
+
+    async def wal_checkpoint(self, mode: str = "PASSIVE") -> Dict[str, Any]:
+        """
+        PRAGMA wal_checkpoint(mode). PASSIVE hech kimni kutmaydi; TRUNCATE
+        o'quvchilar tugashini busy_timeout gacha kutadi va -wal faylini nolga qisqartiradi.
+        Qaytariladi: {'mode', 'busy', 'log_pages', 'checkpointed_pages',
+        'wal_bytes_before', 'wal_bytes_after'}, xato bo'lsa {}.
+        """
+        mode = mode.upper()
+        if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            logger.error(f"Noma'lum wal_checkpoint rejimi: {mode}")
+            return {}
+        try:
+            before = self.wal_size()
+            async with self._get_connection("wal_checkpoint") as conn:
+                cursor = await conn.execute(f"PRAGMA wal_checkpoint({mode})")
+                busy, log_pages, checkpointed = await cursor.fetchone()
+            result = {
+                'mode': mode,
+                'busy': busy,
+                'log_pages': log_pages,
+                'checkpointed_pages': checkpointed,
+                'wal_bytes_before': before,
+                'wal_bytes_after': self.wal_size()
+            }
+            logger.info(f"wal_checkpoint({mode}): {checkpointed}/{log_pages} sahifa, "
+                        f"-wal {before} -> {result['wal_bytes_after']} bayt" + (" (band)" if busy else ""))
+            return result
+        except Exception as e:
+            logger.error(f"wal_checkpoint({mode}) xatosi: {e}")
+            return {}
+
+    async def incremental_vacuum(self, pages_per_step: int = 256, max_steps: int = 100,
+                                 pause: float = 0.05, min_free_pages: int = 0) -> Dict[str, Any]:
+        """
+        Freelist dagi bo'sh sahifalarni PRAGMA incremental_vacuum(pages_per_step)
+        bilan qadamlab faylga qaytarish (auto_vacuum=INCREMENTAL kerak, migratsiya 9).
+        Har qadam alohida qisqa yozish, qadamlar orasida pause soniya - aylantirishlar
+        kutib qolmaydi. Freelist min_free_pages dan kichik bo'lsa hech narsa qilinmaydi.
+        Qaytariladi: {'freed_pages', 'freed_bytes', 'steps', 'free_pages_left'}, xato bo'lsa {}.
+        """
+        try:
+            freed = steps = 0
+            free_pages = None
+            async with self._get_read_connection("incremental_vacuum") as conn:
+                cursor = await conn.execute("PRAGMA page_size")
+                page_size = (await cursor.fetchone())[0]
+                cursor = await conn.execute("PRAGMA auto_vacuum")
+                auto_vacuum = (await cursor.fetchone())[0]
+            if auto_vacuum != 2:
+                # Rejim hali kuchga kirmagan - incremental_vacuum hech narsa bo'shatmaydi
+                logger.warning("incremental_vacuum: auto_vacuum=INCREMENTAL hali yoqilmagan, "
+                               "bot to'xtatilganda bir marta: python -m db.tools vacuum")
+                return {'freed_pages': 0, 'freed_bytes': 0, 'steps': 0, 'free_pages_left': 0}
+            while steps < max_steps:
+                async with self._get_connection("incremental_vacuum") as conn:
+                    cursor = await conn.execute("PRAGMA freelist_count")
+                    free_pages = (await cursor.fetchone())[0]
+                    if not free_pages or (steps == 0 and free_pages < min_free_pages):
+                        break
+                    # incremental_vacuum har sahifani alohida statement qadamida bo'shatadi, ustun
+                    # qaytarmagani uchun execute() birinchi qadamdan keyin to'xtaydi - executescript
+                    # uni oxirigacha bajaradi (va o'zi commit qiladi)
+                    await conn.executescript(f"PRAGMA incremental_vacuum({int(pages_per_step)});")
+                    cursor = await conn.execute("PRAGMA freelist_count")
+                    left = (await cursor.fetchone())[0]
+                freed += free_pages - left
+                free_pages = left
+                steps += 1
+                await asyncio.sleep(pause)
+
+            result = {
+                'freed_pages': freed,
+                'freed_bytes': freed * page_size,
+                'steps': steps,
+                'free_pages_left': free_pages or 0
+            }
+            if freed:
+                logger.info(f"incremental_vacuum: {freed} sahifa ({result['freed_bytes']} bayt) "
+                            f"{steps} qadamda bo'shatildi, qoldi: {result['free_pages_left']}")
+            return result
+        except Exception as e:
+            logger.error(f"incremental_vacuum xatosi: {e}")
+            return {}
+
+    async def vacuum(self) -> Dict[str, Any]:
+        """
+        Bir martalik to'liq VACUUM: faylni qayta yozadi va auto_vacuum=INCREMENTAL
+        ni kuchga kiritadi. Butun vaqt davomida yozuvchi band - faqat bot
+        to'xtatilganda (python -m db.tools vacuum). Qaytariladi: {'bytes_before',
+        'bytes_after', 'auto_vacuum', 'seconds'}, xato bo'lsa {}.
+        """
+        try:
+            started = time.perf_counter()
+            bytes_before = os.path.getsize(self.db_path)
+            async with self._get_connection("vacuum") as conn:
+                await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                await conn.execute("VACUUM")
+                cursor = await conn.execute("PRAGMA auto_vacuum")
+                auto_vacuum = (await cursor.fetchone())[0]
+            result = {
+                'bytes_before': bytes_before,
+                'bytes_after': os.path.getsize(self.db_path),
+                'auto_vacuum': auto_vacuum,
+                'seconds': round(time.perf_counter() - started, 2)
+            }
+            logger.info(f"VACUUM bajarildi: {result}")
+            return result
+        except Exception as e:
+            logger.error(f"VACUUM xatosi: {e}")
+            return {}
+
+    async def backup(self, dest: str, pages_per_step: int = 256, sleep: float = 0.02,
+                     max_restarts: int = 3) -> Dict[str, Any]:
+        """
+        SQLite online backup API bilan bazaning izchil nusxasini dest ga yozish.
+
+        Nusxa alohida faqat o'qish ulanishidan pages_per_step sahifalik qadamlarda
+        olinadi, qadamlar orasida sleep soniya tanaffus - yozuvchi qulfi va
+        o'quvchilar puli band qilinmaydi. Qadamlar orasida boshqa ulanish yozsa
+        SQLite nusxani boshidan boshlaydi; max_restarts martadan keyin qolgani bitta
+        qadamda ko'chiriladi (WAL rejimida bu yozuvchini to'smaydi).
+        Fayl avval dest.part ga yoziladi va tugagach nomi o'zgartiriladi.
+        Qaytariladi: {'path', 'bytes', 'pages', 'steps', 'restarts', 'seconds'}
+        """
+        started = time.perf_counter()
+        partial = f"{dest}.part"
+        state = {'steps': 0, 'restarts': 0, 'pages': 0, 'remaining': None}
+
+        class _Restarted(Exception):
+            pass
+
+        def progress(status: int, remaining: int, total: int):
+            # aiosqlite oqimida chaqiriladi - uxlash hodisalar siklini to'smaydi
+            state['steps'] += 1
+            state['pages'] = total
+            # Qadam oldinga siljimagan bo'lsa - nusxa boshidan boshlangan
+            if state['remaining'] is not None and remaining >= state['remaining']:
+                state['restarts'] += 1
+                if state['restarts'] > max_restarts:
+                    raise _Restarted()
+            state['remaining'] = remaining
+            if remaining and sleep > 0:
+                time.sleep(sleep)
+
+        source = target = None
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+            if os.path.exists(partial):
+                os.remove(partial)
+            source = await self._open_reader()
+            target = await aiosqlite.connect(partial)
+            try:
+                await source.backup(target, pages=max(1, pages_per_step), progress=progress)
+            except _Restarted:
+                logger.warning(f"Backup {max_restarts} marta qayta boshlandi - qolgani bitta qadamda olinadi")
+                await source.backup(target, pages=-1)
+                state['steps'] += 1
+            await target.close()
+            target = None
+            os.replace(partial, dest)
+
+            report = {
+                'path': dest,
+                'bytes': os.path.getsize(dest),
+                'pages': state['pages'],
+                'steps': state['steps'],
+                'restarts': state['restarts'],
+                'seconds': round(time.perf_counter() - started, 2)
+            }
+            logger.info(f"Backup tayyor: {dest} - {report['bytes']} bayt, {report['pages']} sahifa, "
+                        f"{report['steps']} qadam, {report['restarts']} qayta boshlash ({report['seconds']}s)")
+            return report
+        except Exception as e:
+            logger.error(f"Backup xatosi ({dest}): {e}")
+            return {}
+        finally:
+            if target:
+                await target.close()
+            if source:
+                await source.close()
+            if os.path.exists(partial):
+                os.remove(partial)
+
+    async def init_db(self):
+        """
+        Sxemani db/migrations.py dagi raqamlangan migratsiyalar bilan yangilash.
+        Baza oxirgi versiyada bo'lsa - faqat bitta PRAGMA user_version o'qiladi.
+        """
+        async with self._get_connection("init_db") as conn:
+            applied = await run_migrations(conn)
+        if applied:
+            logger.info(f"Database migrated to version {LATEST_VERSION}: {applied}")
+        logger.info("Database initialized successfully")
+        
+        # Joriy oy uchun o'yin tarixi bo'lagi va game_history_all ko'rinishi
+        await self._history.ensure(self)
+        
+        if applied:
+            # Sxema yoki ma'lumotlar o'zgardi - hisoblagichlarni jadvallardan qayta hisoblash
+            await self.reconcile_global_counters()
     
     async def close(self):
         """Close all database connections"""
+        await self.stop_maintenance()
+        await self.stop_write_behind()
+        await self.stop_config_watcher()
+        await self.stop_pool_monitor()
+        self._user_cache.clear()
         if self._pool_initialized:
+            async with self._write_lock:
+                await self._writer.close()
+                self._writer = None
             while not self._connection_pool.empty():
                 conn = await self._connection_pool.get()
                 await conn.close()
+            self._reader_stats.opened = 0
             self._pool_initialized = False
             logger.info("Database connection pool closed")
 
+    # === WRITE-BEHIND BUFER ===
+
+    def start_write_behind(self, flush_interval_ms: int = 200, max_batch: int = 500,
+                           max_pending: int = 10000):
+        """O'yin natijalarini buferlab, guruhli commit bilan yozishni yoqish"""
+        if self._write_buffer is None:
+            self._write_buffer = GameHistoryBuffer(self, flush_interval_ms, max_batch, max_pending)
+        self._write_buffer.start()
+
+    async def stop_write_behind(self) -> Dict[str, Any]:
+        """Buferni to'xtatish va qolgan yozuvlarni bazaga yozish"""
+        if self._write_buffer is None:
+            return {'enabled': False}
+        await self._write_buffer.stop()
+        stats = self.get_write_behind_stats()
+        self._write_buffer = None
+        return stats
+
+    async def flush_write_behind(self) -> int:
+        """Buferdagi yozuvlarni darhol yozish"""
+        if self._write_buffer is None:
+            return 0
+        return await self._write_buffer.flush()
+
+    def get_write_behind_stats(self) -> Dict[str, Any]:
+        """Write-behind bufer metrikalari"""
+        if self._write_buffer is None:
+            return {'enabled': False}
+        return {'enabled': True, **self._write_buffer.get_stats()}
+
+    # === OPTIMISTIK YOZUVLAR ===
+
+    async def _optimistic_write(self, operation: str, telegram_id: int, columns: str,
+                                write: Callable[[aiosqlite.Connection, Optional[aiosqlite.Row]], Awaitable[Any]]
+                                ) -> Any:
+        """
+        O'qish - hisoblash - shartli yozish (users.version bo'yicha).
+
+        Qator (columns + version) yozuvchi qulfisiz o'quvchi ulanishdan o'qiladi,
+        write(conn, row) esa yozuvchi tranzaksiyasida birinchi bo'lib
+        UPDATE users ... WHERE telegram_id = ? AND version = ? bajaradi. Qator orada
+        boshqa yozuv bilan o'zgargan bo'lsa write CONFLICT qaytaradi: tranzaksiya
+        bekor qilinadi va amal optimistic_retries martagacha qaytadan o'qib takrorlanadi.
+        Foydalanuvchi topilmasa write(conn, None) chaqiriladi.
+        Qaytariladi: write natijasi yoki urinishlar tugasa CONFLICT.
+        """
+        conflicts = 0
+        for attempt in range(self.optimistic_retries + 1):
+            if attempt:
+                await asyncio.sleep(retry_delay(attempt, DB_OPTIMISTIC_BACKOFF_MS))
+            async with self._get_read_connection("_optimistic_write") as conn:
+                cursor = await conn.execute(
+                    f"SELECT {columns}, version FROM users WHERE telegram_id = ?", (telegram_id,)
+                )
+                row = await cursor.fetchone()
+
+            async with self._get_connection("_optimistic_write") as conn:
+                try:
+                    result = await write(conn, row)
+                    if result is CONFLICT:
+                        await conn.rollback()
+                    else:
+                        await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+            if result is not CONFLICT:
+                self._conflicts.record(operation, conflicts, committed=True)
+                return result
+            conflicts += 1
+
+        self._conflicts.record(operation, conflicts, committed=False)
+        logger.warning(f"{operation} {telegram_id}: {conflicts} ta versiya to'qnashuvi, yozuv bekor qilindi")
+        return CONFLICT
+
+    def get_conflict_stats(self) -> Dict[str, Any]:
+        """Optimistik yozuvlar: to'qnashuvlar, qayta urinishlar, bekor qilinganlar"""
+        return self._conflicts.get_stats()
+
     # === FOYDALANUVCHI OPERATSIYALARI ===
 
     async def register_user(self, telegram_id: int, username: str = None, 
                            first_name: str = None, referrer_id: int = None) -> bool:
         """Yangi foydalanuvchini ro'yxatdan o'tkazish"""
+        if not await self._insert_user(telegram_id, username, first_name, referrer_id):
+            return False
+
+        # Agar referal orqali kelgan bo'lsa (yozuvchi ulanish bo'shagandan keyin)
+        if referrer_id:
+            await self.add_referral(referrer_id, telegram_id)
+        return True
+
+    async def _insert_user(self, telegram_id: int, username: str = None,
+                           first_name: str = None, referrer_id: int = None) -> bool:
+        """
+        Faqat users qatori va hisoblagichlar. Referal bonusi alohida - shardlangan
+        omborda taklif qiluvchi boshqa faylda bo'lishi mumkin.
+        """
         try:
-            async with self._get_connection() as conn:
-                await conn.execute("""
+            async with self._get_connection("register_user") as conn:
+                cursor = await conn.execute("""
                     INSERT OR IGNORE INTO users 
                     (telegram_id, username, first_name, referrer_id, reg_date)
                     VALUES (?, ?, ?, ?, ?)
+                    RETURNING stars
                 """, (telegram_id, username, first_name, referrer_id, datetime.now()))
+                inserted = await cursor.fetchone()
+                if inserted:
+                    await self._bump_counters(conn, users_total=1, total_stars=inserted[0] or 0)
                 await conn.commit()
-                
-                # Agar referal orqali kelgan bo'lsa
-                if referrer_id:
-                    await self.add_referral(referrer_id, telegram_id)
-                
-                return True
+                self._user_cache.invalidate(telegram_id)
+            return True
         except Exception as e:
             logger.error(f"Foydalanuvchi {telegram_id} ro'yxatdan o'tkazishda xato: {e}")
             return False
@@ -175,68 +666,92 @@ class Database:
     async def verify_user(self, telegram_id: int) -> bool:
         """Foydalanuvchini tasdiqlangan deb belgilash"""
         try:
-            async with self._get_connection() as conn:
-                await conn.execute("""
-                    UPDATE users SET is_verified = 1 WHERE telegram_id = ?
+            async with self._get_connection("verify_user") as conn:
+                cursor = await conn.execute("""
+                    UPDATE users SET is_verified = 1, version = version + 1 WHERE telegram_id = ? AND IFNULL(is_verified, 0) = 0
+                    RETURNING telegram_id, stars, is_verified, is_banned
                 """, (telegram_id,))
+                leaderboard_row = await cursor.fetchone()
+                if leaderboard_row:
+                    await self._bump_counters(conn, users_verified=1)
                 await conn.commit()
+                self._user_cache.invalidate(telegram_id)
+                self._sync_leaderboard(leaderboard_row)
                 return True
         except Exception as e:
             logger.error(f"Foydalanuvchi {telegram_id} tasdiqlanishida xato: {e}")
             return False
 
+    def _prepare_user_row(self, row, pending=None) -> Dict[str, Any]:
+        """
+        Storage._prepare_user_row + buferda kutayotgan o'yin natijalari.
+        pending - o'qishdan oldin olingan GameHistoryBuffer.snapshot().
+        """
+        user_data = super()._prepare_user_row(row)
+        if self._write_buffer is not None:
+            self._write_buffer.apply_pending(user_data, pending)
+        return user_data
+
     async def get_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
-        """Foydalanuvchi ma'lumotlarini olish - daily streak bilan"""
+        """Foydalanuvchi ma'lumotlarini olish - daily streak bilan (keshdan o'qiladi)"""
+        cached = self._user_cache.get(telegram_id)
+        if cached is not None:
+            return self._prepare_user_row(cached)
+
+        # Bufer paketlari SELECT dan oldin olinadi: o'qish paytida flush tugasa,
+        # uning o'zgarishlari qatorda bo'ladi va users.version bo'yicha o'tkazib yuboriladi
+        pending = self._write_buffer.snapshot() if self._write_buffer is not None else None
+        token = self._user_cache.begin_read(telegram_id)
         try:
-            async with self._get_connection() as conn:
-                conn.row_factory = aiosqlite.Row
+            async with self._get_read_connection("get_user") as conn:
                 cursor = await conn.execute("""
                     SELECT * FROM users WHERE telegram_id = ?
                 """, (telegram_id,))
                 row = await cursor.fetchone()
 
                 if row:
-                    user_data = dict(row)
-
-                    # Daily streak hisoblash
-                    if user_data.get('last_daily_bonus'):
-                        from datetime import datetime, timedelta
-                        last_bonus = datetime.fromisoformat(user_data['last_daily_bonus'])
-                        today = datetime.now()
-
-                        if (today - last_bonus).days == 1:
-                            # Ketma-ket kun
-                            user_data['daily_streak'] = user_data.get('daily_streak', 0) + 1
-                        elif (today - last_bonus).days > 1:
-                            # Ketma-ketlik uzildi
-                            user_data['daily_streak'] = 0
-                        else:
-                            # Bugun bonus olgan
-                            user_data['daily_streak'] = user_data.get('daily_streak', 0)
-                    else:
-                        user_data['daily_streak'] = 0
-
-                    # channel_subscribed maydonini to'g'rilash
-                    if 'channel_subscribed' not in user_data:
-                        user_data['channel_subscribed'] = False
-
-                    return user_data
+                    raw_row = dict(row)
+                    self._user_cache.put(telegram_id, raw_row, token)
+                    return self._prepare_user_row(raw_row, pending)
+                self._user_cache.discard_read(telegram_id, token)
                 return None
         except Exception as e:
+            self._user_cache.discard_read(telegram_id, token)
             logger.error(f"Foydalanuvchi {telegram_id} ma'lumotlarini olishda xato: {e}")
             return None
 
+    def get_user_cache_stats(self) -> Dict[str, Any]:
+        """Foydalanuvchi keshi metrikalari (hit/miss/eviction)"""
+        return self._user_cache.get_stats()
+
     async def update_user_balance(self, telegram_id: int, stars_delta: int, attempts_delta: int = 0) -> bool:
-        """Foydalanuvchi balansini yangilash"""
+        """Foydalanuvchi balansini yangilash (optimistik: versiya o'zgargan bo'lsa qayta urinish)"""
+        async def write(conn: aiosqlite.Connection, row: Optional[aiosqlite.Row]):
+            if row is None:
+                return None
+            stars = max(0, (row['stars'] or 0) + stars_delta)
+            attempts = max(0, (row['attempts'] or 0) + attempts_delta)
+            cursor = await conn.execute("""
+                UPDATE users 
+                SET stars = ?, attempts = ?, version = version + 1
+                WHERE telegram_id = ? AND version = ?
+                RETURNING telegram_id, stars, is_verified, is_banned
+            """, (stars, attempts, telegram_id, row['version']))
+            leaderboard_row = await cursor.fetchone()
+            if leaderboard_row is None:
+                return CONFLICT
+            await self._bump_counters(conn, total_stars=stars - (row['stars'] or 0))
+            return leaderboard_row
+
         try:
-            async with self._get_connection() as conn:
-                await conn.execute("""
-                    UPDATE users 
-                    SET stars = MAX(0, stars + ?), attempts = MAX(0, attempts + ?)
-                    WHERE telegram_id = ?
-                """, (stars_delta, attempts_delta, telegram_id))
-                await conn.commit()
-                return True
+            leaderboard_row = await self._optimistic_write(
+                'update_user_balance', telegram_id, "stars, attempts", write
+            )
+            if leaderboard_row is CONFLICT:
+                return False
+            self._user_cache.invalidate(telegram_id)
+            self._sync_leaderboard(leaderboard_row)
+            return True
         except Exception as e:
             logger.error(f"Foydalanuvchi {telegram_id} balansi yangilanishida xato: {e}")
             return False
@@ -244,11 +759,17 @@ class Database:
     async def ban_user(self, telegram_id: int) -> bool:
         """Foydalanuvchini bloklash"""
         try:
-            async with self._get_connection() as conn:
-                await conn.execute("""
-                    UPDATE users SET is_banned = 1 WHERE telegram_id = ?
+            async with self._get_connection("ban_user") as conn:
+                cursor = await conn.execute("""
+                    UPDATE users SET is_banned = 1, version = version + 1 WHERE telegram_id = ? AND IFNULL(is_banned, 0) = 0
+                    RETURNING telegram_id, stars, is_verified, is_banned
                 """, (telegram_id,))
+                leaderboard_row = await cursor.fetchone()
+                if leaderboard_row:
+                    await self._bump_counters(conn, users_banned=1)
                 await conn.commit()
+                self._user_cache.invalidate(telegram_id)
+                self._sync_leaderboard(leaderboard_row)
                 return True
         except Exception as e:
             logger.error(f"Foydalanuvchi {telegram_id} bloklanishida xato: {e}")
@@ -257,11 +778,17 @@ class Database:
     async def unban_user(self, telegram_id: int) -> bool:
         """Foydalanuvchini blokdan chiqarish"""
         try:
-            async with self._get_connection() as conn:
-                await conn.execute("""
-                    UPDATE users SET is_banned = 0 WHERE telegram_id = ?
+            async with self._get_connection("unban_user") as conn:
+                cursor = await conn.execute("""
+                    UPDATE users SET is_banned = 0, version = version + 1 WHERE telegram_id = ? AND IFNULL(is_banned, 0) = 1
+                    RETURNING telegram_id, stars, is_verified, is_banned
                 """, (telegram_id,))
+                leaderboard_row = await cursor.fetchone()
+                if leaderboard_row:
+                    await self._bump_counters(conn, users_banned=-1)
                 await conn.commit()
+                self._user_cache.invalidate(telegram_id)
+                self._sync_leaderboard(leaderboard_row)
                 return True
         except Exception as e:
             logger.error(f"Foydalanuvchi {telegram_id} blokdan chiqarishda xato: {e}")
@@ -269,135 +796,280 @@ class Database:
 
     # === O'YIN OPERATSIYALARI ===
 
-    async def record_game_result(self, telegram_id: int, symbols: str, won: bool, stars_won: int = 0) -> bool:
-        """O'yin natijasini qayd qilish"""
+    async def record_game_result(self, telegram_id: int, reels: Reels, won: bool, stars_won: int = 0) -> bool:
+        """O'yin natijasini qayd qilish (reels - bot.reel_codec kodi yoki emoji)"""
         try:
-            async with self._get_connection() as conn:
-                # O'yin tarixiga qo'shish
-                await conn.execute("""
-                    INSERT INTO game_history (telegram_id, symbols, win_amount, is_win)
-                    VALUES (?, ?, ?, ?)
-                """, (telegram_id, symbols, stars_won, won))
-                
-                # Foydalanuvchi statistikasini yangilash
-                if won:
-                    await conn.execute("""
-                        UPDATE users 
-                        SET wins = wins + 1, total_spins = total_spins + 1, 
-                            stars = stars + ?, attempts = attempts - 1,
-                            biggest_win = MAX(biggest_win, ?)
-                        WHERE telegram_id = ?
-                    """, (stars_won, stars_won, telegram_id))
-                else:
-                    await conn.execute("""
-                        UPDATE users 
-                        SET losses = losses + 1, total_spins = total_spins + 1,
-                            attempts = attempts - 1
-                        WHERE telegram_id = ?
+            reels = to_code(reels)
+            if self._write_buffer is not None:
+                # Urinish execute_spin dagidek darhol shartli ayiriladi - bufer faqat natijani yozadi
+                async with self._get_connection("record_game_result") as conn:
+                    cursor = await conn.execute("""
+                        UPDATE users SET attempts = attempts - 1, version = version + 1
+                        WHERE telegram_id = ? AND attempts > 0
+                        RETURNING telegram_id
                     """, (telegram_id,))
-                
-                await conn.commit()
+                    spent = await cursor.fetchone()
+                    await conn.commit()
+                if not spent:
+                    logger.warning(f"O'yin natijasi qayd qilinmadi {telegram_id}: urinish qolmagan")
+                    return False
+                self._user_cache.invalidate(telegram_id)
+                await self._write_buffer.add(telegram_id, reels, won, stars_won)
                 return True
+            
+            history_table = await self._history.ensure(self)
+            won_amount = stars_won if won else 0
+
+            async def write(conn: aiosqlite.Connection, row: Optional[aiosqlite.Row]):
+                leaderboard_row = None
+                if row is not None:
+                    # Foydalanuvchi statistikasi o'qilgan qatordan hisoblanadi
+                    cursor = await conn.execute("""
+                        UPDATE users 
+                        SET wins = ?, losses = ?, total_spins = ?, stars = ?, attempts = ?,
+                            biggest_win = ?, version = version + 1
+                        WHERE telegram_id = ? AND version = ?
+                        RETURNING telegram_id, stars, is_verified, is_banned
+                    """, ((row['wins'] or 0) + int(won), (row['losses'] or 0) + int(not won),
+                          (row['total_spins'] or 0) + 1, (row['stars'] or 0) + won_amount,
+                          (row['attempts'] or 0) - 1, max(row['biggest_win'] or 0, won_amount),
+                          telegram_id, row['version']))
+                    leaderboard_row = await cursor.fetchone()
+                    if leaderboard_row is None:
+                        return CONFLICT
+                    await self._bump_counters(
+                        conn, total_spins=1, total_wins=int(won), total_losses=int(not won),
+                        total_stars=won_amount, biggest_win=won_amount
+                    )
+                
+                # O'yin tarixiga qo'shish (joriy oy bo'lagiga)
+                await conn.execute(f"""
+                    INSERT INTO {history_table} (telegram_id, reels, win_amount, is_win)
+                    VALUES (?, ?, ?, ?)
+                """, (telegram_id, reels, stars_won, won))
+                await self._bump_counters(
+                    conn, history_games=1, history_wins=int(won), history_stars_won=won_amount
+                )
+                await self._bump_daily_stats(conn, [(telegram_id, 1, int(won), won_amount, won_amount)])
+                return leaderboard_row
+
+            leaderboard_row = await self._optimistic_write(
+                'record_game_result', telegram_id,
+                "wins, losses, total_spins, stars, attempts, biggest_win", write
+            )
+            if leaderboard_row is CONFLICT:
+                return False
+            self._user_cache.invalidate(telegram_id)
+            self._sync_leaderboard(leaderboard_row)
+            return True
         except Exception as e:
             logger.error(f"O'yin natijasi qayd qilishda xato {telegram_id}: {e}")
             return False
 
-    # === KUNLIK BONUS ===
+    async def execute_spin(self, telegram_id: int,
+                           play_round: PlayRound) -> Dict[str, Any]:
+        """
+        Bitta tranzaksiyada aylantirish: urinishni tekshirish va ayirish,
+        natijani hisoblash, qayd qilish va yangilangan foydalanuvchini qaytarish.
 
-    async def can_claim_daily_bonus(self, telegram_id: int) -> bool:
-        """Kunlik bonusni olish mumkinligini tekshirish"""
+        Urinish shartli UPDATE ... RETURNING bilan ayiriladi, shuning uchun
+        bir vaqtdagi ikki aylantirish oxirgi urinishni ikki marta sarflay olmaydi.
+        play_round(win_probability, user) -> (reels, is_winner, stars_won, extra_info)
+        """
         try:
-            user = await self.get_user(telegram_id)
-            if not user or not user.get('last_daily_bonus'):
-                return True
-            
-            last_bonus = datetime.fromisoformat(user['last_daily_bonus'])
-            now = datetime.now()
-            
-            return (now - last_bonus) >= DAILY_BONUS_COOLDOWN
+            await self._ensure_config()
+            history_table = await self._history.ensure(self)
+            async with self._get_connection("execute_spin") as conn:
+                try:
+                    cursor = await conn.execute("""
+                        UPDATE users SET attempts = attempts - 1, version = version + 1
+                        WHERE telegram_id = ? AND attempts > 0
+                        RETURNING *
+                    """, (telegram_id,))
+                    row = await cursor.fetchone()
+
+                    if not row:
+                        await conn.rollback()
+                        return {'success': False, 'reason': 'no_attempts'}
+                    self._user_cache.invalidate(telegram_id)
+
+                    win_probability = self._cached_win_probability()
+
+                    user_data = self._prepare_user_row(row)
+                    reels, is_winner, stars_won, extra_info = play_round(win_probability, user_data)
+                    reels_code = to_code(reels)
+
+                    buffered = self._write_buffer is not None
+                    if buffered:
+                        # Urinish allaqachon ayirildi - qolganini bufer guruhli yozadi
+                        await conn.commit()
+                        self._user_cache.put(telegram_id, dict(row))
+                    else:
+                        await conn.execute(f"""
+                            INSERT INTO {history_table} (telegram_id, reels, win_amount, is_win)
+                            VALUES (?, ?, ?, ?)
+                        """, (telegram_id, reels_code, stars_won, is_winner))
+
+                        cursor = await conn.execute("""
+                            UPDATE users
+                            SET wins = wins + ?, losses = losses + ?, total_spins = total_spins + 1,
+                                stars = stars + ?, biggest_win = MAX(biggest_win, ?),
+                                version = version + 1
+                            WHERE telegram_id = ?
+                            RETURNING *
+                        """, (int(is_winner), int(not is_winner), stars_won if is_winner else 0,
+                              stars_won if is_winner else 0, telegram_id))
+                        updated_row = await cursor.fetchone()
+                        won_amount = stars_won if is_winner else 0
+                        await self._bump_counters(
+                            conn, total_spins=1, total_wins=int(is_winner), total_losses=int(not is_winner),
+                            total_stars=won_amount, biggest_win=won_amount,
+                            history_games=1, history_wins=int(is_winner), history_stars_won=won_amount
+                        )
+                        await self._bump_daily_stats(
+                            conn, [(telegram_id, 1, int(is_winner), won_amount, won_amount)]
+                        )
+                        await conn.commit()
+                        self._user_cache.put(telegram_id, dict(updated_row))
+                        self._sync_leaderboard((telegram_id, updated_row['stars'],
+                                                updated_row['is_verified'], updated_row['is_banned']))
+                        updated_user = self._prepare_user_row(updated_row)
+                except Exception:
+                    await conn.rollback()
+                    raise
+
+            if buffered:
+                # Bufer to'lsa flush ni kutadi - flush esa yozuvchi ulanishni oladi,
+                # shuning uchun qo'shish ulanish bo'shagandan keyin
+                await self._write_buffer.add(telegram_id, reels_code, is_winner, stars_won)
+                updated_user = self._prepare_user_row(row)
+
+            return {
+                'success': True,
+                'user': updated_user,
+                'reels': reels,
+                'is_winner': is_winner,
+                'stars_won': stars_won,
+                'extra_info': extra_info,
+                'win_probability': win_probability
+            }
         except Exception as e:
-            logger.error(f"Kunlik bonus tekshirishda xato {telegram_id}: {e}")
-            return False
+            logger.error(f"Aylantirish tranzaksiyasida xato {telegram_id}: {e}")
+            return {'success': False, 'reason': 'error'}
+
+    # === KUNLIK BONUS ===
 
     async def claim_daily_bonus(self, telegram_id: int) -> bool:
-        """Kunlik bonusni olish"""
+        """
+        Kunlik bonusni olish. Muddat tekshiruvi va yozuv bitta shartli UPDATE da:
+        ikki tez bosishdan ikkinchisi versiya to'qnashuviga uchraydi, qayta
+        o'qilgan qatorda bonus allaqachon olingan bo'ladi.
+        """
+        async def write(conn: aiosqlite.Connection, row: Optional[aiosqlite.Row]):
+            leaderboard_row = None
+            if row is not None:
+                if not self._daily_bonus_due(row['last_daily_bonus']):
+                    return False
+                cursor = await conn.execute("""
+                    UPDATE users 
+                    SET stars = ?, last_daily_bonus = ?, version = version + 1
+                    WHERE telegram_id = ? AND version = ?
+                    RETURNING telegram_id, stars, is_verified, is_banned
+                """, ((row['stars'] or 0) + DAILY_BONUS_AMOUNT, datetime.now(), telegram_id, row['version']))
+                leaderboard_row = await cursor.fetchone()
+                if leaderboard_row is None:
+                    return CONFLICT
+                await self._bump_counters(conn, total_stars=DAILY_BONUS_AMOUNT)
+            
+            # Tranzaktsiyani qayd qilish
+            await conn.execute("""
+                INSERT INTO transactions 
+                (telegram_id, transaction_type, stars_amount, description)
+                VALUES (?, 'daily_bonus', ?, 'Kunlik bonus')
+            """, (telegram_id, DAILY_BONUS_AMOUNT))
+            return leaderboard_row or True
+
         try:
-            if not await self.can_claim_daily_bonus(telegram_id):
+            claimed = await self._optimistic_write(
+                'claim_daily_bonus', telegram_id, "stars, last_daily_bonus", write
+            )
+            if claimed is CONFLICT or claimed is False:
                 return False
-            
-            async with self._get_connection() as conn:
-                await conn.execute("""
-                    UPDATE users 
-                    SET stars = stars + ?, last_daily_bonus = ?
-                    WHERE telegram_id = ?
-                """, (DAILY_BONUS_AMOUNT, datetime.now(), telegram_id))
-                
-                # Tranzaktsiyani qayd qilish
-                await conn.execute("""
-                    INSERT INTO transactions 
-                    (telegram_id, transaction_type, stars_amount, description)
-                    VALUES (?, 'daily_bonus', ?, 'Kunlik bonus')
-                """, (telegram_id, DAILY_BONUS_AMOUNT))
-                
-                await conn.commit()
-                return True
+            self._user_cache.invalidate(telegram_id)
+            if claimed is not True:
+                self._sync_leaderboard(claimed)
+            return True
         except Exception as e:
             logger.error(f"Kunlik bonus olishda xato {telegram_id}: {e}")
             return False
 
-    async def get_next_daily_bonus_time(self, telegram_id: int) -> Optional[datetime]:
-        """Keyingi kunlik bonus vaqtini olish"""
-        try:
-            user = await self.get_user(telegram_id)
-            if not user or not user.get('last_daily_bonus'):
-                return None
-            
-            last_bonus = datetime.fromisoformat(user['last_daily_bonus'])
-            return last_bonus + DAILY_BONUS_COOLDOWN
-        except Exception as e:
-            logger.error(f"Keyingi bonus vaqti olishda xato {telegram_id}: {e}")
-            return None
-
     # === REFERAL TIZIMI ===
 
     async def add_referral(self, referrer_id: int, referred_id: int) -> bool:
         """Referal qo'shish"""
+        return await self._credit_referral(referrer_id, referred_id)
+
+    async def _credit_referral(self, referrer_id: int, referred_id: int,
+                               referrer_side: bool = True, referred_side: bool = True) -> bool:
+        """
+        Referal yozuvi va bonuslar - bitta tranzaksiyada. Shardlangan omborda
+        ikki foydalanuvchi turli fayllarda bo'lsa, har tomon o'z shardida
+        alohida yoziladi (referrer_side: referals qatori va taklif qiluvchi bonusi,
+        referred_side: taklif qilingan do'st bonusi).
+        """
         try:
-            async with self._get_connection() as conn:
-                # Referal jadvliga qo'shish
-                await conn.execute("""
-                    INSERT INTO referrals (referrer_id, referred_id)
-                    VALUES (?, ?)
-                """, (referrer_id, referred_id))
-                
-                # Referrer hisobini yangilash
-                await conn.execute("""
-                    UPDATE users 
-                    SET referral_count = referral_count + 1, stars = stars + ?
-                    WHERE telegram_id = ?
-                """, (REFERRAL_BONUS, referrer_id))
-                
-                # Referred foydalanuvchiga ham bonus berish
-                await conn.execute("""
-                    UPDATE users 
-                    SET stars = stars + ?
-                    WHERE telegram_id = ?
-                """, (REFERRAL_FRIEND_BONUS, referred_id))
+            async with self._get_connection("_credit_referral") as conn:
+                referrer_row = referred_row = None
+                if referrer_side:
+                    # Referal jadvliga qo'shish
+                    await conn.execute("""
+                        INSERT INTO referrals (referrer_id, referred_id)
+                        VALUES (?, ?)
+                    """, (referrer_id, referred_id))
+                    
+                    # Referrer hisobini yangilash
+                    cursor = await conn.execute("""
+                        UPDATE users 
+                        SET referral_count = referral_count + 1, stars = stars + ?, version = version + 1
+                        WHERE telegram_id = ?
+                        RETURNING telegram_id, stars, is_verified, is_banned
+                    """, (REFERRAL_BONUS, referrer_id))
+                    referrer_row = await cursor.fetchone()
+                    
+                    await conn.execute("""
+                        INSERT INTO transactions 
+                        (telegram_id, transaction_type, stars_amount, description)
+                        VALUES (?, 'referral_bonus', ?, 'Referal bonusi')
+                    """, (referrer_id, REFERRAL_BONUS))
                 
-                # Tranzaktsiyalarni qayd qilish
-                await conn.execute("""
-                    INSERT INTO transactions 
-                    (telegram_id, transaction_type, stars_amount, description)
-                    VALUES (?, 'referral_bonus', ?, 'Referal bonusi')
-                """, (referrer_id, REFERRAL_BONUS))
+                if referred_side:
+                    # Referred foydalanuvchiga ham bonus berish
+                    cursor = await conn.execute("""
+                        UPDATE users 
+                        SET stars = stars + ?, version = version + 1
+                        WHERE telegram_id = ?
+                        RETURNING telegram_id, stars, is_verified, is_banned
+                    """, (REFERRAL_FRIEND_BONUS, referred_id))
+                    referred_row = await cursor.fetchone()
+                    
+                    await conn.execute("""
+                        INSERT INTO transactions 
+                        (telegram_id, transaction_type, stars_amount, description)
+                        VALUES (?, 'friend_bonus', ?, 'Do''st bonusi')
+                    """, (referred_id, REFERRAL_FRIEND_BONUS))
                 
-                await conn.execute("""
-                    INSERT INTO transactions 
-                    (telegram_id, transaction_type, stars_amount, description)
-                    VALUES (?, 'friend_bonus', ?, 'Do''st bonusi')
-                """, (referred_id, REFERRAL_FRIEND_BONUS))
+                await self._bump_counters(
+                    conn, total_stars=(REFERRAL_BONUS if referrer_row else 0)
+                    + (REFERRAL_FRIEND_BONUS if referred_row else 0)
+                )
                 
                 await conn.commit()
+                self._user_cache.invalidate_many(
+                    telegram_id for telegram_id, side in ((referrer_id, referrer_side), (referred_id, referred_side))
+                    if side
+                )
+                self._sync_leaderboard(referrer_row)
+                self._sync_leaderboard(referred_row)
                 return True
         except Exception as e:
             logger.error(f"Referal qo'shishda xato {referrer_id} -> {referred_id}: {e}")
@@ -406,7 +1078,7 @@ class Database:
     async def get_referral_stats(self, telegram_id: int) -> Dict[str, int]:
         """Referal statistikasini olish"""
         try:
-            async with self._get_connection() as conn:
+            async with self._get_read_connection("get_referral_stats") as conn:
                 cursor = await conn.execute("""
                     SELECT referral_count FROM users WHERE telegram_id = ?
                 """, (telegram_id,))
@@ -425,59 +1097,226 @@ class Database:
 
     # === STATISTIKALAR ===
 
+    def _sync_leaderboard(self, row):
+        """Yozuvdan qaytgan (telegram_id, stars, is_verified, is_banned) qatorini reytingga berish"""
+        if row is None or not self._leaderboard.ready:
+            return
+        telegram_id, stars, is_verified, is_banned = row[0], row[1], row[2], row[3]
+        self._leaderboard.update(telegram_id, stars or 0, bool(is_verified) and not is_banned)
+
+    async def rebuild_leaderboard(self) -> int:
+        """Reytingni bazadan qaytadan qurish (ishga tushganda)"""
+        try:
+            async with self._get_read_connection("rebuild_leaderboard") as conn:
+                rows = []
+                async with conn.execute("""
+                    SELECT telegram_id, stars FROM users
+                    WHERE is_verified = 1 AND is_banned = 0
+                """) as cursor:
+                    async for row in cursor:
+                        rows.append((row[0], row[1]))
+            self._leaderboard.load(rows)
+            logger.info(f"Reyting qurildi: {len(self._leaderboard)} o'yinchi")
+            return len(self._leaderboard)
+        except Exception as e:
+            logger.error(f"Reytingni qurishda xato: {e}")
+            return 0
+
     async def get_leaderboard(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Eng boy foydalanuvchilar ro'yxati"""
         try:
-            async with self._get_connection() as conn:
-                conn.row_factory = aiosqlite.Row
-                cursor = await conn.execute("""
-                    SELECT username, first_name, stars, wins, total_spins, biggest_win
-                    FROM users 
-                    WHERE is_verified = 1 AND is_banned = 0
-                    ORDER BY stars DESC 
-                    LIMIT ?
-                """, (limit,))
-                rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
+            async with self._get_read_connection("get_leaderboard") as conn:
+                if not self._leaderboard.ready:
+                    cursor = await conn.execute("""
+                        SELECT telegram_id, username, first_name, stars, wins, total_spins, biggest_win
+                        FROM users 
+                        WHERE is_verified = 1 AND is_banned = 0
+                        ORDER BY stars DESC, telegram_id
+                        LIMIT ?
+                    """, (limit,))
+                    rows = await cursor.fetchall()
+                    return [dict(row) for row in rows]
+
+                # Top-K reytingdan, ma'lumotlar esa faqat shu K ta qator uchun
+                top_ids = [telegram_id for telegram_id, _ in self._leaderboard.top(limit)]
+                if not top_ids:
+                    return []
+                placeholders = ",".join("?" * len(top_ids))
+                cursor = await conn.execute(f"""
+                    SELECT telegram_id, username, first_name, stars, wins, total_spins, biggest_win
+                    FROM users WHERE telegram_id IN ({placeholders})
+                """, top_ids)
+                players = {row['telegram_id']: dict(row) for row in await cursor.fetchall()}
+                return [players[telegram_id] for telegram_id in top_ids if telegram_id in players]
         except Exception as e:
             logger.error(f"Leaderboard olishda xato: {e}")
             return []
 
-    async def get_total_stats(self) -> Dict[str, int]:
-        """Umumiy statistikalar"""
+    async def get_user_rank(self, telegram_id: int) -> Dict[str, Optional[int]]:
+        """Foydalanuvchi o'rni: {'rank': N, 'total': M} (reytingda bo'lmasa rank=None)"""
+        if not self._leaderboard.ready:
+            await self.rebuild_leaderboard()
+        return {
+            'rank': self._leaderboard.rank(telegram_id),
+            'total': len(self._leaderboard)
+        }
+
+    async def _bump_counters(self, conn: aiosqlite.Connection, **deltas: int):
+        """global_counters qatorini chaqiruvchining tranzaksiyasi ichida yangilash"""
+        biggest_win = deltas.pop('biggest_win', 0)
+        assignments = [f"{name} = {name} + ?" for name, delta in deltas.items() if delta]
+        params = [delta for delta in deltas.values() if delta]
+        if biggest_win:
+            assignments.append("biggest_win = MAX(biggest_win, ?)")
+            params.append(biggest_win)
+        if not assignments:
+            return
+        await conn.execute(
+            f"UPDATE global_counters SET {', '.join(assignments)} WHERE id = 1", params
+        )
+
+    async def _bump_daily_stats(self, conn: aiosqlite.Connection,
+                                rows: Sequence[Tuple[int, int, int, int, int]]):
+        """
+        user_daily_stats ga bugungi (UTC) o'zgarishlarni chaqiruvchining tranzaksiyasi
+        ichida qo'shish. rows: (telegram_id, spins, wins, stars_won, max_win)
+        """
+        await conn.executemany(f"""
+            INSERT INTO user_daily_stats (telegram_id, day, spins, wins, stars_won, max_win)
+            VALUES (?, date('now'), ?, ?, ?, ?)
+            {DAILY_STATS_MERGE}
+        """, rows)
+
+    async def rebuild_daily_stats(self) -> int:
+        """
+        Kunlik yig'indini butun o'yin tarixidan qayta qurish (import yoki qo'lda
+        tuzatishdan keyin). Yozuvchi butun qurish davomida ushlanadi - yangi
+        aylantirishlar ikki marta hisoblanmaydi. Qaytariladi: qatorlar soni, xato bo'lsa -1.
+        """
         try:
-            async with self._get_connection() as conn:
-                cursor = await conn.execute("""
-                    SELECT 
-                        COUNT(*) as total_users,
-                        SUM(total_spins) as total_spins,
-                        SUM(wins) as total_wins,
-                        SUM(losses) as total_losses,
-                        SUM(stars) as total_stars,
-                        MAX(biggest_win) as biggest_win,
-                        COUNT(CASE WHEN is_banned = 1 THEN 1 END) as banned_users
-                    FROM users 
-                    WHERE is_verified = 1
-                """)
+            if self._write_buffer is not None:
+                await self._write_buffer.flush()
+            started = time.perf_counter()
+            async with self._get_connection("rebuild_daily_stats") as conn:
+                try:
+                    rows = await rebuild_daily_stats(conn)
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+            logger.info(f"Kunlik yig'indi qayta qurildi ({time.perf_counter() - started:.2f}s)")
+            return rows
+        except Exception as e:
+            logger.error(f"Kunlik yig'indini qayta qurishda xato: {e}")
+            return -1
+
+    async def get_daily_stats(self, days: int = 7, telegram_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Oxirgi days kun (bugun ham) bo'yicha yig'indi, yangidan eskiga:
+        [{'day', 'players', 'spins', 'wins', 'stars_won', 'max_win'}].
+        telegram_id berilsa - faqat shu foydalanuvchi.
+        """
+        try:
+            where = "day >= date('now', ?)"
+            params: List[Any] = [f"-{max(int(days), 1) - 1} days"]
+            if telegram_id is not None:
+                where += " AND telegram_id = ?"
+                params.append(telegram_id)
+            async with self._get_read_connection("get_daily_stats") as conn:
+                cursor = await conn.execute(f"""
+                    SELECT day, COUNT(*) AS players, SUM(spins) AS spins, SUM(wins) AS wins,
+                           SUM(stars_won) AS stars_won, MAX(max_win) AS max_win
+                    FROM user_daily_stats
+                    WHERE {where}
+                    GROUP BY day
+                    ORDER BY day DESC
+                """, params)
+                return [dict(row) for row in await cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Kunlik statistikani olishda xato: {e}")
+            return []
+
+    async def get_global_counters(self) -> Dict[str, Any]:
+        """global_counters qatorini o'qish (bitta qator, jadval hajmiga bog'liq emas)"""
+        try:
+            async with self._get_read_connection("get_global_counters") as conn:
+                cursor = await conn.execute("SELECT * FROM global_counters WHERE id = 1")
                 row = await cursor.fetchone()
-                return {
-                    'total_users': row[0] or 0,
-                    'total_spins': row[1] or 0,
-                    'total_wins': row[2] or 0,
-                    'total_losses': row[3] or 0,
-                    'total_stars': row[4] or 0,
-                    'biggest_win': row[5] or 0,
-                    'banned_users': row[6] or 0
-                }
+                return dict(row) if row else {}
         except Exception as e:
-            logger.error(f"Umumiy statistikalar olishda xato: {e}")
+            logger.error(f"Umumiy hisoblagichlarni olishda xato: {e}")
+            return {}
+
+    async def reconcile_global_counters(self) -> Dict[str, int]:
+        """
+        Hisoblagichlarni jadvallardan qaytadan hisoblash.
+        Qaytariladi: farq qilgan hisoblagichlar {nom: yangi - eski}.
+        """
+        try:
+            async with self._get_connection("reconcile_global_counters") as conn:
+                # Yozuvchi qulfini darhol olish - hisoblash va yozish orasida o'zgarish bo'lmasin
+                await conn.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor = await conn.execute("SELECT * FROM global_counters WHERE id = 1")
+                    old = await cursor.fetchone()
+                    old = dict(old) if old else {}
+
+                    cursor = await conn.execute("""
+                        SELECT COUNT(*) AS users_total,
+                               COUNT(CASE WHEN is_verified = 1 THEN 1 END) AS users_verified,
+                               COUNT(CASE WHEN is_banned = 1 THEN 1 END) AS users_banned,
+                               COUNT(CASE WHEN channel_subscribed = 1 THEN 1 END) AS users_subscribed,
+                               IFNULL(SUM(total_spins), 0) AS total_spins,
+                               IFNULL(SUM(wins), 0) AS total_wins,
+                               IFNULL(SUM(losses), 0) AS total_losses,
+                               IFNULL(SUM(stars), 0) AS total_stars,
+                               IFNULL(MAX(biggest_win), 0) AS biggest_win
+                        FROM users
+                    """)
+                    fresh = dict(await cursor.fetchone())
+
+                    cursor = await conn.execute("""
+                        SELECT COUNT(*) AS history_games,
+                               COUNT(CASE WHEN is_win THEN 1 END) AS history_wins,
+                               IFNULL(SUM(CASE WHEN is_win THEN win_amount ELSE 0 END), 0) AS history_stars_won
+                        FROM game_history_all
+                    """)
+                    fresh.update(dict(await cursor.fetchone()))
+
+                    cursor = await conn.execute("""
+                        SELECT COUNT(*) AS purchases, IFNULL(SUM(stars_amount), 0) AS purchased_stars
+                        FROM transactions WHERE transaction_type = 'purchase'
+                    """)
+                    fresh.update(dict(await cursor.fetchone()))
+
+                    columns = list(fresh)
+                    await conn.execute(f"""
+                        INSERT OR REPLACE INTO global_counters (id, {', '.join(columns)}, reconciled_at)
+                        VALUES (1, {', '.join('?' * len(columns))}, ?)
+                    """, [fresh[name] for name in columns] + [datetime.now()])
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+
+            drift = {
+                name: value - (old.get(name) or 0)
+                for name, value in fresh.items()
+                if value != (old.get(name) or 0)
+            }
+            if drift:
+                logger.warning(f"Umumiy hisoblagichlar tuzatildi: {drift}")
+            else:
+                logger.info("Umumiy hisoblagichlar to'g'ri")
+            return drift
+        except Exception as e:
+            logger.error(f"Umumiy hisoblagichlarni qayta hisoblashda xato: {e}")
             return {}
 
     async def get_all_users(self) -> List[Dict[str, Any]]:
         """Barcha foydalanuvchilar ro'yxati (admin uchun)"""
         try:
-            async with self._get_connection() as conn:
-                conn.row_factory = aiosqlite.Row
+            async with self._get_read_connection("get_all_users") as conn:
                 cursor = await conn.execute("""
                     SELECT telegram_id, username, first_name, stars, attempts, 
                            total_spins, wins, losses, is_banned, reg_date
@@ -491,6 +1330,108 @@ class Database:
             logger.error(f"Barcha foydalanuvchilar ro'yxatini olishda xato: {e}")
             return []
 
+    async def iter_users(self, batch_size: int = 1000, verified_only: bool = True,
+                         columns: Sequence[str] = ('telegram_id', 'username', 'first_name',
+                                                   'channel_subscribed', 'is_banned')
+                         ) -> AsyncIterator[aiosqlite.Row]:
+        """
+        Foydalanuvchilarni telegram_id bo'yicha sahifalab (keyset, OFFSETsiz) qaytarish.
+
+        Xotirada bir vaqtda faqat bitta sahifa turadi, ulanish esa faqat sahifa
+        o'qilayotganda band bo'ladi - sekin iste'molchilar pulni ushlab turmaydi.
+        verified_only - faqat tasdiqlangan foydalanuvchilar.
+        """
+        query = f"""
+            SELECT {', '.join(columns)} FROM users
+            WHERE {'is_verified = 1 AND ' if verified_only else ''}telegram_id > ?
+            ORDER BY telegram_id
+            LIMIT ?
+        """
+        last_id = None
+        while True:
+            try:
+                async with self._get_read_connection("iter_users") as conn:
+                    cursor = await conn.execute(
+                        query, (last_id if last_id is not None else -2 ** 63, batch_size)
+                    )
+                    rows = await cursor.fetchall()
+            except Exception as e:
+                logger.error(f"Foydalanuvchilarni sahifalab o'qishda xato (oxirgi ID {last_id}): {e}")
+                return
+
+            for row in rows:
+                yield row
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1]['telegram_id']
+
+    # === TO'LOVLAR ===
+
+    async def credit_payment(self, telegram_id: int, charge_id: str, attempts: int, total_amount: int,
+                             currency: str = "XTR", payload: Optional[str] = None,
+                             provider_charge_id: Optional[str] = None,
+                             description: Optional[str] = None) -> Dict[str, Any]:
+        """
+        To'lovni bir marta hisobga yozish (telegram_payment_charge_id bo'yicha).
+
+        payments qatori, urinishlar, 'purchase' tranzaksiyasi va hisoblagichlar
+        bitta tranzaksiyada yoziladi - oraliqda uzilish daftarni yo'qotmaydi.
+        Qayta yetkazilgan yangilanish avval o'quvchida tekshiriladi va yozuvchini
+        olmaydi; bir vaqtdagi ikki yetkazish noyob indeksda to'xtaydi.
+        Qaytariladi: {'success', 'duplicate', 'user'} yoki {'success': False, 'reason'}.
+        """
+        try:
+            async with self._get_read_connection("credit_payment") as conn:
+                cursor = await conn.execute(
+                    "SELECT 1 FROM payments WHERE telegram_payment_charge_id = ?", (charge_id,)
+                )
+                if await cursor.fetchone():
+                    logger.info(f"To'lov {charge_id} allaqachon hisobga yozilgan ({telegram_id})")
+                    return {'success': True, 'duplicate': True}
+
+            async with self._get_connection("credit_payment") as conn:
+                try:
+                    cursor = await conn.execute("""
+                        INSERT INTO payments (telegram_payment_charge_id, provider_payment_charge_id,
+                                              telegram_id, currency, total_amount, attempts_amount, payload)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (telegram_payment_charge_id) DO NOTHING
+                        RETURNING id
+                    """, (charge_id, provider_charge_id, telegram_id, currency, total_amount, attempts, payload))
+                    if not await cursor.fetchone():
+                        await conn.rollback()
+                        logger.info(f"To'lov {charge_id} allaqachon hisobga yozilgan ({telegram_id})")
+                        return {'success': True, 'duplicate': True}
+
+                    cursor = await conn.execute("""
+                        UPDATE users SET attempts = attempts + ?, version = version + 1
+                        WHERE telegram_id = ?
+                        RETURNING *
+                    """, (attempts, telegram_id))
+                    row = await cursor.fetchone()
+                    if not row:
+                        # Daftarga yozilmaydi - foydalanuvchi paydo bo'lgach qayta yetkazish hisobga oladi
+                        await conn.rollback()
+                        logger.error(f"To'lov {charge_id}: foydalanuvchi {telegram_id} topilmadi")
+                        return {'success': False, 'reason': 'no_user'}
+
+                    await conn.execute("""
+                        INSERT INTO transactions
+                        (telegram_id, transaction_type, stars_amount, attempts_amount, description)
+                        VALUES (?, 'purchase', ?, ?, ?)
+                    """, (telegram_id, total_amount, attempts, description))
+                    await self._bump_counters(conn, purchases=1, purchased_stars=total_amount)
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+
+            self._user_cache.put(telegram_id, dict(row))
+            return {'success': True, 'duplicate': False, 'user': self._prepare_user_row(row)}
+        except Exception as e:
+            logger.error(f"To'lov {charge_id} ni hisobga yozishda xato {telegram_id}: {e}")
+            return {'success': False, 'reason': 'error'}
+
     # === TRANZAKTSIYALAR ===
 
     async def add_transaction(self, telegram_id: int, transaction_type: str, 
@@ -498,12 +1439,14 @@ class Database:
                            description: str = None) -> bool:
         """Tranzaktsiya qo'shish"""
         try:
-            async with self._get_connection() as conn:
+            async with self._get_connection("add_transaction") as conn:
                 await conn.execute("""
                     INSERT INTO transactions 
                     (telegram_id, transaction_type, stars_amount, attempts_amount, description)
                     VALUES (?, ?, ?, ?, ?)
                 """, (telegram_id, transaction_type, stars_amount, attempts_amount, description))
+                if transaction_type == 'purchase':
+                    await self._bump_counters(conn, purchases=1, purchased_stars=stars_amount)
                 await conn.commit()
                 return True
         except Exception as e:
@@ -512,13 +1455,76 @@ class Database:
 
     # === KONFIGURATSIYA ===
 
+    async def _load_config(self):
+        """config jadvalini xotiradagi nusxaga yuklash"""
+        async with self._get_read_connection("_load_config") as conn:
+            cursor = await conn.execute("SELECT key, value FROM config")
+            rows = await cursor.fetchall()
+        self._config.replace({row[0]: row[1] for row in rows})
+
+    async def _ensure_config(self):
+        """Konfiguratsiya nusxasi yuklanmagan bo'lsa yuklash (faqat birinchi marta I/O)"""
+        if not self._config.loaded:
+            await self._load_config()
+
+    def _cached_win_probability(self) -> float:
+        """G'alaba ehtimolini nusxadan o'qish (I/O siz)"""
+        try:
+            return float(self._config.get('win_probability', str(DEFAULT_WIN_PROBABILITY)))
+        except ValueError:
+            return DEFAULT_WIN_PROBABILITY
+
+    async def start_config_watcher(self, interval: float = 5.0):
+        """
+        Boshqa jarayon config ni o'zgartirganini config_version qatori orqali
+        kuzatish. Uni faqat config jadvalidagi triggerlar oshiradi (migratsiya 13),
+        shuning uchun o'yin yozuvlari nusxani qayta yuklatmaydi - har tekshiruv
+        o'quvchi puldan bitta qator o'qish.
+        """
+        if self._config_watcher_task is not None:
+            return
+        try:
+            self._config.version = await self._read_config_version()
+            await self._load_config()
+            self._config_watcher_task = asyncio.create_task(self._config_watch_loop(interval))
+            logger.info(f"Konfiguratsiya kuzatuvchisi ishga tushdi ({interval}s)")
+        except Exception as e:
+            logger.error(f"Konfiguratsiya kuzatuvchisini ishga tushirishda xato: {e}")
+
+    async def _read_config_version(self) -> int:
+        async with self._get_read_connection("_read_config_version") as conn:
+            cursor = await conn.execute("SELECT version FROM config_version WHERE id = 1")
+            row = await cursor.fetchone()
+        return row[0] if row else 0
+
+    async def _config_watch_loop(self, interval: float):
+        """config_version o'zgarsa config nusxasini qayta yuklash"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                version = await self._read_config_version()
+                if version != self._config.version:
+                    # Versiya yuklashdan oldin yoziladi - orada kelgan o'zgarish keyingi tekshiruvda olinadi
+                    self._config.version = version
+                    await self._load_config()
+            except Exception as e:
+                logger.error(f"Konfiguratsiyani qayta yuklashda xato: {e}")
+
+    async def stop_config_watcher(self):
+        """Konfiguratsiya kuzatuvchisini to'xtatish"""
+        if self._config_watcher_task is not None:
+            self._config_watcher_task.cancel()
+            try:
+                await self._config_watcher_task
+            except asyncio.CancelledError:
+                pass
+            self._config_watcher_task = None
+
     async def get_win_probability(self) -> float:
-        """G'alaba ehtimolini olish"""
+        """G'alaba ehtimolini olish (xotiradagi nusxadan)"""
         try:
-            async with self._get_connection() as conn:
-                cursor = await conn.execute("SELECT value FROM config WHERE key = 'win_probability'")
-                row = await cursor.fetchone()
-                return float(row[0]) if row else DEFAULT_WIN_PROBABILITY
+            await self._ensure_config()
+            return self._cached_win_probability()
         except Exception as e:
             logger.error(f"G'alaba ehtimolini olishda xato: {e}")
             return DEFAULT_WIN_PROBABILITY
@@ -530,12 +1536,13 @@ class Database:
                 logger.error(f"Noto'g'ri g'alaba ehtimoli: {probability}")
                 return False
                 
-            async with self._get_connection() as conn:
+            async with self._get_connection("set_win_probability") as conn:
                 await conn.execute("""
                     INSERT OR REPLACE INTO config (key, value, updated_at) 
                     VALUES ('win_probability', ?, CURRENT_TIMESTAMP)
                 """, (str(probability),))
                 await conn.commit()
+                self._config.set('win_probability', str(probability))
                 logger.info(f"G'alaba ehtimoli yangilandi: {probability}")
                 return True
         except Exception as e:
@@ -543,12 +1550,10 @@ class Database:
             return False
 
     async def get_config_value(self, key: str, default: str = "") -> str:
-        """Konfiguratsiya qiymatini olish"""
+        """Konfiguratsiya qiymatini olish (xotiradagi nusxadan)"""
         try:
-            async with self._get_connection() as conn:
-                cursor = await conn.execute("SELECT value FROM config WHERE key = ?", (key,))
-                row = await cursor.fetchone()
-                return row[0] if row else default
+            await self._ensure_config()
+            return self._config.get(key, default)
         except Exception as e:
             logger.error(f"Konfiguratsiya qiymatini olishda xato: {e}")
             return default
@@ -556,12 +1561,13 @@ class Database:
     async def set_config_value(self, key: str, value: str) -> bool:
         """Konfiguratsiya qiymatini o'rnatish"""
         try:
-            async with self._get_connection() as conn:
+            async with self._get_connection("set_config_value") as conn:
                 await conn.execute("""
                     INSERT OR REPLACE INTO config (key, value, updated_at) 
                     VALUES (?, ?, CURRENT_TIMESTAMP)
                 """, (key, value))
                 await conn.commit()
+                self._config.set(key, value)
                 logger.info(f"Konfiguratsiya yangilandi: {key} = {value}")
                 return True
         except Exception as e:
@@ -571,13 +1577,12 @@ class Database:
     async def get_user_statistics(self, telegram_id: int) -> Optional[Dict[str, Any]]:
         """Foydalanuvchi statistikalarini olish"""
         try:
-            async with self._get_connection() as conn:
-                conn.row_factory = aiosqlite.Row
+            async with self._get_read_connection("get_user_statistics") as conn:
                 
                 # Asosiy ma'lumotlar
                 cursor = await conn.execute("""
-                    SELECT username, first_name, balance, total_spins, total_wins, total_losses,
-                           daily_streak, created_at
+                    SELECT username, first_name, stars, total_spins, wins AS total_wins,
+                           losses AS total_losses, daily_streak, reg_date
                     FROM users WHERE telegram_id = ?
                 """, (telegram_id,))
                 user_row = await cursor.fetchone()
@@ -585,23 +1590,24 @@ class Database:
                 if not user_row:
                     return None
                 
-                # O'yin tarixi statistikasi
+                # O'yin statistikasi - oxirgi oylar kunlik yig'indisidan (xom tarix o'qilmaydi)
                 cursor = await conn.execute("""
-                    SELECT COUNT(*) as total_games,
-                           SUM(CASE WHEN is_winner THEN 1 ELSE 0 END) as wins,
-                           SUM(CASE WHEN NOT is_winner THEN 1 ELSE 0 END) as losses,
-                           SUM(stars_won) as total_stars_won,
-                           MAX(stars_won) as biggest_win
-                    FROM game_history WHERE user_id = ?
-                """, (telegram_id,))
+                    SELECT IFNULL(SUM(spins), 0) AS total_games,
+                           SUM(wins) AS wins,
+                           SUM(spins - wins) AS losses,
+                           SUM(stars_won) AS total_stars_won,
+                           MAX(max_win) AS biggest_win
+                    FROM user_daily_stats
+                    WHERE telegram_id = ? AND day >= ?
+                """, (telegram_id, HistoryPartitions.window_start(GAME_HISTORY_STATS_MONTHS)))
                 stats_row = await cursor.fetchone()
                 
                 # Tranzaktsiya statistikasi
                 cursor = await conn.execute("""
                     SELECT COUNT(*) as total_transactions,
-                           SUM(CASE WHEN transaction_type = 'purchase' THEN amount ELSE 0 END) as total_purchased,
-                           SUM(CASE WHEN transaction_type = 'daily_bonus' THEN amount ELSE 0 END) as total_bonuses
-                    FROM transactions WHERE user_id = ?
+                           SUM(CASE WHEN transaction_type = 'purchase' THEN stars_amount ELSE 0 END) as total_purchased,
+                           SUM(CASE WHEN transaction_type = 'daily_bonus' THEN stars_amount ELSE 0 END) as total_bonuses
+                    FROM transactions WHERE telegram_id = ?
                 """, (telegram_id,))
                 trans_row = await cursor.fetchone()
                 
@@ -615,79 +1621,43 @@ class Database:
             logger.error(f"Foydalanuvchi statistikalarini olishda xato: {e}")
             return None
 
-    async def get_leaderboard(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Eng yaxshi o'yinchilar ro'yxati"""
+    async def cleanup_old_data(self, days: Optional[int] = None,
+                               progress: Optional[ProgressCallback] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Eski ma'lumotlarni retention qoidalari bo'yicha bo'laklab tozalash.
+        days berilsa, barcha jadvallar uchun shu muddat ishlatiladi.
+        Qaytariladi: {jadval: {'deleted', 'archive', 'seconds'}}, xato bo'lsa {}.
+        """
         try:
-            async with self._get_connection() as conn:
-                conn.row_factory = aiosqlite.Row
-                cursor = await conn.execute("""
-                    SELECT username, first_name, balance, total_wins, total_spins,
-                           (CAST(total_wins AS FLOAT) / NULLIF(total_spins, 0) * 100) as win_rate
-                    FROM users 
-                    WHERE is_verified = 1 AND is_banned = 0 AND total_spins > 0
-                    ORDER BY balance DESC, win_rate DESC
-                    LIMIT ?
-                """, (limit,))
-                
-                rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
-                
-        except Exception as e:
-            logger.error(f"Leaderboard olishda xato: {e}")
-            return []
-
-    async def cleanup_old_data(self, days: int = 30) -> bool:
-        """Eski ma'lumotlarni tozalash"""
-        try:
-            async with self._get_connection() as conn:
-                cutoff_date = datetime.now() - timedelta(days=days)
-                
-                # Eski o'yin tarixini tozalash
-                await conn.execute("""
-                    DELETE FROM game_history 
-                    WHERE timestamp < ?
-                """, (cutoff_date.isoformat(),))
-                
-                # Eski tranzaktsiyalarni tozalash
-                await conn.execute("""
-                    DELETE FROM transactions 
-                    WHERE timestamp < ?
-                """, (cutoff_date.isoformat(),))
-                
-                await conn.commit()
-                logger.info(f"{days} kundan eski ma'lumotlar tozalandi")
-                return True
-                
+            report = await self._retention.run(progress, days)
+            logger.info(f"Eski ma'lumotlar tozalandi: {report}")
+            return report
         except Exception as e:
             logger.error(f"Eski ma'lumotlarni tozalashda xato: {e}")
-            return False
+            return {}
 
     async def get_database_stats(self) -> Dict[str, Any]:
         """Ma'lumotlar bazasi statistikasi"""
         try:
-            async with self._get_connection() as conn:
+            async with self._get_read_connection("get_database_stats") as conn:
                 stats = {}
                 
-                # Foydalanuvchilar statistikasi
-                cursor = await conn.execute("""
-                    SELECT COUNT(*) as total_users,
-                           COUNT(CASE WHEN is_verified = 1 THEN 1 END) as verified_users,
-                           COUNT(CASE WHEN is_banned = 1 THEN 1 END) as banned_users,
-                           COUNT(CASE WHEN channel_subscribed = 1 THEN 1 END) as subscribed_users
-                    FROM users
-                """)
-                user_stats = await cursor.fetchone()
-                stats.update(dict(zip(['total_users', 'verified_users', 'banned_users', 'subscribed_users'], user_stats)))
-                
-                # O'yin statistikasi
-                cursor = await conn.execute("""
-                    SELECT COUNT(*) as total_games,
-                           SUM(CASE WHEN is_winner THEN 1 ELSE 0 END) as total_wins,
-                           AVG(stars_won) as avg_stars_won
-                    FROM game_history
-                """)
-                game_stats = await cursor.fetchone()
-                stats.update(dict(zip(['total_games', 'total_wins', 'avg_stars_won'], game_stats)))
+                # Foydalanuvchi va o'yin statistikasi - global_counters dan
+                cursor = await conn.execute("SELECT * FROM global_counters WHERE id = 1")
+                counters = await cursor.fetchone()
+                if counters:
+                    stats.update({
+                        'total_users': counters['users_total'],
+                        'verified_users': counters['users_verified'],
+                        'banned_users': counters['users_banned'],
+                        'subscribed_users': counters['users_subscribed'],
+                        'total_games': counters['history_games'],
+                        'total_wins': counters['history_wins'],
+                        'avg_stars_won': (
+                            counters['history_stars_won'] / counters['history_games']
+                            if counters['history_games'] else None
+                        )
+                    })
                 
                 # Ma'lumotlar bazasi hajmi
                 cursor = await conn.execute("PRAGMA page_count")
@@ -707,21 +1677,64 @@ class Database:
     async def set_channel_subscription(self, telegram_id: int, subscribed: bool = True) -> bool:
         """Foydalanuvchining kanal obunasini belgilash"""
         try:
-            async with self._get_connection() as conn:
-                await conn.execute("""
-                    UPDATE users SET channel_subscribed = ? WHERE telegram_id = ?
-                """, (subscribed, telegram_id))
+            async with self._get_connection("set_channel_subscription") as conn:
+                cursor = await conn.execute("""
+                    UPDATE users SET channel_subscribed = ?, version = version + 1
+                    WHERE telegram_id = ? AND IFNULL(channel_subscribed, 0) != ?
+                """, (subscribed, telegram_id, subscribed))
+                if cursor.rowcount > 0:
+                    await self._bump_counters(conn, users_subscribed=1 if subscribed else -1)
                 await conn.commit()
+                self._user_cache.invalidate(telegram_id)
                 logger.info(f"Foydalanuvchi {telegram_id} kanal obunasi: {subscribed}")
                 return True
         except Exception as e:
             logger.error(f"Foydalanuvchi {telegram_id} kanal obunasini belgilashda xato: {e}")
             return False
 
+    async def set_channel_subscriptions(self, changes: Iterable[Tuple[int, bool]],
+                                        batch_size: int = 500) -> int:
+        """
+        Ko'p foydalanuvchining kanal obunasini executemany bilan yozish.
+        Har batch_size ta o'zgarish bitta tranzaksiyada. Qaytariladi: o'zgargan qatorlar soni.
+        """
+        changes = list(changes)
+        updated = 0
+        for start in range(0, len(changes), batch_size):
+            chunk = changes[start:start + batch_size]
+            subscribed = [(True, telegram_id, True) for telegram_id, status in chunk if status]
+            unsubscribed = [(False, telegram_id, False) for telegram_id, status in chunk if not status]
+            try:
+                async with self._get_connection("set_channel_subscriptions") as conn:
+                    try:
+                        changed = 0
+                        delta = 0
+                        for rows, sign in ((subscribed, 1), (unsubscribed, -1)):
+                            if not rows:
+                                continue
+                            cursor = await conn.executemany("""
+                                UPDATE users SET channel_subscribed = ?, version = version + 1
+                                WHERE telegram_id = ? AND IFNULL(channel_subscribed, 0) != ?
+                            """, rows)
+                            changed += max(cursor.rowcount, 0)
+                            delta += sign * max(cursor.rowcount, 0)
+                        await self._bump_counters(conn, users_subscribed=delta)
+                        await conn.commit()
+                    except Exception:
+                        await conn.rollback()
+                        raise
+                self._user_cache.invalidate_many(telegram_id for telegram_id, _ in chunk)
+                updated += changed
+            except Exception as e:
+                logger.error(f"Kanal obunalarini guruhlab yozishda xato ({len(chunk)} ta): {e}")
+        if updated:
+            logger.info(f"{updated} ta foydalanuvchining kanal obunasi yangilandi")
+        return updated
+
     async def is_channel_subscribed(self, telegram_id: int) -> bool:
         """Foydalanuvchi kanal obunasi holatini tekshirish"""
         try:
-            async with self._get_connection() as conn:
+            async with self._get_read_connection("is_channel_subscribed") as conn:
                 cursor = await conn.execute("""
                     SELECT channel_subscribed FROM users WHERE telegram_id = ?
                 """, (telegram_id,))
@@ -734,60 +1747,54 @@ class Database:
             logger.error(f"Foydalanuvchi {telegram_id} kanal obunasini tekshirishda xato: {e}")
             return False
 
-    async def migrate_database(self, db):
-        """Database migration - add missing columns and handle schema changes"""
-        try:
-            # Check if channel_subscribed column exists
-            cursor = await db.execute("PRAGMA table_info(users)")
-            columns = [row[1] for row in await cursor.fetchall()]
-            
-            # Add missing columns
-            if 'channel_subscribed' not in columns:
-                await db.execute("ALTER TABLE users ADD COLUMN channel_subscribed BOOLEAN DEFAULT 0")
-                logger.info("Added channel_subscribed column")
-            
-            if 'daily_streak' not in columns:
-                await db.execute("ALTER TABLE users ADD COLUMN daily_streak INTEGER DEFAULT 0")
-                logger.info("Added daily_streak column")
-            
-            # Check config table structure and migrate if needed
-            cursor = await db.execute("PRAGMA table_info(config)")
-            config_columns = [row[1] for row in await cursor.fetchall()]
-            
-            if 'key' not in config_columns and 'id' in config_columns:
-                # Old schema exists, migrate to new schema
-                logger.info("Migrating config table from old to new schema")
-                
-                # Get existing win_probability value
-                cursor = await db.execute("SELECT win_probability FROM config WHERE id = 1")
-                row = await cursor.fetchone()
-                old_win_probability = row[0] if row else DEFAULT_WIN_PROBABILITY
-                
-                # Drop old table and create new one
-                await db.execute("DROP TABLE config")
-                await db.execute("""
-                    CREATE TABLE config (
-                        key TEXT PRIMARY KEY,
-                        value TEXT,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                # Insert migrated data
-                await db.execute("""
-                    INSERT INTO config (key, value) VALUES 
-                    ('win_probability', ?),
-                    ('daily_bonus_amount', '5'),
-                    ('referral_bonus', '10'),
-                    ('min_payment_amount', '50'),
-                    ('max_payment_amount', '10000')
-                """, (str(old_win_probability),))
-                
-                logger.info("Config table migration completed")
-            
-            await db.commit()
-            logger.info("Database migration completed successfully")
-            
-        except Exception as e:
-            logger.error(f"Database migration error: {e}")
-            # Continue even if migration fails
+
+# === JARAYON BO'YICHA YAGONA NUSXALAR ===
+
+_database_registry: Dict[str, Storage] = {}
+
+STORAGE_ENGINES = {
+    'sqlite': Database,
+    'memory': MemoryDatabase
+}
+
+
+def get_database(db_path: str = DATABASE_PATH, max_connections: Optional[int] = None,
+                 backend: Optional[str] = None, shard_count: Optional[int] = None) -> Storage:
+    """
+    db_path bo'yicha jarayondagi yagona ombor nusxasini olish.
+    Barcha handlerlar, middleware va dekoratorlar bitta ulanish pulini ishlatadi.
+    backend berilmasa STORAGE_BACKEND, shard_count berilmasa DB_SHARD_COUNT
+    sozlamasi ishlatiladi (sqlite va shard_count > 1 - ShardedDatabase).
+    """
+    backend = backend or STORAGE_BACKEND
+    if backend not in STORAGE_ENGINES:
+        raise ValueError(f"Noma'lum ombor dvigateli: {backend} (mavjud: {', '.join(STORAGE_ENGINES)})")
+    shard_count = shard_count or DB_SHARD_COUNT
+    sharded = backend == 'sqlite' and shard_count > 1
+    key = f"{backend}:{os.path.abspath(db_path)}" + (f"#{shard_count}" if sharded else "")
+    database = _database_registry.get(key)
+
+    if database is None:
+        if sharded:
+            # db.sharding Database ni import qiladi - shu yerda yuklanadi
+            from db.sharding import ShardedDatabase
+            database = ShardedDatabase(db_path, max_connections or 10, shard_count)
+        else:
+            database = STORAGE_ENGINES[backend](db_path, max_connections or 10)
+        _database_registry[key] = database
+    elif max_connections and max_connections != database.max_connections:
+        # Pul hali ochilmagan bo'lsa o'lchamni xavfsiz o'zgartirish mumkin (shardlarda ham)
+        if not database.resize_pool(max_connections):
+            logger.warning(
+                f"{db_path} uchun pul allaqachon ochilgan ({database.max_connections} ulanish), "
+                f"{max_connections} e'tiborga olinmadi"
+            )
+
+    return database
+
+
+async def close_all_databases():
+    """Ro'yxatdagi barcha ombor nusxalarini yopish"""
+    for database in list(_database_registry.values()):
+        await database.close()
+    _database_registry.clear()
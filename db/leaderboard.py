@@ -0,0 +1,175 @@
+"""
+🎰 Slot Game Bot — Xotiradagi reytinglar jadvali (indekslanadigan skip list)
+"""
+import math
+import random
+from typing import Dict, List, Optional, Tuple, Iterable
+
+# 2^24 ≈ 16 mln foydalanuvchigacha yetarli
+MAX_LEVELS = 24
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, levels: int):
+        self.key = key
+        self.next: List[Optional["_Node"]] = [None] * levels
+        self.width: List[int] = [1] * levels
+
+
+class IndexableSkipList:
+    """
+    Har bir havola kengligini saqlaydigan skip list: qo'shish, o'chirish,
+    kalit o'rnini (rank) topish O(log n), birinchi k ta elementni olish O(k).
+    Kalitlar noyob bo'lishi kerak.
+    """
+
+    def __init__(self):
+        self.head = _Node(None, MAX_LEVELS)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def insert(self, key):
+        chain: List[_Node] = [self.head] * MAX_LEVELS
+        steps_at_level = [0] * MAX_LEVELS
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        levels = min(MAX_LEVELS, 1 - int(math.log(1.0 - random.random(), 2.0)))
+        new_node = _Node(key, levels)
+        steps = 0
+        for level in range(levels):
+            prev = chain[level]
+            new_node.next[level] = prev.next[level]
+            prev.next[level] = new_node
+            new_node.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, MAX_LEVELS):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        chain: List[_Node] = [self.head] * MAX_LEVELS
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def rank(self, key) -> Optional[int]:
+        """Kalitning 1 dan boshlanadigan o'rni (topilmasa None)"""
+        position = 0
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        target = node.next[0]
+        if target is not None and target.key == key:
+            return position + 1
+        return None
+
+    def count_below(self, key) -> int:
+        """Berilgan kalitdan kichik kalitlar soni (kalit ro'yxatda bo'lishi shart emas)"""
+        position = 0
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        return position
+
+    def first(self, count: int) -> List:
+        """Tartib bo'yicha birinchi count ta kalit"""
+        keys = []
+        node = self.head.next[0]
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class Leaderboard:
+    """
+    Yulduzlar bo'yicha reyting: top-K va "siz #N / M o'rindasiz" so'rovlari
+    jadvalni skanerlamasdan bajariladi. Faqat tasdiqlangan va bloklanmagan
+    foydalanuvchilar reytingda bo'ladi.
+    """
+
+    def __init__(self):
+        self._list = IndexableSkipList()
+        self._scores: Dict[int, int] = {}
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._list)
+
+    @staticmethod
+    def _key(telegram_id: int, stars: int) -> Tuple[int, int]:
+        # Ko'p yulduz - yuqori o'rin; teng bo'lsa avval ro'yxatdan o'tgan (kichik ID)
+        return (-stars, telegram_id)
+
+    def load(self, rows: Iterable[Tuple[int, int]]):
+        """Reytingni (telegram_id, stars) juftliklaridan qaytadan qurish"""
+        self._list = IndexableSkipList()
+        self._scores = {}
+        for telegram_id, stars in rows:
+            self.update(telegram_id, stars or 0)
+        self.ready = True
+
+    def update(self, telegram_id: int, stars: int, eligible: bool = True):
+        """Foydalanuvchi yulduzlari yoki holati o'zgarganda chaqiriladi"""
+        old_stars = self._scores.pop(telegram_id, None)
+        if old_stars is not None:
+            self._list.remove(self._key(telegram_id, old_stars))
+        if eligible:
+            self._scores[telegram_id] = stars
+            self._list.insert(self._key(telegram_id, stars))
+
+    def adjust(self, telegram_id: int, stars_delta: int):
+        """Yulduzlarni delta bo'yicha o'zgartirish (reytingda bo'lsa)"""
+        stars = self._scores.get(telegram_id)
+        if stars is not None and stars_delta:
+            self.update(telegram_id, stars + stars_delta)
+
+    def remove(self, telegram_id: int):
+        self.update(telegram_id, 0, eligible=False)
+
+    def top(self, limit: int) -> List[Tuple[int, int]]:
+        """Eng yaxshi limit ta o'yinchi: [(telegram_id, stars), ...]"""
+        return [(telegram_id, -neg_stars) for neg_stars, telegram_id in self._list.first(limit)]
+
+    def score(self, telegram_id: int) -> Optional[int]:
+        """Reytingdagi yulduzlar (reytingda bo'lmasa None)"""
+        return self._scores.get(telegram_id)
+
+    def count_ahead(self, telegram_id: int, stars: int) -> int:
+        """(stars, telegram_id) dan oldinda turgan o'yinchilar soni - shardlar reytinglarini qo'shish uchun"""
+        return self._list.count_below(self._key(telegram_id, stars))
+
+    def rank(self, telegram_id: int) -> Optional[int]:
+        """Foydalanuvchi o'rni (reytingda bo'lmasa None)"""
+        stars = self._scores.get(telegram_id)
+        if stars is None:
+            return None
+        return self._list.rank(self._key(telegram_id, stars))
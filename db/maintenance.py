@@ -0,0 +1,177 @@
+"""
+🎰 Slot Game Bot — Bazaga texnik xizmat: WAL checkpoint, optimize/ANALYZE, incremental_vacuum
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+from db.pool import Histogram
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+class MaintenanceJob:
+    """
+    Bitta davriy ish va uning vaqt o'lchovlari.
+
+    run() natijasi: None - bajarishga hojat bo'lmadi (skipped), bo'sh/False -
+    xato (Database metodlari xatoni o'zi loglaydi), boshqasi - bajarildi.
+    """
+
+    def __init__(self, name: str, interval: float, run: Callable[[], Awaitable[Any]]):
+        self.name = name
+        self.interval = interval
+        self.run = run
+        self.next_due = time.monotonic() + interval
+        self.timing = Histogram()
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_ms: Optional[float] = None
+        self.last_run_at: Optional[str] = None
+        self.last_result: Any = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        timing = self.timing.snapshot()
+        return {
+            'interval_seconds': self.interval,
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'last_ms': self.last_ms,
+            'last_run_at': self.last_run_at,
+            'last_result': self.last_result,
+            'avg_ms': timing['avg_ms'],
+            'p95_ms': timing['p95_ms'],
+            'max_ms': timing['max_ms']
+        }
+
+
+class MaintenanceScheduler:
+    """
+    Yagona fon vazifasi har tick soniyada muddati kelgan ishlarni navbat bilan
+    bajaradi (ikki ish hech qachon bir vaqtda yozuvchini talashmaydi):
+
+    - checkpoint: -wal fayli checkpoint_passive_mb dan oshsa PASSIVE,
+      checkpoint_truncate_mb dan oshsa TRUNCATE (fayl nolga qisqaradi);
+    - optimize: PRAGMA optimize, ANALYZE: to'liq statistika (kamroq);
+    - incremental_vacuum: retention o'chirgan sahifalarni qadamlab bo'shatish.
+
+    Oraliq 0 bo'lsa ish o'chirilgan.
+    """
+
+    def __init__(self, database, tick: float = 30.0, checkpoint_passive_mb: float = 16,
+                 checkpoint_truncate_mb: float = 64, optimize_interval: float = 6 * 3600,
+                 analyze_interval: float = 7 * 24 * 3600, vacuum_interval: float = 3600,
+                 vacuum_pages_per_step: int = 256, vacuum_max_steps: int = 100,
+                 vacuum_pause_ms: int = 50, vacuum_min_free_pages: int = 1024):
+        self.database = database
+        self.tick = tick
+        self.checkpoint_passive_bytes = checkpoint_passive_mb * MB
+        self.checkpoint_truncate_bytes = checkpoint_truncate_mb * MB
+        self.vacuum_pages_per_step = vacuum_pages_per_step
+        self.vacuum_max_steps = vacuum_max_steps
+        self.vacuum_pause = vacuum_pause_ms / 1000
+        self.vacuum_min_free_pages = vacuum_min_free_pages
+
+        jobs = (
+            MaintenanceJob('checkpoint', tick, self._checkpoint),
+            MaintenanceJob('optimize', optimize_interval, self._optimize),
+            MaintenanceJob('analyze', analyze_interval, self._analyze),
+            MaintenanceJob('incremental_vacuum', vacuum_interval, self._incremental_vacuum),
+        )
+        self.jobs: Dict[str, MaintenanceJob] = {job.name: job for job in jobs if job.interval > 0}
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    # === ISHLAR ===
+
+    async def _checkpoint(self):
+        size = self.database.wal_size()
+        if size >= self.checkpoint_truncate_bytes:
+            return await self.database.wal_checkpoint("TRUNCATE")
+        if size >= self.checkpoint_passive_bytes:
+            return await self.database.wal_checkpoint("PASSIVE")
+        return None
+
+    async def _optimize(self):
+        return await self.database.optimize()
+
+    async def _analyze(self):
+        return await self.database.analyze()
+
+    async def _incremental_vacuum(self):
+        result = await self.database.incremental_vacuum(
+            self.vacuum_pages_per_step, self.vacuum_max_steps, self.vacuum_pause,
+            self.vacuum_min_free_pages
+        )
+        if result and not result['freed_pages']:
+            return None
+        return result
+
+    # === REJALASHTIRISH ===
+
+    def start(self):
+        if self._task is None and self.jobs:
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"Texnik xizmat ishga tushdi ({self.tick}s): {', '.join(self.jobs)}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            for job in self.jobs.values():
+                if time.monotonic() >= job.next_due:
+                    await self._run(job)
+
+    async def run_now(self, name: str) -> Any:
+        """Ishni navbatdan tashqari bajarish (masalan, retention dan keyin incremental_vacuum)"""
+        job = self.jobs.get(name)
+        if job is None:
+            logger.warning(f"Texnik xizmat ishi topilmadi yoki o'chirilgan: {name}")
+            return None
+        return await self._run(job)
+
+    async def _run(self, job: MaintenanceJob) -> Any:
+        async with self._lock:
+            started = time.perf_counter()
+            try:
+                result = await job.run()
+            except Exception as e:
+                logger.error(f"Texnik xizmat ishi {job.name} xatosi: {e}")
+                result = False
+            elapsed = time.perf_counter() - started
+            job.next_due = time.monotonic() + job.interval
+
+            if result is None:
+                job.skipped += 1
+                return None
+            job.timing.observe(elapsed)
+            job.last_ms = round(elapsed * 1000, 1)
+            job.last_run_at = datetime.now().isoformat(timespec='seconds')
+            job.last_result = result
+            if result:
+                job.runs += 1
+            else:
+                job.errors += 1
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Har bir ish uchun: bajarilgan/o'tkazib yuborilgan/xato soni va vaqtlar (ms)"""
+        return {
+            'running': self._task is not None,
+            'wal_bytes': self.database.wal_size(),
+            'jobs': {name: job.get_stats() for name, job in self.jobs.items()}
+        }
@@ -0,0 +1,672 @@
+"""
+🎰 Slot Game Bot — Xotiradagi ombor (STORAGE_BACKEND=memory)
+
+Testlar va yuklama o'lchovlari uchun: to'liq handler steki diskka tegmasdan,
+xotira tezligida ishlaydi. Jarayon tugagach ma'lumotlar yo'qoladi.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator, Sequence, Iterable
+
+from config.settings import (
+    DATABASE_PATH, DEFAULT_WIN_PROBABILITY, DAILY_BONUS_AMOUNT, REFERRAL_BONUS,
+    REFERRAL_FRIEND_BONUS, RETENTION_DAYS, GAME_HISTORY_STATS_MONTHS
+)
+from db.storage import Storage, PlayRound
+from db.leaderboard import Leaderboard
+from db.partitions import HistoryPartitions
+from bot.reel_codec import Reels, to_code
+
+logger = logging.getLogger(__name__)
+
+# users jadvali ustunlari va standart qiymatlari (db/migrations.py dagi sxema bilan bir xil)
+USER_DEFAULTS: Dict[str, Any] = {
+    'telegram_id': None,
+    'username': None,
+    'first_name': None,
+    'stars': 0,
+    'attempts': 0,
+    'wins': 0,
+    'losses': 0,
+    'total_spins': 0,
+    'biggest_win': 0,
+    'reg_date': None,
+    'last_daily_bonus': None,
+    'daily_streak': 0,
+    'referrer_id': None,
+    'referral_count': 0,
+    'is_verified': 0,
+    'is_banned': 0,
+    'channel_subscribed': 0,
+    'version': 0
+}
+
+COUNTER_NAMES = (
+    'users_total', 'users_verified', 'users_banned', 'users_subscribed', 'total_spins',
+    'total_wins', 'total_losses', 'total_stars', 'biggest_win', 'history_games',
+    'history_wins', 'history_stars_won', 'purchases', 'purchased_stars'
+)
+
+CONFIG_DEFAULTS = {
+    'win_probability': str(DEFAULT_WIN_PROBABILITY),
+    'daily_bonus_amount': '5',
+    'referral_bonus': '10',
+    'min_payment_amount': '50',
+    'max_payment_amount': '10000'
+}
+
+
+def _now() -> str:
+    """datetime.now() ni sqlite3 adapteri yozadigan ko'rinishda"""
+    return str(datetime.now())
+
+
+def _utc_timestamp(moment: Optional[datetime] = None) -> str:
+    """SQLite CURRENT_TIMESTAMP ko'rinishi (UTC, soniyagacha)"""
+    return (moment or datetime.utcnow()).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class MemoryDatabase(Storage):
+    """
+    Lug'at va ro'yxatlarga asoslangan ombor, Database bilan bir xil semantika.
+
+    users - {telegram_id: qator}, o'yin tarixi - oylik bo'laklar
+    {YYYYMM: {telegram_id: [(reels, win_amount, is_win, timestamp), ...]}},
+    kunlik yig'indi - {(telegram_id, YYYY-MM-DD): [spins, wins, stars_won, max_win]},
+    tranzaksiyalar va referallar - ro'yxatlar. Har bir amal ichida await yo'q,
+    shuning uchun hodisalar siklida u atomar (SQLite tranzaksiyasi o'rnida).
+    Handlerlarga har doim qatorning nusxasi qaytariladi.
+    """
+
+    persistent = False
+
+    def __init__(self, db_path: str = DATABASE_PATH, max_connections: int = 10):
+        # db_path faqat get_database() reyestri va loglar uchun
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self._users: Dict[int, Dict[str, Any]] = {}
+        self._history: Dict[str, Dict[int, List[Tuple[int, int, bool, str]]]] = {}
+        self._daily: Dict[Tuple[int, str], List[int]] = {}
+        self._transactions: List[Dict[str, Any]] = []
+        self._referrals: List[Tuple[int, int, str]] = []
+        self._payments: Dict[str, Dict[str, Any]] = {}
+        self._config: Dict[str, str] = {}
+        self._counters: Dict[str, Any] = {}
+        self._leaderboard = Leaderboard()
+        self._initialized = False
+
+    async def init_db(self):
+        """Bo'sh tuzilmalar va standart konfiguratsiya (takroriy chaqiruv hech narsani o'chirmaydi)"""
+        if self._initialized:
+            return
+        for key, value in CONFIG_DEFAULTS.items():
+            self._config.setdefault(key, value)
+        self._counters = {name: 0 for name in COUNTER_NAMES}
+        self._counters['reconciled_at'] = None
+        self._initialized = True
+        logger.info("Xotiradagi ombor tayyor")
+
+    async def close(self):
+        """Xotiradagi ombor uchun yopiladigan resurs yo'q - ma'lumotlar saqlanib qoladi"""
+        logger.info("Xotiradagi ombor yopildi")
+
+    # === ICHKI YORDAMCHILAR ===
+
+    def _bump(self, **deltas: int):
+        """Database._bump_counters bilan bir xil: biggest_win - MAX, qolganlari - qo'shish"""
+        biggest_win = deltas.pop('biggest_win', 0)
+        for name, delta in deltas.items():
+            self._counters[name] += delta
+        if biggest_win:
+            self._counters['biggest_win'] = max(self._counters['biggest_win'], biggest_win)
+
+    def _sync_leaderboard(self, user: Optional[Dict[str, Any]]):
+        if user is None or not self._leaderboard.ready:
+            return
+        self._leaderboard.update(user['telegram_id'], user['stars'] or 0,
+                                 bool(user['is_verified']) and not user['is_banned'])
+
+    def _add_history(self, telegram_id: int, reels: int, win_amount: int, is_win: bool):
+        month = HistoryPartitions.month_of()
+        timestamp = _utc_timestamp()
+        self._history.setdefault(month, {}).setdefault(telegram_id, []).append(
+            (reels, win_amount, is_win, timestamp)
+        )
+        self._add_daily(telegram_id, timestamp[:10], 1, int(bool(is_win)), win_amount if is_win else 0)
+
+    def _add_daily(self, telegram_id: int, day: str, spins: int, wins: int, stars_won: int,
+                   max_win: Optional[int] = None):
+        """Database._bump_daily_stats bilan bir xil birlashtirish"""
+        totals = self._daily.setdefault((telegram_id, day), [0, 0, 0, 0])
+        totals[0] += spins
+        totals[1] += wins
+        totals[2] += stars_won
+        totals[3] = max(totals[3], stars_won if max_win is None else max_win)
+
+    def _add_transaction(self, telegram_id: int, transaction_type: str, stars_amount: int,
+                         attempts_amount: int = 0, description: str = None):
+        self._transactions.append({
+            'id': len(self._transactions) + 1,
+            'telegram_id': telegram_id,
+            'transaction_type': transaction_type,
+            'stars_amount': stars_amount,
+            'attempts_amount': attempts_amount,
+            'description': description,
+            'timestamp': _utc_timestamp()
+        })
+
+    def _apply_spin(self, user: Dict[str, Any], won: bool, stars_won: int, reels: int):
+        """O'yin natijasini users, tarix va hisoblagichlarga yozish (urinish alohida ayiriladi)"""
+        won_amount = stars_won if won else 0
+        self._add_history(user['telegram_id'], reels, stars_won, won)
+        user['wins'] += int(won)
+        user['losses'] += int(not won)
+        user['total_spins'] += 1
+        user['stars'] += won_amount
+        user['biggest_win'] = max(user['biggest_win'], won_amount)
+        user['version'] += 1
+        self._bump(total_spins=1, total_wins=int(won), total_losses=int(not won),
+                   total_stars=won_amount, biggest_win=won_amount,
+                   history_games=1, history_wins=int(won), history_stars_won=won_amount)
+
+    # === FOYDALANUVCHI OPERATSIYALARI ===
+
+    async def register_user(self, telegram_id: int, username: str = None,
+                            first_name: str = None, referrer_id: int = None) -> bool:
+        """Yangi foydalanuvchini ro'yxatdan o'tkazish"""
+        try:
+            if telegram_id not in self._users:
+                self._users[telegram_id] = {
+                    **USER_DEFAULTS, 'telegram_id': telegram_id, 'username': username,
+                    'first_name': first_name, 'referrer_id': referrer_id, 'reg_date': _now()
+                }
+                self._bump(users_total=1, total_stars=USER_DEFAULTS['stars'])
+
+            if referrer_id:
+                await self.add_referral(referrer_id, telegram_id)
+            return True
+        except Exception as e:
+            logger.error(f"Foydalanuvchi {telegram_id} ro'yxatdan o'tkazishda xato: {e}")
+            return False
+
+    async def verify_user(self, telegram_id: int) -> bool:
+        """Foydalanuvchini tasdiqlangan deb belgilash"""
+        user = self._users.get(telegram_id)
+        if user is not None and not user['is_verified']:
+            user['is_verified'] = 1
+            user['version'] += 1
+            self._bump(users_verified=1)
+            self._sync_leaderboard(user)
+        return True
+
+    async def get_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Foydalanuvchi ma'lumotlarini olish - daily streak bilan"""
+        user = self._users.get(telegram_id)
+        return self._prepare_user_row(user) if user is not None else None
+
+    async def update_user_balance(self, telegram_id: int, stars_delta: int, attempts_delta: int = 0) -> bool:
+        """Foydalanuvchi balansini yangilash"""
+        user = self._users.get(telegram_id)
+        if user is not None:
+            stars = max(0, user['stars'] + stars_delta)
+            self._bump(total_stars=stars - user['stars'])
+            user['stars'] = stars
+            user['attempts'] = max(0, user['attempts'] + attempts_delta)
+            user['version'] += 1
+            self._sync_leaderboard(user)
+        return True
+
+    async def ban_user(self, telegram_id: int) -> bool:
+        """Foydalanuvchini bloklash"""
+        user = self._users.get(telegram_id)
+        if user is not None and not user['is_banned']:
+            user['is_banned'] = 1
+            user['version'] += 1
+            self._bump(users_banned=1)
+            self._sync_leaderboard(user)
+        return True
+
+    async def unban_user(self, telegram_id: int) -> bool:
+        """Foydalanuvchini blokdan chiqarish"""
+        user = self._users.get(telegram_id)
+        if user is not None and user['is_banned']:
+            user['is_banned'] = 0
+            user['version'] += 1
+            self._bump(users_banned=-1)
+            self._sync_leaderboard(user)
+        return True
+
+    async def get_all_users(self) -> List[Dict[str, Any]]:
+        """Barcha tasdiqlangan foydalanuvchilar (admin uchun)"""
+        columns = ('telegram_id', 'username', 'first_name', 'stars', 'attempts',
+                   'total_spins', 'wins', 'losses', 'is_banned', 'reg_date')
+        users = [user for user in self._users.values() if user['is_verified'] == 1]
+        users.sort(key=lambda user: user['reg_date'] or '', reverse=True)
+        return [{column: user[column] for column in columns} for user in users]
+
+    async def iter_users(self, batch_size: int = 1000, verified_only: bool = True,
+                         columns: Sequence[str] = ('telegram_id', 'username', 'first_name',
+                                                   'channel_subscribed', 'is_banned')
+                         ) -> AsyncIterator[Dict[str, Any]]:
+        """Foydalanuvchilarni telegram_id tartibida sahifalab qaytarish (verified_only - faqat tasdiqlanganlar)"""
+        last_id = None
+        while True:
+            page = sorted(
+                telegram_id for telegram_id, user in self._users.items()
+                if (last_id is None or telegram_id > last_id)
+                and (not verified_only or user['is_verified'])
+            )[:batch_size]
+            for telegram_id in page:
+                user = self._users.get(telegram_id)
+                if user is not None:
+                    yield {column: user[column] for column in columns}
+            if len(page) < batch_size:
+                return
+            last_id = page[-1]
+            # Sahifalar orasida boshqa vazifalarga navbat berish
+            await asyncio.sleep(0)
+
+    # === O'YIN OPERATSIYALARI ===
+
+    async def record_game_result(self, telegram_id: int, reels: Reels, won: bool, stars_won: int = 0) -> bool:
+        """O'yin natijasini qayd qilish"""
+        try:
+            reels = to_code(reels)
+            user = self._users.get(telegram_id)
+            if user is None:
+                # Foydalanuvchisiz tarix qatori - faqat tarix hisoblagichlari
+                stars_won_counted = stars_won if won else 0
+                self._add_history(telegram_id, reels, stars_won, won)
+                self._bump(history_games=1, history_wins=int(won), history_stars_won=stars_won_counted)
+                return True
+            user['attempts'] -= 1
+            self._apply_spin(user, won, stars_won, reels)
+            self._sync_leaderboard(user)
+            return True
+        except Exception as e:
+            logger.error(f"O'yin natijasi qayd qilishda xato {telegram_id}: {e}")
+            return False
+
+    async def execute_spin(self, telegram_id: int, play_round: PlayRound) -> Dict[str, Any]:
+        """Aylantirish: urinishni tekshirish va ayirish, natijani hisoblash va qayd qilish"""
+        try:
+            user = self._users.get(telegram_id)
+            if user is None or user['attempts'] <= 0:
+                return {'success': False, 'reason': 'no_attempts'}
+
+            win_probability = self._win_probability()
+            user['attempts'] -= 1
+            try:
+                reels, is_winner, stars_won, extra_info = play_round(
+                    win_probability, self._prepare_user_row(user)
+                )
+                reels_code = to_code(reels)
+            except Exception:
+                # SQLite dagi rollback kabi - ayirilgan urinish qaytariladi
+                user['attempts'] += 1
+                raise
+            self._apply_spin(user, is_winner, stars_won, reels_code)
+            self._sync_leaderboard(user)
+
+            return {
+                'success': True,
+                'user': self._prepare_user_row(user),
+                'reels': reels,
+                'is_winner': is_winner,
+                'stars_won': stars_won,
+                'extra_info': extra_info,
+                'win_probability': win_probability
+            }
+        except Exception as e:
+            logger.error(f"Aylantirish tranzaksiyasida xato {telegram_id}: {e}")
+            return {'success': False, 'reason': 'error'}
+
+    async def claim_daily_bonus(self, telegram_id: int) -> bool:
+        """Kunlik bonusni olish (tekshiruv va yozuv orasida await yo'q)"""
+        user = self._users.get(telegram_id)
+        if user is not None:
+            if not self._daily_bonus_due(user['last_daily_bonus']):
+                return False
+            user['stars'] += DAILY_BONUS_AMOUNT
+            user['last_daily_bonus'] = _now()
+            user['version'] += 1
+            self._bump(total_stars=DAILY_BONUS_AMOUNT)
+            self._sync_leaderboard(user)
+        self._add_transaction(telegram_id, 'daily_bonus', DAILY_BONUS_AMOUNT, description='Kunlik bonus')
+        return True
+
+    # === REFERAL TIZIMI ===
+
+    async def add_referral(self, referrer_id: int, referred_id: int) -> bool:
+        """Referal qo'shish"""
+        self._referrals.append((referrer_id, referred_id, _utc_timestamp()))
+        referrer = self._users.get(referrer_id)
+        referred = self._users.get(referred_id)
+        if referrer is not None:
+            referrer['referral_count'] += 1
+            referrer['stars'] += REFERRAL_BONUS
+            referrer['version'] += 1
+            self._bump(total_stars=REFERRAL_BONUS)
+            self._sync_leaderboard(referrer)
+        if referred is not None:
+            referred['stars'] += REFERRAL_FRIEND_BONUS
+            referred['version'] += 1
+            self._bump(total_stars=REFERRAL_FRIEND_BONUS)
+            self._sync_leaderboard(referred)
+        self._add_transaction(referrer_id, 'referral_bonus', REFERRAL_BONUS, description='Referal bonusi')
+        self._add_transaction(referred_id, 'friend_bonus', REFERRAL_FRIEND_BONUS, description="Do'st bonusi")
+        return True
+
+    async def get_referral_stats(self, telegram_id: int) -> Dict[str, int]:
+        """Referal statistikasini olish"""
+        user = self._users.get(telegram_id)
+        referral_count = user['referral_count'] if user else 0
+        return {'referrals': referral_count, 'total_bonus': referral_count * REFERRAL_BONUS}
+
+    # === STATISTIKALAR ===
+
+    async def rebuild_leaderboard(self) -> int:
+        """Reytingni foydalanuvchilardan qaytadan qurish"""
+        self._leaderboard.load(
+            (user['telegram_id'], user['stars'])
+            for user in self._users.values()
+            if user['is_verified'] == 1 and user['is_banned'] == 0
+        )
+        logger.info(f"Reyting qurildi: {len(self._leaderboard)} o'yinchi")
+        return len(self._leaderboard)
+
+    async def get_leaderboard(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Eng boy foydalanuvchilar ro'yxati"""
+        if not self._leaderboard.ready:
+            await self.rebuild_leaderboard()
+        columns = ('telegram_id', 'username', 'first_name', 'stars', 'wins', 'total_spins', 'biggest_win')
+        return [
+            {column: self._users[telegram_id][column] for column in columns}
+            for telegram_id, _ in self._leaderboard.top(limit)
+            if telegram_id in self._users
+        ]
+
+    async def get_user_rank(self, telegram_id: int) -> Dict[str, Optional[int]]:
+        """Foydalanuvchi o'rni: {'rank': N, 'total': M}"""
+        if not self._leaderboard.ready:
+            await self.rebuild_leaderboard()
+        return {'rank': self._leaderboard.rank(telegram_id), 'total': len(self._leaderboard)}
+
+    async def get_global_counters(self) -> Dict[str, Any]:
+        """Umumiy hisoblagichlar nusxasi"""
+        return {'id': 1, **self._counters} if self._counters else {}
+
+    async def reconcile_global_counters(self) -> Dict[str, int]:
+        """Hisoblagichlarni ma'lumotlardan qaytadan hisoblash, qaytariladi: farqlar"""
+        users = list(self._users.values())
+        fresh = {
+            'users_total': len(users),
+            'users_verified': sum(1 for user in users if user['is_verified'] == 1),
+            'users_banned': sum(1 for user in users if user['is_banned'] == 1),
+            'users_subscribed': sum(1 for user in users if user['channel_subscribed'] == 1),
+            'total_spins': sum(user['total_spins'] for user in users),
+            'total_wins': sum(user['wins'] for user in users),
+            'total_losses': sum(user['losses'] for user in users),
+            'total_stars': sum(user['stars'] for user in users),
+            'biggest_win': max((user['biggest_win'] for user in users), default=0),
+            'history_games': 0,
+            'history_wins': 0,
+            'history_stars_won': 0
+        }
+        for month_rows in self._history.values():
+            for rows in month_rows.values():
+                for _, win_amount, is_win, _ in rows:
+                    fresh['history_games'] += 1
+                    if is_win:
+                        fresh['history_wins'] += 1
+                        fresh['history_stars_won'] += win_amount
+        purchases = [row for row in self._transactions if row['transaction_type'] == 'purchase']
+        fresh['purchases'] = len(purchases)
+        fresh['purchased_stars'] = sum(row['stars_amount'] for row in purchases)
+
+        drift = {
+            name: value - (self._counters.get(name) or 0)
+            for name, value in fresh.items()
+            if value != (self._counters.get(name) or 0)
+        }
+        self._counters.update(fresh)
+        self._counters['reconciled_at'] = datetime.now()
+        if drift:
+            logger.warning(f"Umumiy hisoblagichlar tuzatildi: {drift}")
+        else:
+            logger.info("Umumiy hisoblagichlar to'g'ri")
+        return drift
+
+    async def get_user_statistics(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Foydalanuvchi statistikalarini olish (oxirgi GAME_HISTORY_STATS_MONTHS oy)"""
+        user = self._users.get(telegram_id)
+        if user is None:
+            return None
+
+        since = HistoryPartitions.window_start(GAME_HISTORY_STATS_MONTHS)
+        days = [totals for (user_id, day), totals in self._daily.items()
+                if user_id == telegram_id and day >= since]
+        transactions = [row for row in self._transactions if row['telegram_id'] == telegram_id]
+
+        # SQL agregatlari kabi: qator bo'lmasa SUM/MAX - None
+        def total(values):
+            values = list(values)
+            return sum(values) if values else None
+
+        return {
+            'username': user['username'],
+            'first_name': user['first_name'],
+            'stars': user['stars'],
+            'total_spins': user['total_spins'],
+            'total_wins': user['wins'],
+            'total_losses': user['losses'],
+            'daily_streak': user['daily_streak'],
+            'reg_date': user['reg_date'],
+            'total_games': sum(totals[0] for totals in days),
+            'wins': total(totals[1] for totals in days),
+            'losses': total(totals[0] - totals[1] for totals in days),
+            'total_stars_won': total(totals[2] for totals in days),
+            'biggest_win': max((totals[3] for totals in days), default=None),
+            'total_transactions': len(transactions),
+            'total_purchased': total(
+                row['stars_amount'] if row['transaction_type'] == 'purchase' else 0 for row in transactions
+            ),
+            'total_bonuses': total(
+                row['stars_amount'] if row['transaction_type'] == 'daily_bonus' else 0 for row in transactions
+            )
+        }
+
+    async def rebuild_daily_stats(self) -> int:
+        """Kunlik yig'indini o'yin tarixidan qayta qurish"""
+        self._daily = {}
+        for month_rows in self._history.values():
+            for telegram_id, rows in month_rows.items():
+                for _, win_amount, is_win, timestamp in rows:
+                    self._add_daily(telegram_id, timestamp[:10], 1, int(bool(is_win)),
+                                    win_amount if is_win else 0)
+        logger.info(f"Kunlik yig'indi qayta qurildi: {len(self._daily)} ta qator")
+        return len(self._daily)
+
+    async def get_daily_stats(self, days: int = 7, telegram_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Oxirgi days kun bo'yicha yig'indi, yangidan eskiga"""
+        since = (datetime.utcnow() - timedelta(days=max(int(days), 1) - 1)).strftime('%Y-%m-%d')
+        by_day: Dict[str, Dict[str, Any]] = {}
+        for (user_id, day), (spins, wins, stars_won, max_win) in self._daily.items():
+            if day < since or (telegram_id is not None and user_id != telegram_id):
+                continue
+            totals = by_day.setdefault(day, {'day': day, 'players': 0, 'spins': 0, 'wins': 0,
+                                             'stars_won': 0, 'max_win': 0})
+            totals['players'] += 1
+            totals['spins'] += spins
+            totals['wins'] += wins
+            totals['stars_won'] += stars_won
+            totals['max_win'] = max(totals['max_win'], max_win)
+        return [by_day[day] for day in sorted(by_day, reverse=True)]
+
+    async def cleanup_old_data(self, days: Optional[int] = None, progress=None) -> Dict[str, Dict[str, Any]]:
+        """Retention qoidalari bo'yicha eski tarix va tranzaksiyalarni o'chirish"""
+        report = {}
+        for table, table_days in RETENTION_DAYS.items():
+            table_days = days or table_days
+            if not table_days or table_days <= 0:
+                continue
+            started = time.perf_counter()
+            moment = datetime.utcnow() - timedelta(days=table_days)
+            cutoff = _utc_timestamp(moment)
+            dropped = []
+            deleted = 0
+
+            if table == 'game_history':
+                cutoff_month = HistoryPartitions.month_of(moment)
+                for month in sorted(self._history):
+                    month_rows = self._history[month]
+                    for telegram_id, rows in list(month_rows.items()):
+                        kept = []
+                        for row in rows:
+                            _, win_amount, is_win, timestamp = row
+                            if month >= cutoff_month and timestamp >= cutoff:
+                                kept.append(row)
+                                continue
+                            deleted += 1
+                            self._bump(history_games=-1, history_wins=-int(bool(is_win)),
+                                       history_stars_won=-(win_amount if is_win else 0))
+                        month_rows[telegram_id] = kept
+                    if month < cutoff_month:
+                        del self._history[month]
+                        dropped.append(f"game_history_{month}")
+            elif table == 'transactions':
+                kept = [row for row in self._transactions if row['timestamp'] >= cutoff]
+                for row in self._transactions:
+                    if row['timestamp'] < cutoff and row['transaction_type'] == 'purchase':
+                        self._bump(purchases=-1, purchased_stars=-row['stars_amount'])
+                deleted = len(self._transactions) - len(kept)
+                self._transactions = kept
+
+            if progress and deleted:
+                await progress(table, deleted, deleted)
+            report[table] = {'deleted': deleted, 'archive': None,
+                             'seconds': round(time.perf_counter() - started, 2),
+                             'dropped_partitions': dropped}
+        logger.info(f"Eski ma'lumotlar tozalandi: {report}")
+        return report
+
+    async def get_database_stats(self) -> Dict[str, Any]:
+        """Ombor statistikasi (hajm diskda emas - 0)"""
+        counters = self._counters
+        return {
+            'total_users': counters['users_total'],
+            'verified_users': counters['users_verified'],
+            'banned_users': counters['users_banned'],
+            'subscribed_users': counters['users_subscribed'],
+            'total_games': counters['history_games'],
+            'total_wins': counters['history_wins'],
+            'avg_stars_won': (
+                counters['history_stars_won'] / counters['history_games']
+                if counters['history_games'] else None
+            ),
+            'database_size_mb': 0.0
+        }
+
+    # === TRANZAKTSIYALAR ===
+
+    async def credit_payment(self, telegram_id: int, charge_id: str, attempts: int, total_amount: int,
+                             currency: str = "XTR", payload: Optional[str] = None,
+                             provider_charge_id: Optional[str] = None,
+                             description: Optional[str] = None) -> Dict[str, Any]:
+        """To'lovni bir marta hisobga yozish (charge id lug'at kaliti - noyob indeks o'rnida)"""
+        if charge_id in self._payments:
+            logger.info(f"To'lov {charge_id} allaqachon hisobga yozilgan ({telegram_id})")
+            return {'success': True, 'duplicate': True}
+        user = self._users.get(telegram_id)
+        if user is None:
+            logger.error(f"To'lov {charge_id}: foydalanuvchi {telegram_id} topilmadi")
+            return {'success': False, 'reason': 'no_user'}
+
+        self._payments[charge_id] = {
+            'id': len(self._payments) + 1,
+            'telegram_payment_charge_id': charge_id,
+            'provider_payment_charge_id': provider_charge_id,
+            'telegram_id': telegram_id,
+            'currency': currency,
+            'total_amount': total_amount,
+            'attempts_amount': attempts,
+            'payload': payload,
+            'timestamp': _utc_timestamp()
+        }
+        user['attempts'] += attempts
+        user['version'] += 1
+        self._add_transaction(telegram_id, 'purchase', total_amount, attempts, description)
+        self._bump(purchases=1, purchased_stars=total_amount)
+        return {'success': True, 'duplicate': False, 'user': self._prepare_user_row(user)}
+
+    async def add_transaction(self, telegram_id: int, transaction_type: str,
+                              stars_amount: int, attempts_amount: int = 0,
+                              description: str = None) -> bool:
+        """Tranzaktsiya qo'shish"""
+        self._add_transaction(telegram_id, transaction_type, stars_amount, attempts_amount, description)
+        if transaction_type == 'purchase':
+            self._bump(purchases=1, purchased_stars=stars_amount)
+        return True
+
+    # === KONFIGURATSIYA ===
+
+    def _win_probability(self) -> float:
+        try:
+            return float(self._config.get('win_probability', str(DEFAULT_WIN_PROBABILITY)))
+        except ValueError:
+            return DEFAULT_WIN_PROBABILITY
+
+    async def get_win_probability(self) -> float:
+        """G'alaba ehtimolini olish"""
+        return self._win_probability()
+
+    async def set_win_probability(self, probability: float) -> bool:
+        """G'alaba ehtimolini o'rnatish"""
+        if not 0.0 <= probability <= 1.0:
+            logger.error(f"Noto'g'ri g'alaba ehtimoli: {probability}")
+            return False
+        self._config['win_probability'] = str(probability)
+        logger.info(f"G'alaba ehtimoli yangilandi: {probability}")
+        return True
+
+    async def get_config_value(self, key: str, default: str = "") -> str:
+        """Konfiguratsiya qiymatini olish"""
+        return self._config.get(key, default)
+
+    async def set_config_value(self, key: str, value: str) -> bool:
+        """Konfiguratsiya qiymatini o'rnatish"""
+        self._config[key] = value
+        logger.info(f"Konfiguratsiya yangilandi: {key} = {value}")
+        return True
+
+    # === KANAL OBUNASI OPERATSIYALARI ===
+
+    def _set_subscription(self, telegram_id: int, subscribed: bool) -> bool:
+        user = self._users.get(telegram_id)
+        if user is None or bool(user['channel_subscribed']) == bool(subscribed):
+            return False
+        user['channel_subscribed'] = int(bool(subscribed))
+        user['version'] += 1
+        self._bump(users_subscribed=1 if subscribed else -1)
+        return True
+
+    async def set_channel_subscription(self, telegram_id: int, subscribed: bool = True) -> bool:
+        """Foydalanuvchining kanal obunasini belgilash"""
+        self._set_subscription(telegram_id, subscribed)
+        logger.info(f"Foydalanuvchi {telegram_id} kanal obunasi: {subscribed}")
+        return True
+
+    async def set_channel_subscriptions(self, changes: Iterable[Tuple[int, bool]],
+                                        batch_size: int = 500) -> int:
+        """Ko'p foydalanuvchining kanal obunasini yozish, qaytariladi: o'zgarganlar soni"""
+        updated = sum(self._set_subscription(telegram_id, status) for telegram_id, status in changes)
+        if updated:
+            logger.info(f"{updated} ta foydalanuvchining kanal obunasi yangilandi")
+        return updated
+
+    async def is_channel_subscribed(self, telegram_id: int) -> bool:
+        """Foydalanuvchi kanal obunasi holatini tekshirish"""
+        user = self._users.get(telegram_id)
+        return bool(user['channel_subscribed']) if user else False
@@ -0,0 +1,474 @@
+"""
+🎰 Slot Game Bot — Raqamlangan sxema migratsiyalari (PRAGMA user_version)
+"""
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import aiosqlite
+
+from config.settings import DEFAULT_WIN_PROBABILITY
+
+logger = logging.getLogger(__name__)
+
+# Katta jadvallarni to'ldirishda bitta tranzaksiyadagi qatorlar oralig'i (rowid)
+BATCH_SIZE = 5000
+
+
+class Migration:
+    """
+    Bitta sxema o'zgarishi. apply(conn) bitta tranzaksiya ichida bajariladi
+    (o'zi commit qilmaydi) va qayta ishga tushirilsa ham xavfsiz bo'lishi
+    kerak (eski bazalar user_version = 0 bilan turli holatlarda keladi).
+    Istisno - backfill(): u har bo'lakdan keyin commit qiladi, shuning uchun
+    undan oldingi o'zgarishlar ham saqlanadi va qayta ishga tushirish ularni
+    takrorlashiga to'g'ri kelishi kerak.
+    """
+
+    def __init__(self, version: int, description: str,
+                 apply: Callable[[aiosqlite.Connection], Awaitable[None]]):
+        self.version = version
+        self.description = description
+        self.apply = apply
+
+
+async def _columns(conn: aiosqlite.Connection, table: str) -> List[str]:
+    cursor = await conn.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in await cursor.fetchall()]
+
+
+async def _add_columns(conn: aiosqlite.Connection, table: str, columns: Dict[str, str]) -> List[str]:
+    """Yo'q ustunlarni qo'shish, qo'shilganlarini qaytarish"""
+    existing = set(await _columns(conn, table))
+    added = []
+    for name, definition in columns.items():
+        if name not in existing:
+            await conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            added.append(name)
+    return added
+
+
+async def backfill(conn: aiosqlite.Connection, table: str, assignments: str, where: str,
+                   batch_size: int = BATCH_SIZE) -> int:
+    """
+    UPDATE ni rowid oraliqlari bo'yicha bo'laklab bajarish: har bo'lak o'z
+    tranzaksiyasida commit qilinadi, yozuvchi qulfi bir bo'lak vaqtida ushlanadi.
+    where sharti faqat hali to'ldirilmagan qatorlarni tanlashi shart - uzilgan
+    migratsiya qayta ishga tushganda tayyor bo'laklarni takrorlamaydi.
+    Oxirida yangi tranzaksiya ochiladi: migratsiyaning qolgani va user_version
+    odatdagidek birga commit qilinadi.
+    """
+    cursor = await conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table}")
+    low, high = await cursor.fetchone()
+    if low is None:
+        return 0
+    updated = 0
+    for start in range(low, high + 1, batch_size):
+        cursor = await conn.execute(
+            f"UPDATE {table} SET {assignments} WHERE rowid >= ? AND rowid < ? AND ({where})",
+            (start, start + batch_size)
+        )
+        updated += cursor.rowcount
+        await conn.commit()
+        await conn.execute("BEGIN")
+    if updated:
+        logger.info(f"{table}: {updated} ta qator to'ldirildi ({assignments})")
+    return updated
+
+
+# === MIGRATSIYALAR ===
+
+async def _create_base_schema(conn: aiosqlite.Connection):
+    """Asosiy jadvallar (yangi baza uchun; mavjudlariga tegilmaydi)"""
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            telegram_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            stars INTEGER DEFAULT 0,
+            attempts INTEGER DEFAULT 0,
+            wins INTEGER DEFAULT 0,
+            losses INTEGER DEFAULT 0,
+            total_spins INTEGER DEFAULT 0,
+            biggest_win INTEGER DEFAULT 0,
+            reg_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_daily_bonus DATETIME DEFAULT NULL,
+            daily_streak INTEGER DEFAULT 0,
+            referrer_id INTEGER DEFAULT NULL,
+            referral_count INTEGER DEFAULT 0,
+            is_verified BOOLEAN DEFAULT 0,
+            is_banned BOOLEAN DEFAULT 0,
+            channel_subscribed BOOLEAN DEFAULT 0
+        )
+    """)
+    # Bo'laklardan oldingi o'yin tarixi (game_history_all ko'rinishiga kiradi)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS game_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER NOT NULL,
+            symbols TEXT,
+            win_amount INTEGER DEFAULT 0,
+            is_win BOOLEAN DEFAULT 0,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER NOT NULL,
+            transaction_type TEXT NOT NULL,
+            stars_amount INTEGER NOT NULL DEFAULT 0,
+            attempts_amount INTEGER DEFAULT 0,
+            description TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS referrals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            referrer_id INTEGER NOT NULL,
+            referred_id INTEGER NOT NULL,
+            bonus_paid BOOLEAN DEFAULT 0,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS config (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+async def _reconcile_users(conn: aiosqlite.Connection):
+    """
+    users ustunlarini kod ishlatadigan nomlarga keltirish. Eski init_db
+    sxemasida balance/total_wins/total_losses/created_at/referred_by bo'lgan.
+    """
+    existing = set(await _columns(conn, 'users'))
+    await _add_columns(conn, 'users', {
+        'stars': "INTEGER DEFAULT 0",
+        'attempts': "INTEGER DEFAULT 0",
+        'wins': "INTEGER DEFAULT 0",
+        'losses': "INTEGER DEFAULT 0",
+        'total_spins': "INTEGER DEFAULT 0",
+        'biggest_win': "INTEGER DEFAULT 0",
+        'reg_date': "DATETIME",
+        'last_daily_bonus': "DATETIME",
+        'daily_streak': "INTEGER DEFAULT 0",
+        'referrer_id': "INTEGER",
+        'referral_count': "INTEGER DEFAULT 0",
+        'is_verified': "BOOLEAN DEFAULT 0",
+        'is_banned': "BOOLEAN DEFAULT 0",
+        'channel_subscribed': "BOOLEAN DEFAULT 0",
+    })
+
+    # eski ustun -> yangi ustun; faqat yangisi hali bo'sh qatorlar
+    renames = {
+        'balance': ('stars', "IFNULL(stars, 0) = 0"),
+        'total_wins': ('wins', "IFNULL(wins, 0) = 0"),
+        'total_losses': ('losses', "IFNULL(losses, 0) = 0"),
+        'created_at': ('reg_date', "reg_date IS NULL"),
+        'referred_by': ('referrer_id', "referrer_id IS NULL"),
+    }
+    for old, (new, empty) in renames.items():
+        if old in existing:
+            await backfill(conn, 'users', f"{new} = {old}", f"{empty} AND {old} IS NOT NULL")
+
+
+async def _reconcile_history_and_transactions(conn: aiosqlite.Connection):
+    """game_history va transactions: user_id -> telegram_id va boshqa eski ustun nomlari"""
+    existing = set(await _columns(conn, 'game_history'))
+    await _add_columns(conn, 'game_history', {
+        'telegram_id': "INTEGER",
+        'win_amount': "INTEGER DEFAULT 0",
+        'is_win': "BOOLEAN DEFAULT 0",
+    })
+    if 'user_id' in existing:
+        await backfill(conn, 'game_history', "telegram_id = user_id",
+                       "telegram_id IS NULL AND user_id IS NOT NULL")
+    if 'stars_won' in existing:
+        await backfill(conn, 'game_history', "win_amount = stars_won",
+                       "IFNULL(win_amount, 0) = 0 AND stars_won IS NOT NULL")
+    if 'is_winner' in existing:
+        await backfill(conn, 'game_history', "is_win = is_winner",
+                       "IFNULL(is_win, 0) = 0 AND is_winner IS NOT NULL")
+
+    existing = set(await _columns(conn, 'transactions'))
+    await _add_columns(conn, 'transactions', {
+        'telegram_id': "INTEGER",
+        'stars_amount': "INTEGER DEFAULT 0",
+        'attempts_amount': "INTEGER DEFAULT 0",
+        'description': "TEXT",
+    })
+    if 'user_id' in existing:
+        await backfill(conn, 'transactions', "telegram_id = user_id",
+                       "telegram_id IS NULL AND user_id IS NOT NULL")
+    if 'amount' in existing:
+        await backfill(conn, 'transactions', "stars_amount = amount",
+                       "IFNULL(stars_amount, 0) = 0 AND amount IS NOT NULL")
+
+
+async def _config_key_value(conn: aiosqlite.Connection):
+    """Eski config (id, win_probability) -> key/value jadvali va standart qiymatlar"""
+    columns = await _columns(conn, 'config')
+    win_probability = str(DEFAULT_WIN_PROBABILITY)
+    if 'key' not in columns and 'id' in columns:
+        logger.info("Migrating config table from old to new schema")
+        cursor = await conn.execute("SELECT win_probability FROM config WHERE id = 1")
+        row = await cursor.fetchone()
+        if row and row[0] is not None:
+            win_probability = str(row[0])
+        await conn.execute("DROP TABLE config")
+        await conn.execute("""
+            CREATE TABLE config (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    await conn.execute("""
+        INSERT OR IGNORE INTO config (key, value) VALUES
+        ('win_probability', ?),
+        ('daily_bonus_amount', '5'),
+        ('referral_bonus', '10'),
+        ('min_payment_amount', '50'),
+        ('max_payment_amount', '10000')
+    """, (win_probability,))
+
+
+async def _global_counters(conn: aiosqlite.Connection):
+    """Umumiy hisoblagichlar: statistika ekranlari jadvallarni skanerlamasdan o'qiydi"""
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS global_counters (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            users_total INTEGER NOT NULL DEFAULT 0,
+            users_verified INTEGER NOT NULL DEFAULT 0,
+            users_banned INTEGER NOT NULL DEFAULT 0,
+            users_subscribed INTEGER NOT NULL DEFAULT 0,
+            total_spins INTEGER NOT NULL DEFAULT 0,
+            total_wins INTEGER NOT NULL DEFAULT 0,
+            total_losses INTEGER NOT NULL DEFAULT 0,
+            total_stars INTEGER NOT NULL DEFAULT 0,
+            biggest_win INTEGER NOT NULL DEFAULT 0,
+            history_games INTEGER NOT NULL DEFAULT 0,
+            history_wins INTEGER NOT NULL DEFAULT 0,
+            history_stars_won INTEGER NOT NULL DEFAULT 0,
+            purchases INTEGER NOT NULL DEFAULT 0,
+            purchased_stars INTEGER NOT NULL DEFAULT 0,
+            reconciled_at TIMESTAMP
+        )
+    """)
+    await conn.execute("INSERT OR IGNORE INTO global_counters (id) VALUES (1)")
+
+
+async def _indexes(conn: aiosqlite.Connection):
+    """Foydalanuvchi bo'yicha va retention uchun vaqt indekslari"""
+    await conn.execute("DROP INDEX IF EXISTS idx_game_history_user_id")
+    await conn.execute("DROP INDEX IF EXISTS idx_transactions_user_id")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_game_history_telegram_id ON game_history(telegram_id)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_telegram_id ON transactions(telegram_id)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_game_history_timestamp ON game_history(timestamp)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_timestamp ON transactions(timestamp)")
+
+
+async def _partition_reels_column(conn: aiosqlite.Connection):
+    """Barabanlar emoji qatori bilan yaratilgan oylik bo'laklarga butun son ustunini qo'shish"""
+    cursor = await conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB 'game_history_[0-9][0-9][0-9][0-9][0-9][0-9]'"
+    )
+    for (table,) in await cursor.fetchall():
+        await _add_columns(conn, table, {'reels': "INTEGER"})
+
+
+async def _import_checkpoints(conn: aiosqlite.Connection):
+    """db.tools import uchun davom ettirish nuqtalari (paket bilan bitta tranzaksiyada yoziladi)"""
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            source TEXT PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            rows_done INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+async def _incremental_auto_vacuum(conn: aiosqlite.Connection):
+    """
+    auto_vacuum=INCREMENTAL: o'chirilgan sahifalar freelist da qoladi va
+    PRAGMA incremental_vacuum bilan bo'laklab faylga qaytariladi (db/maintenance.py).
+    Mavjud bazada rejim bir martalik to'liq VACUUM dan keyin kuchga kiradi - u
+    ishga tushishda emas, bot to'xtatilganda bajariladi: python -m db.tools vacuum
+    """
+    await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+
+# Kunlik yig'indiga qo'shish: jonli yozuvlar ham, qayta qurish ham shu ON CONFLICT bilan birlashtiradi
+DAILY_STATS_MERGE = """
+    ON CONFLICT (telegram_id, day) DO UPDATE SET
+        spins = spins + excluded.spins,
+        wins = wins + excluded.wins,
+        stars_won = stars_won + excluded.stars_won,
+        max_win = MAX(max_win, excluded.max_win)
+"""
+
+
+async def rebuild_daily_stats(conn: aiosqlite.Connection) -> int:
+    """
+    user_daily_stats ni butun o'yin tarixidan (eski game_history va oylik
+    bo'laklar) qayta qurish. Commit chaqiruvchida - o'quvchilar commit gacha
+    eski yig'indini ko'radi. Qaytariladi: yig'indi qatorlari soni.
+    """
+    await conn.execute("DELETE FROM user_daily_stats")
+    cursor = await conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB 'game_history_[0-9][0-9][0-9][0-9][0-9][0-9]'"
+    )
+    tables = [row[0] for row in await cursor.fetchall()]
+    if {'telegram_id', 'win_amount', 'is_win', 'timestamp'} <= set(await _columns(conn, 'game_history')):
+        tables.insert(0, 'game_history')
+
+    for table in tables:
+        await conn.execute(f"""
+            INSERT INTO user_daily_stats (telegram_id, day, spins, wins, stars_won, max_win)
+            SELECT telegram_id, date(timestamp), COUNT(*),
+                   COUNT(CASE WHEN is_win THEN 1 END),
+                   IFNULL(SUM(CASE WHEN is_win THEN win_amount ELSE 0 END), 0),
+                   IFNULL(MAX(CASE WHEN is_win THEN win_amount ELSE 0 END), 0)
+            FROM {table}
+            WHERE telegram_id IS NOT NULL AND timestamp IS NOT NULL
+            GROUP BY telegram_id, date(timestamp)
+            {DAILY_STATS_MERGE}
+        """)
+    cursor = await conn.execute("SELECT COUNT(*) FROM user_daily_stats")
+    rows = (await cursor.fetchone())[0]
+    logger.info(f"user_daily_stats qayta qurildi: {len(tables)} jadvaldan {rows} ta kunlik qator")
+    return rows
+
+
+async def _user_daily_stats(conn: aiosqlite.Connection):
+    """
+    Foydalanuvchi bo'yicha kunlik yig'indi (UTC kuni): profil va admin
+    statistikasi xom o'yin tarixini skanerlamasdan shu jadvalni o'qiydi.
+    """
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_daily_stats (
+            telegram_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            spins INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            stars_won INTEGER NOT NULL DEFAULT 0,
+            max_win INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (telegram_id, day)
+        ) WITHOUT ROWID
+    """)
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_user_daily_stats_day ON user_daily_stats(day)")
+    await rebuild_daily_stats(conn)
+
+
+async def _payments(conn: aiosqlite.Connection):
+    """
+    To'lovlar daftari: telegram_payment_charge_id noyob - qayta yetkazilgan
+    successful_payment ikkinchi marta hisobga yozilmaydi. Retention bu jadvalga
+    tegmaydi (takrorni aniqlash kaliti muddatsiz kerak).
+    """
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS payments (
+            id INTEGER PRIMARY KEY,
+            telegram_payment_charge_id TEXT NOT NULL,
+            provider_payment_charge_id TEXT,
+            telegram_id INTEGER NOT NULL,
+            currency TEXT NOT NULL DEFAULT 'XTR',
+            total_amount INTEGER NOT NULL DEFAULT 0,
+            attempts_amount INTEGER NOT NULL DEFAULT 0,
+            payload TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_payments_charge_id ON payments(telegram_payment_charge_id)"
+    )
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_telegram_id ON payments(telegram_id)")
+
+
+async def _users_version(conn: aiosqlite.Connection):
+    """users.version - optimistik yozuvlar uchun qator versiyasi (har UPDATE users da +1)"""
+    await _add_columns(conn, 'users', {'version': "INTEGER NOT NULL DEFAULT 0"})
+
+
+async def _config_version(conn: aiosqlite.Connection):
+    """
+    config_version - config jadvalidagi har bir o'zgarishda (boshqa jarayon yoki
+    sqlite3 qobig'idan ham) triggerlar oshiradigan hisoblagich. Konfiguratsiya
+    kuzatuvchisi faqat shu qatorni o'qiydi: aylantirishlar commit qilganda oshmaydi.
+    """
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS config_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    await conn.execute("INSERT OR IGNORE INTO config_version (id) VALUES (1)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        await conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS config_version_{event.lower()} AFTER {event} ON config
+            BEGIN
+                UPDATE config_version SET version = version + 1 WHERE id = 1;
+            END
+        """)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "asosiy jadvallar", _create_base_schema),
+    Migration(2, "users ustunlari (stars, wins, reg_date, ...)", _reconcile_users),
+    Migration(3, "game_history/transactions: telegram_id", _reconcile_history_and_transactions),
+    Migration(4, "config key/value", _config_key_value),
+    Migration(5, "global_counters", _global_counters),
+    Migration(6, "indekslar", _indexes),
+    Migration(7, "oylik bo'laklarga reels ustuni", _partition_reels_column),
+    Migration(8, "import_checkpoints", _import_checkpoints),
+    Migration(9, "auto_vacuum=INCREMENTAL", _incremental_auto_vacuum),
+    Migration(10, "user_daily_stats", _user_daily_stats),
+    Migration(11, "payments (noyob charge id)", _payments),
+    Migration(12, "users.version (optimistik yozuvlar)", _users_version),
+    Migration(13, "config_version (konfiguratsiya kuzatuvchisi)", _config_version),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def run_migrations(conn: aiosqlite.Connection,
+                         migrations: Optional[List[Migration]] = None) -> List[int]:
+    """
+    Bazani oxirgi versiyaga yangilash. Baza yangi bo'lsa - bitta PRAGMA o'qish.
+    Har bir migratsiya o'z tranzaksiyasida, versiya bilan birga commit qilinadi
+    (backfill bo'laklari alohida commit qilinadi); xato bo'lsa, keyingi ishga
+    tushirishda shu migratsiyadan davom etadi.
+    Qaytariladi: qo'llanilgan versiyalar.
+    """
+    migrations = migrations or MIGRATIONS
+    cursor = await conn.execute("PRAGMA user_version")
+    current = (await cursor.fetchone())[0]
+    if current >= migrations[-1].version:
+        return []
+
+    applied = []
+    for migration in migrations:
+        if migration.version <= current:
+            continue
+        started = time.perf_counter()
+        try:
+            # sqlite3 DDL oldidan tranzaksiya ochmaydi - ALTER/CREATE ham shu tranzaksiyaga kirsin
+            await conn.execute("BEGIN")
+            await migration.apply(conn)
+            # PRAGMA parametr qabul qilmaydi - versiya ro'yxatdagi butun son
+            await conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            logger.error(f"Migratsiya {migration.version} ({migration.description}) bajarilmadi")
+            raise
+        applied.append(migration.version)
+        logger.info(f"Migratsiya {migration.version} qo'llanildi: {migration.description} "
+                    f"({time.perf_counter() - started:.2f}s)")
+    return applied
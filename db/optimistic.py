@@ -0,0 +1,49 @@
+"""
+🎰 Slot Game Bot — users.version bo'yicha optimistik yozuvlar metrikalari
+"""
+import random
+from typing import Dict, Any
+
+# Shartli UPDATE ... WHERE version = ? hech qator topmadi - qator orada o'zgargan
+CONFLICT = object()
+
+
+def retry_delay(attempt: int, base_ms: float) -> float:
+    """Qayta urinishdan oldingi tasodifiy kutish (soniya): 0..base_ms * 2^(attempt-1)"""
+    return random.uniform(0, base_ms * 2 ** max(attempt - 1, 0)) / 1000
+
+
+class ConflictStats:
+    """
+    Amal bo'yicha optimistik yozuvlar hisoblagichlari: muvaffaqiyatli
+    yozuvlar, to'qnashuvlar (versiya mos kelmagan shartli UPDATE), urinishlar
+    tugab bekor qilingan yozuvlar va bitta yozuvdagi eng ko'p qayta urinish.
+    """
+
+    def __init__(self):
+        self._operations: Dict[str, Dict[str, int]] = {}
+
+    def record(self, operation: str, conflicts: int, committed: bool):
+        stats = self._operations.setdefault(operation, {
+            'writes': 0, 'conflicts': 0, 'exhausted': 0, 'max_retries': 0
+        })
+        stats['conflicts'] += conflicts
+        stats['max_retries'] = max(stats['max_retries'], conflicts)
+        if committed:
+            stats['writes'] += 1
+        else:
+            stats['exhausted'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        writes = sum(stats['writes'] for stats in self._operations.values())
+        conflicts = sum(stats['conflicts'] for stats in self._operations.values())
+        # Bekor qilingan yozuvning har bir urinishi allaqachon conflicts da
+        attempts = writes + conflicts
+        return {
+            'writes': writes,
+            'conflicts': conflicts,
+            'exhausted': sum(stats['exhausted'] for stats in self._operations.values()),
+            # Shartli UPDATE larning necha foizi to'qnashuvga uchradi
+            'conflict_rate': round(conflicts / attempts * 100, 2) if attempts else 0.0,
+            'operations': {name: dict(stats) for name, stats in self._operations.items()}
+        }
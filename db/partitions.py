@@ -0,0 +1,126 @@
+"""
+🎰 Slot Game Bot — game_history ning oylik bo'laklari (partitions)
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryPartitions:
+    """
+    O'yin tarixi har oy uchun alohida jadvalga yoziladi: game_history_YYYYMM.
+
+    Eski oyni o'chirish - bitta DROP TABLE, foydalanuvchi bo'yicha so'rovlar
+    esa faqat oxirgi bir necha oy jadvallarini o'qiydi. Barcha tarix (eski
+    game_history jadvali ham) game_history_all ko'rinishi orqali o'qiladi.
+    """
+
+    PREFIX = "game_history_"
+    LEGACY_TABLE = "game_history"
+    VIEW = "game_history_all"
+    COLUMNS = "telegram_id, reels, win_amount, is_win, timestamp"
+    # Eski jadvalda barabanlar emoji qatori sifatida saqlangan - ko'rinishda kodi yo'q
+    LEGACY_COLUMNS = "telegram_id, NULL AS reels, win_amount, is_win, timestamp"
+
+    def __init__(self):
+        self._months: List[str] = []
+        self._loaded = False
+        self._legacy_compatible = False
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def month_of(moment: Optional[datetime] = None) -> str:
+        """Bo'lak kaliti: YYYYMM (CURRENT_TIMESTAMP kabi UTC bo'yicha)"""
+        return (moment or datetime.utcnow()).strftime('%Y%m')
+
+    @staticmethod
+    def window_start(months: int, moment: Optional[datetime] = None) -> str:
+        """Oxirgi months ta kalendar oyining birinchi kuni (YYYY-MM-DD, UTC) - user_daily_stats.day uchun"""
+        moment = moment or datetime.utcnow()
+        index = moment.year * 12 + moment.month - 1 - (max(months, 1) - 1)
+        return f"{index // 12:04d}-{index % 12 + 1:02d}-01"
+
+    def table(self, month: str) -> str:
+        return f"{self.PREFIX}{month}"
+
+    @property
+    def months(self) -> List[str]:
+        """Mavjud bo'laklar, eskidan yangiga"""
+        return list(self._months)
+
+    def sources(self) -> List[Tuple[str, str]]:
+        """game_history_all tarkibi: (ustunlar, jadval), eskidan yangiga"""
+        sources = [(self.LEGACY_COLUMNS, self.LEGACY_TABLE)] if self._legacy_compatible else []
+        return sources + [(self.COLUMNS, self.table(month)) for month in self._months]
+
+    def recent_tables(self, months: int) -> List[str]:
+        """Oxirgi months ta oy uchun mavjud bo'lak jadvallari"""
+        return [self.table(month) for month in self._months[-months:]] if months > 0 else []
+
+    async def load(self, conn: aiosqlite.Connection):
+        """Mavjud bo'laklarni sqlite_master dan o'qish"""
+        cursor = await conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?",
+            (f"{self.PREFIX}[0-9][0-9][0-9][0-9][0-9][0-9]",)
+        )
+        self._months = sorted(row[0][len(self.PREFIX):] for row in await cursor.fetchall())
+
+        # Eski jadval yozuvchilar ishlatadigan ustunlarga ega bo'lsagina ko'rinishga qo'shiladi
+        cursor = await conn.execute(f"PRAGMA table_info({self.LEGACY_TABLE})")
+        legacy_columns = {row[1] for row in await cursor.fetchall()}
+        self._legacy_compatible = {'telegram_id', 'win_amount', 'is_win', 'timestamp'} <= legacy_columns
+        self._loaded = True
+
+    async def ensure(self, database, month: Optional[str] = None) -> str:
+        """
+        Oy bo'lagi mavjudligini ta'minlash va jadval nomini qaytarish.
+        Odatda faqat xotiradagi ro'yxatni tekshiradi; oy almashganda bir marta DDL bajaradi.
+        """
+        month = month or self.month_of()
+        if self._loaded and month in self._months:
+            return self.table(month)
+
+        async with self._lock:
+            async with database._get_connection("ensure") as conn:
+                # Boshqa jarayon yaratgan bo'laklarni ham ko'rish uchun qayta o'qiladi
+                await self.load(conn)
+                if month not in self._months:
+                    table = self.table(month)
+                    await conn.execute(f"""
+                        CREATE TABLE IF NOT EXISTS {table} (
+                            id INTEGER PRIMARY KEY,
+                            telegram_id INTEGER NOT NULL,
+                            reels INTEGER,
+                            win_amount INTEGER DEFAULT 0,
+                            is_win BOOLEAN,
+                            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        )
+                    """)
+                    await conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{table}_telegram_id ON {table}(telegram_id)"
+                    )
+                    self._months = sorted(set(self._months) | {month})
+                    await self._rebuild_view(conn)
+                    await conn.commit()
+                    logger.info(f"Yangi o'yin tarixi bo'lagi yaratildi: {table}")
+        return self.table(month)
+
+    async def drop(self, conn: aiosqlite.Connection, month: str):
+        """Butun oy bo'lagini o'chirish (chaqiruvchi commit qiladi)"""
+        await conn.execute(f"DROP TABLE IF EXISTS {self.table(month)}")
+        self._months = [existing for existing in self._months if existing != month]
+        await self._rebuild_view(conn)
+
+    async def _rebuild_view(self, conn: aiosqlite.Connection):
+        """game_history_all ko'rinishini mavjud bo'laklar bo'yicha qayta yaratish"""
+        sources = self.sources()
+        await conn.execute(f"DROP VIEW IF EXISTS {self.VIEW}")
+        if not sources:
+            return
+        union = "\nUNION ALL\n".join(f"SELECT {columns} FROM {source}" for columns, source in sources)
+        await conn.execute(f"CREATE VIEW {self.VIEW} AS {union}")
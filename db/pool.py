@@ -0,0 +1,195 @@
+"""
+🎰 Slot Game Bot — Ulanishlar puli telemetriyasi va avtomatik o'lchami
+"""
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(asyncio.TimeoutError):
+    """Belgilangan vaqt ichida puldan ulanish olinmadi"""
+
+
+class Histogram:
+    """
+    Qat'iy chegarali (millisekund) gistogramma. Kuzatuv O(log n), xotira
+    o'zgarmas; foizliklar (p50/p95/p99) chelak yuqori chegarasi bilan baholanadi.
+    """
+
+    BOUNDS_MS: Tuple[float, ...] = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        # Oxirgi chelak - eng katta chegaradan oshganlar
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        self.counts[bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    @classmethod
+    def percentile_of(cls, counts: List[int], q: float) -> float:
+        """Chelaklar sonidan q-foizlik (0..1) - chelak yuqori chegarasi, ms"""
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, bucket in enumerate(counts):
+            seen += bucket
+            if seen >= rank:
+                return cls.BOUNDS_MS[index] if index < len(cls.BOUNDS_MS) else float('inf')
+        return float('inf')
+
+    def percentile(self, q: float) -> float:
+        return self.percentile_of(self.counts, q)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 2),
+            'buckets': {
+                (f"<={bound}" if index < len(self.BOUNDS_MS) else f">{self.BOUNDS_MS[-1]}"): bucket
+                for index, (bound, bucket) in enumerate(zip(self.BOUNDS_MS + (None,), self.counts))
+                if bucket
+            }
+        }
+
+
+class PoolTelemetry:
+    """
+    Bitta pul (yozuvchi yoki o'quvchilar) uchun metrikalar: ulanish olishni
+    kutish va ushlab turish vaqtlari, band ulanishlar soni (saturation),
+    timeoutlar va leak_threshold soniyadan uzoq ushlangan ulanishlar.
+    """
+
+    def __init__(self, name: str, size: int, leak_threshold: float = 30.0):
+        self.name = name
+        # size - ruxsat etilgan ulanishlar chegarasi, opened - hozir ochiq ulanishlar
+        self.size = size
+        self.opened = 0
+        self.leak_threshold = leak_threshold
+        self.acquire_wait = Histogram()
+        self.hold = Histogram()
+
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.waiting = 0
+        self.timeouts = 0
+        self.leaks = 0
+
+        # token -> (olingan vaqt, chaqiruvchi, allaqachon xabar berilganmi)
+        self._holders: Dict[int, List] = {}
+        self._next_token = 0
+        # Avtomatik o'lcham uchun oxirgi qarordan beri cho'qqi
+        self.window_peak = 0
+
+    def acquired(self, wait: float, owner: str) -> int:
+        """Ulanish berildi - kuzatish tokenini qaytaradi"""
+        self.acquire_wait.observe(wait)
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        self.window_peak = max(self.window_peak, self.in_use)
+        self._next_token += 1
+        self._holders[self._next_token] = [time.monotonic(), owner, False]
+        return self._next_token
+
+    def released(self, token: int):
+        """Ulanish qaytarildi"""
+        started, owner, reported = self._holders.pop(token)
+        held = time.monotonic() - started
+        self.hold.observe(held)
+        self.in_use -= 1
+        if held >= self.leak_threshold and not reported:
+            self.leaks += 1
+            logger.warning(f"{self.name}: ulanish {held:.1f}s ushlab turildi ({owner})")
+
+    def timed_out(self, waited: float, owner: str):
+        self.timeouts += 1
+        logger.error(f"{self.name}: {waited:.1f}s ichida ulanish olinmadi ({owner}), "
+                     f"band: {self.in_use}/{self.size}, kutayotganlar: {self.waiting}")
+
+    def find_leaks(self) -> List[Dict[str, Any]]:
+        """Hozir leak_threshold dan uzoq ushlanayotgan ulanishlar (har biri bir marta loglanadi)"""
+        now = time.monotonic()
+        leaks = []
+        for holder in self._holders.values():
+            started, owner, reported = holder
+            held = now - started
+            if held < self.leak_threshold:
+                continue
+            leaks.append({'owner': owner, 'held_seconds': round(held, 1)})
+            if not reported:
+                holder[2] = True
+                self.leaks += 1
+                logger.warning(f"{self.name}: ulanish {held:.1f}s dan beri qaytarilmagan ({owner})")
+        return leaks
+
+    @property
+    def saturation(self) -> float:
+        """Band ulanishlar ulushi (0..1)"""
+        return self.in_use / self.size if self.size else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'size': self.size,
+            'opened': self.opened,
+            'in_use': self.in_use,
+            'peak_in_use': self.peak_in_use,
+            'saturation': round(self.saturation, 2),
+            'waiting': self.waiting,
+            'timeouts': self.timeouts,
+            'leaks': self.leaks,
+            'acquire_wait': self.acquire_wait.snapshot(),
+            'hold': self.hold.snapshot()
+        }
+
+
+class PoolAutosizer:
+    """
+    O'quvchilar puli o'lchamini kuzatilgan kutish bo'yicha min_size..max_size
+    oralig'ida tanlaydi. Oxirgi qarordan beri p95 kutish grow_wait_ms dan oshsa
+    pul kattalashadi, band ulanishlar cho'qqisi yarmidan kam bo'lsa kichrayadi.
+    """
+
+    def __init__(self, min_size: int, max_size: int, grow_wait_ms: float = 50.0,
+                 grow_step: int = 2):
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.grow_wait_ms = grow_wait_ms
+        self.grow_step = grow_step
+        self._last_counts: Optional[List[int]] = None
+
+    def target_size(self, telemetry: PoolTelemetry) -> int:
+        """Keyingi oyna uchun tavsiya etilgan o'lcham"""
+        counts = telemetry.acquire_wait.counts
+        window = (
+            [now - before for now, before in zip(counts, self._last_counts)]
+            if self._last_counts else list(counts)
+        )
+        self._last_counts = list(counts)
+        peak, telemetry.window_peak = telemetry.window_peak, telemetry.in_use
+
+        size = telemetry.size
+        if not sum(window):
+            # Oyna davomida so'rov bo'lmagan - asta kichraytirish
+            return max(self.min_size, min(size - 1, self.max_size))
+        if Histogram.percentile_of(window, 0.95) > self.grow_wait_ms or telemetry.waiting:
+            return min(self.max_size, size + self.grow_step)
+        if peak * 2 <= size:
+            return max(self.min_size, size - 1)
+        return min(max(size, self.min_size), self.max_size)
@@ -0,0 +1,233 @@
+"""
+🎰 Slot Game Bot — Eski yozuvlarni bo'laklab o'chirish (retention)
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+# progress(table, deleted_so_far, total_to_delete)
+ProgressCallback = Callable[[str, int, int], Awaitable[None]]
+
+
+class RetentionPolicy:
+    """
+    Bitta jadval uchun saqlash qoidasi.
+
+    counters - o'chirilayotgan qatorlardan global_counters ga ayiriladigan
+    qiymatlar: {hisoblagich: SQL agregat ifodasi}.
+    """
+
+    def __init__(self, table: str, days: int, timestamp_column: str = "timestamp",
+                 counters: Optional[Dict[str, str]] = None, partitions=None):
+        self.table = table
+        self.days = days
+        self.timestamp_column = timestamp_column
+        self.counters = counters or {}
+        # HistoryPartitions: muddati to'liq o'tgan oylik bo'laklar DROP bilan o'chiriladi
+        self.partitions = partitions
+
+
+DEFAULT_POLICIES = {
+    'game_history': {
+        'history_games': "COUNT(*)",
+        'history_wins': "COUNT(CASE WHEN is_win THEN 1 END)",
+        'history_stars_won': "IFNULL(SUM(CASE WHEN is_win THEN win_amount ELSE 0 END), 0)"
+    },
+    'transactions': {
+        'purchases': "COUNT(CASE WHEN transaction_type = 'purchase' THEN 1 END)",
+        'purchased_stars': "IFNULL(SUM(CASE WHEN transaction_type = 'purchase' THEN stars_amount ELSE 0 END), 0)"
+    }
+}
+
+
+def build_policies(days_by_table: Dict[str, int], partitions: Optional[Dict[str, Any]] = None
+                   ) -> List[RetentionPolicy]:
+    """{jadval: kunlar} sozlamasidan qoidalar ro'yxatini yasash (0 yoki manfiy - o'chirilmaydi)"""
+    partitions = partitions or {}
+    return [
+        RetentionPolicy(table, days, counters=DEFAULT_POLICIES.get(table), partitions=partitions.get(table))
+        for table, days in days_by_table.items()
+        if days and days > 0
+    ]
+
+
+class RetentionManager:
+    """
+    Eski qatorlarni cheklangan rowid bo'laklarida o'chiradi.
+
+    Har bir bo'lak alohida qisqa tranzaksiya: yozuvchi qulfi uzoq ushlanmaydi,
+    WAL kichik qoladi, bo'laklar orasida boshqa so'rovlarga navbat beriladi.
+    archive_dir berilsa, o'chiriladigan qatorlar avval gzip NDJSON faylga yoziladi.
+    """
+
+    def __init__(self, database, policies: List[RetentionPolicy], chunk_size: int = 2000,
+                 pause_ms: int = 50, archive_dir: Optional[str] = None):
+        self.database = database
+        self.policies = policies
+        self.chunk_size = chunk_size
+        self.pause = pause_ms / 1000
+        self.archive_dir = archive_dir or None
+        self.last_report: Dict[str, Dict[str, Any]] = {}
+
+    async def run(self, progress: Optional[ProgressCallback] = None,
+                  days: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Barcha qoidalarni bajarish. days berilsa, qoidalardagi muddat o'rniga ishlatiladi.
+        Qaytariladi: {jadval: {'deleted', 'archive', 'seconds', 'dropped_partitions'}}
+        """
+        report = {}
+        for policy in self.policies:
+            report[policy.table] = await self._run_policy(policy, days or policy.days, progress)
+        self.last_report = report
+        return report
+
+    async def _run_policy(self, policy: RetentionPolicy, days: int,
+                          progress: Optional[ProgressCallback]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        dropped = await self._drop_partitions(policy, days) if policy.partitions else []
+        cutoff = f"-{int(days)} days"
+        older = f"{policy.timestamp_column} < datetime('now', ?)"
+
+        async with self.database._get_read_connection("_run_policy") as conn:
+            cursor = await conn.execute(f"SELECT COUNT(*) FROM {policy.table} WHERE {older}", (cutoff,))
+            total = (await cursor.fetchone())[0]
+
+        deleted = 0
+        archive_path = None
+        if total and self.archive_dir:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+            archive_path = os.path.join(self.archive_dir, f"{policy.table}-{stamp}.ndjson.gz")
+
+        if progress and total:
+            await progress(policy.table, 0, total)
+
+        while deleted < total:
+            async with self.database._get_connection("_run_policy") as conn:
+                try:
+                    # Bo'lak chegarasi: eng eski chunk_size ta qatorning oxirgi rowid si
+                    cursor = await conn.execute(f"""
+                        SELECT MAX(rowid) FROM (
+                            SELECT rowid FROM {policy.table} WHERE {older}
+                            ORDER BY rowid LIMIT ?
+                        )
+                    """, (cutoff, self.chunk_size))
+                    upper = (await cursor.fetchone())[0]
+                    if upper is None:
+                        break
+                    chunk = f"rowid <= ? AND {older}"
+                    params = (upper, cutoff)
+
+                    if archive_path:
+                        cursor = await conn.execute(f"SELECT * FROM {policy.table} WHERE {chunk}", params)
+                        columns = [column[0] for column in cursor.description]
+                        rows = await cursor.fetchall()
+                        await asyncio.to_thread(self._append_archive, archive_path, columns, rows)
+
+                    if policy.counters:
+                        names = list(policy.counters)
+                        cursor = await conn.execute(
+                            f"SELECT {', '.join(policy.counters[name] for name in names)} "
+                            f"FROM {policy.table} WHERE {chunk}", params
+                        )
+                        removed = await cursor.fetchone()
+                        await self.database._bump_counters(
+                            conn, **{name: -(value or 0) for name, value in zip(names, removed)}
+                        )
+
+                    cursor = await conn.execute(f"DELETE FROM {policy.table} WHERE {chunk}", params)
+                    chunk_deleted = cursor.rowcount
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+
+            if chunk_deleted <= 0:
+                break
+            deleted += chunk_deleted
+            if progress:
+                await progress(policy.table, deleted, total)
+            # Boshqa yozuvchilarga navbat berish
+            await asyncio.sleep(self.pause)
+
+        seconds = round(time.perf_counter() - started, 2)
+        logger.info(f"{policy.table}: {days} kundan eski {deleted} ta qator o'chirildi ({seconds}s)"
+                    + (f", bo'laklar: {dropped}" if dropped else "")
+                    + (f", arxiv: {archive_path}" if archive_path else ""))
+        return {'deleted': deleted, 'archive': archive_path, 'seconds': seconds,
+                'dropped_partitions': dropped}
+
+    async def _drop_partitions(self, policy: RetentionPolicy, days: int) -> List[str]:
+        """
+        Butun oyi muddatdan eski bo'laklarni DROP TABLE bilan o'chirish.
+
+        Arxiv va hisoblagichlar o'quvchi ulanishdan olinadi (eski oy bo'lagiga
+        yozuv tushmaydi), yozuvchi qulfi faqat DROP va ko'rinishni qayta yaratish uchun olinadi.
+        """
+        partitions = policy.partitions
+        await partitions.ensure(self.database)
+        cutoff_month = partitions.month_of(datetime.utcnow() - timedelta(days=days))
+        dropped = []
+        for month in partitions.months:
+            if month >= cutoff_month:
+                break
+            table = partitions.table(month)
+            if self.archive_dir:
+                await self._archive_table(table)
+            removed = {}
+            if policy.counters:
+                names = list(policy.counters)
+                async with self.database._get_read_connection("_drop_partitions") as conn:
+                    cursor = await conn.execute(
+                        f"SELECT {', '.join(policy.counters[name] for name in names)} FROM {table}"
+                    )
+                    removed = dict(zip(names, await cursor.fetchone()))
+
+            async with self.database._get_connection("_drop_partitions") as conn:
+                try:
+                    if removed:
+                        await self.database._bump_counters(
+                            conn, **{name: -(value or 0) for name, value in removed.items()}
+                        )
+                    await partitions.drop(conn, month)
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    # Xotiradagi bo'laklar ro'yxatini bazadagi holatga qaytarish
+                    await partitions.load(conn)
+                    raise
+            dropped.append(table)
+            await asyncio.sleep(self.pause)
+        return dropped
+
+    async def _archive_table(self, table: str) -> str:
+        """Butun jadvalni o'quvchi ulanishdan chunk_size lik bo'laklarda gzip NDJSON ga yozish"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"{table}.ndjson.gz")
+        # Oldingi muvaffaqiyatsiz urinishdan qolgan fayl qayta yoziladi - qatorlar takrorlanmaydi
+        if os.path.exists(path):
+            os.remove(path)
+        async with self.database._get_read_connection("_archive_table") as conn:
+            cursor = await conn.execute(f"SELECT * FROM {table}")
+            columns = [column[0] for column in cursor.description]
+            while True:
+                rows = await cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                await asyncio.to_thread(self._append_archive, path, columns, rows)
+        return path
+
+    @staticmethod
+    def _append_archive(path: str, columns: List[str], rows) -> None:
+        """Qatorlarni gzip NDJSON faylga qo'shish (o'chirishdan oldin)"""
+        with gzip.open(path, 'at', encoding='utf-8') as archive:
+            for row in rows:
+                archive.write(json.dumps(dict(zip(columns, tuple(row))), ensure_ascii=False, default=str))
+                archive.write("\n")
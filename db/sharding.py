@@ -0,0 +1,644 @@
+"""
+🎰 Slot Game Bot — Foydalanuvchilar bo'yicha shardlangan SQLite ombori
+"""
+import asyncio
+import copy
+import heapq
+import logging
+import math
+import os
+import time
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator, Sequence, Iterable, Callable
+
+from config.settings import DATABASE_PATH, DB_SHARD_COUNT
+from db.storage import Storage, PlayRound
+from db.database import Database
+from db.partitions import HistoryPartitions
+from bot.reel_codec import Reels
+
+logger = logging.getLogger(__name__)
+
+# Har bir shard faylidagi config kalitlari - fayl qaysi bo'linishga tegishli
+SHARD_INDEX_KEY = 'shard_index'
+SHARD_COUNT_KEY = 'shard_count'
+SHARD_META_KEYS = (SHARD_INDEX_KEY, SHARD_COUNT_KEY)
+
+# Birlashtirishda qo'shilmaydigan, eng kattasi olinadigan metrikalar (vaqt, ulush, chegara)
+_PEAK_METRICS = {'saturation', 'hit_rate', 'ttl_seconds', 'acquire_timeout', 'interval_seconds'}
+
+
+def shard_paths(db_path: str, count: int) -> List[str]:
+    """Shard fayllari: 1 ta bo'lsa asosiy fayl, aks holda data/slot_game.shard0.db, ..."""
+    if count <= 1:
+        return [db_path]
+    root, ext = os.path.splitext(db_path)
+    return [f"{root}.shard{index}{ext}" for index in range(count)]
+
+
+def merge_metrics(parts: Sequence[Any], key: str = '') -> Any:
+    """
+    Shardlar metrikalarini bitta ko'rinishga birlashtirish: hisoblagichlar
+    qo'shiladi, vaqtlar (*_ms), avg_/max_/last_ va ulushlar uchun eng kattasi
+    (eng sekin shard) olinadi, lug'atlar kalit bo'yicha birlashtiriladi.
+    """
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return None
+    first = parts[0]
+    if isinstance(first, dict):
+        keys = list(dict.fromkeys(name for part in parts if isinstance(part, dict) for name in part))
+        return {
+            name: merge_metrics([part.get(name) for part in parts if isinstance(part, dict)], name)
+            for name in keys
+        }
+    if isinstance(first, bool):
+        return any(parts)
+    if isinstance(first, (int, float)):
+        numbers = [part for part in parts if isinstance(part, (int, float))]
+        if key.endswith('_ms') or key.startswith(('avg_', 'max_', 'last_')) or key in _PEAK_METRICS:
+            return max(numbers)
+        return sum(numbers)
+    return first
+
+
+class ShardedDatabase(Storage):
+    """
+    Foydalanuvchilar telegram_id % N bo'yicha N ta SQLite fayliga bo'linadi.
+
+    Har bir shard - to'liq Database (o'z yozuvchisi, o'quvchilar puli, keshi,
+    reytingi, write-behind buferi va texnik xizmati). Foydalanuvchi jadvallari
+    (users, o'yin tarixi, transactions, payments, user_daily_stats, referals
+    yozuvi taklif qiluvchi tomonida) faqat uy shardida turadi, shuning uchun
+    foydalanuvchi bo'yicha har bir amal bitta shardning bitta tranzaksiyasi.
+
+    Umumiy so'rovlar (reyting, hisoblagichlar, statistika) barcha shardlardan
+    parallel yig'ilib birlashtiriladi. config har bir faylda nusxa sifatida
+    saqlanadi: yozuv hammasiga, o'qish 0-sharddan.
+    """
+
+    def __init__(self, db_path: str = DATABASE_PATH, max_connections: int = 10,
+                 shard_count: int = DB_SHARD_COUNT):
+        self.db_path = db_path
+        self.shard_count = max(1, shard_count)
+        # Ulanishlar chegarasi shardlar orasida bo'linadi
+        self.max_connections = max_connections
+        per_shard = self._per_shard_connections(max_connections)
+        self._shards: List[Database] = [
+            Database(path, per_shard) for path in shard_paths(db_path, self.shard_count)
+        ]
+        for index, shard in enumerate(self._shards):
+            # Retention arxivlari bir xil soniyada bir xil nom olmasligi uchun
+            if shard._retention.archive_dir:
+                shard._retention.archive_dir = os.path.join(shard._retention.archive_dir, f"shard{index}")
+
+    @property
+    def shards(self) -> List[Database]:
+        return list(self._shards)
+
+    def _per_shard_connections(self, max_connections: int) -> int:
+        return max(2, math.ceil(max_connections / self.shard_count))
+
+    def _shard(self, telegram_id: int) -> Database:
+        """Foydalanuvchining uy shardi"""
+        return self._shards[telegram_id % self.shard_count]
+
+    async def _gather(self, call: Callable[[Database], Any]) -> List[Any]:
+        """Bir xil amalni barcha shardlarda parallel bajarish"""
+        return list(await asyncio.gather(*(call(shard) for shard in self._shards)))
+
+    # === HAYOT SIKLI ===
+
+    async def init_db(self):
+        """
+        Har bir shardni migratsiya qilish va fayl shu bo'linishga tegishli
+        ekanini tekshirish. Boshqa shard soni bilan yozilgan fayl yoki
+        bo'linmagan eski baza topilsa ishga tushmaydi - avval reshard kerak.
+        """
+        fresh = [not os.path.exists(shard.db_path) for shard in self._shards]
+        if any(fresh) and self.shard_count > 1 and os.path.exists(self.db_path) \
+                and os.path.getsize(self.db_path) > 0:
+            raise RuntimeError(
+                f"{self.db_path} bo'linmagan ma'lumotlarni saqlaydi, shard fayllari esa yo'q. "
+                f"Avval: python -m db.tools reshard --from 1 --to {self.shard_count}"
+            )
+
+        await self._gather(lambda shard: shard.init_db())
+
+        for index, shard in enumerate(self._shards):
+            stored_count = await shard.get_config_value(SHARD_COUNT_KEY)
+            if not stored_count:
+                await shard.set_config_value(SHARD_INDEX_KEY, str(index))
+                await shard.set_config_value(SHARD_COUNT_KEY, str(self.shard_count))
+                continue
+            stored_index = await shard.get_config_value(SHARD_INDEX_KEY)
+            if int(stored_count) != self.shard_count or int(stored_index or -1) != index:
+                raise RuntimeError(
+                    f"{shard.db_path} {stored_index}/{stored_count} shard sifatida yozilgan, "
+                    f"sozlama esa {index}/{self.shard_count}. "
+                    f"Avval: python -m db.tools reshard --from {stored_count} --to {self.shard_count}"
+                )
+        logger.info(f"Shardlangan ombor tayyor: {self.shard_count} ta fayl")
+
+    async def close(self):
+        await self._gather(lambda shard: shard.close())
+
+    # === FOYDALANUVCHILAR ===
+
+    async def register_user(self, telegram_id: int, username: str = None,
+                            first_name: str = None, referrer_id: int = None) -> bool:
+        """Foydalanuvchi o'z shardida; referal - add_referral orqali, taklif qiluvchining shardida"""
+        if not await self._shard(telegram_id)._insert_user(telegram_id, username, first_name, referrer_id):
+            return False
+        if referrer_id:
+            await self.add_referral(referrer_id, telegram_id)
+        return True
+
+    async def verify_user(self, telegram_id: int) -> bool:
+        return await self._shard(telegram_id).verify_user(telegram_id)
+
+    async def get_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        return await self._shard(telegram_id).get_user(telegram_id)
+
+    async def update_user_balance(self, telegram_id: int, stars_delta: int, attempts_delta: int = 0) -> bool:
+        return await self._shard(telegram_id).update_user_balance(telegram_id, stars_delta, attempts_delta)
+
+    async def ban_user(self, telegram_id: int) -> bool:
+        return await self._shard(telegram_id).ban_user(telegram_id)
+
+    async def unban_user(self, telegram_id: int) -> bool:
+        return await self._shard(telegram_id).unban_user(telegram_id)
+
+    async def get_all_users(self) -> List[Dict[str, Any]]:
+        """Barcha shardlardagi tasdiqlangan foydalanuvchilar, yangilari birinchi"""
+        users = [user for part in await self._gather(lambda shard: shard.get_all_users()) for user in part]
+        users.sort(key=lambda user: user.get('reg_date') or '', reverse=True)
+        return users
+
+    async def iter_users(self, batch_size: int = 1000, verified_only: bool = True,
+                         columns: Sequence[str] = ('telegram_id', 'username', 'first_name',
+                                                   'channel_subscribed', 'is_banned')
+                         ) -> AsyncIterator[Any]:
+        """
+        Shardlar oqimlarini telegram_id bo'yicha birlashtirish (k-way merge).
+        Har bir shard o'z sahifasini keyset bilan o'qiydi - xotirada N ta sahifa.
+        """
+        iterators = [
+            shard.iter_users(batch_size, verified_only, columns).__aiter__() for shard in self._shards
+        ]
+        if 'telegram_id' not in columns:
+            # Tartib kaliti yo'q - shardlar ketma-ket
+            for iterator in iterators:
+                async for row in iterator:
+                    yield row
+            return
+
+        heap = []
+        for index, iterator in enumerate(iterators):
+            row = await anext(iterator, None)
+            if row is not None:
+                heap.append((row['telegram_id'], index, row))
+        heapq.heapify(heap)
+        while heap:
+            _, index, row = heapq.heappop(heap)
+            yield row
+            following = await anext(iterators[index], None)
+            if following is not None:
+                heapq.heappush(heap, (following['telegram_id'], index, following))
+
+    # === O'YIN ===
+
+    async def record_game_result(self, telegram_id: int, reels: Reels, won: bool, stars_won: int = 0) -> bool:
+        return await self._shard(telegram_id).record_game_result(telegram_id, reels, won, stars_won)
+
+    async def execute_spin(self, telegram_id: int, play_round: PlayRound) -> Dict[str, Any]:
+        return await self._shard(telegram_id).execute_spin(telegram_id, play_round)
+
+    async def claim_daily_bonus(self, telegram_id: int) -> bool:
+        return await self._shard(telegram_id).claim_daily_bonus(telegram_id)
+
+    # === REFERAL ===
+
+    async def add_referral(self, referrer_id: int, referred_id: int) -> bool:
+        """
+        Bir shardda - bitta tranzaksiya. Turli shardlarda ikki tranzaksiya:
+        avval referal yozuvi va taklif qiluvchi bonusi (takroriy referal shu
+        yerda to'xtaydi), keyin do'st bonusi. Ikkinchisi muvaffaqiyatsiz bo'lsa
+        loglanadi - fayllar orasida umumiy tranzaksiya yo'q.
+        """
+        referrer_shard, referred_shard = self._shard(referrer_id), self._shard(referred_id)
+        if referrer_shard is referred_shard:
+            return await referrer_shard.add_referral(referrer_id, referred_id)
+
+        if not await referrer_shard._credit_referral(referrer_id, referred_id, referred_side=False):
+            return False
+        if not await referred_shard._credit_referral(referrer_id, referred_id, referrer_side=False):
+            logger.error(f"Referal {referrer_id} -> {referred_id}: do'st bonusi yozilmadi "
+                         f"(referal yozuvi {referrer_shard.db_path} da saqlangan)")
+            return False
+        return True
+
+    async def get_referral_stats(self, telegram_id: int) -> Dict[str, int]:
+        return await self._shard(telegram_id).get_referral_stats(telegram_id)
+
+    # === REYTING ===
+
+    async def rebuild_leaderboard(self) -> int:
+        return sum(await self._gather(lambda shard: shard.rebuild_leaderboard()))
+
+    async def get_leaderboard(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Har bir shardning top-K ro'yxati birlashtiriladi - global top-K shulardan tashqarida bo'lmaydi"""
+        parts = await self._gather(lambda shard: shard.get_leaderboard(limit))
+        return heapq.nsmallest(
+            limit, (player for part in parts for player in part),
+            key=lambda player: (-(player['stars'] or 0), player['telegram_id'])
+        )
+
+    async def get_user_rank(self, telegram_id: int) -> Dict[str, Optional[int]]:
+        """Global o'rin: barcha shard reytinglarida foydalanuvchidan oldinda turganlar soni + 1"""
+        await asyncio.gather(*(
+            shard.rebuild_leaderboard() for shard in self._shards if not shard._leaderboard.ready
+        ))
+        total = sum(len(shard._leaderboard) for shard in self._shards)
+        stars = self._shard(telegram_id)._leaderboard.score(telegram_id)
+        if stars is None:
+            return {'rank': None, 'total': total}
+        return {
+            'rank': 1 + sum(shard._leaderboard.count_ahead(telegram_id, stars) for shard in self._shards),
+            'total': total
+        }
+
+    # === STATISTIKALAR ===
+
+    async def get_global_counters(self) -> Dict[str, Any]:
+        """Shardlar hisoblagichlari yig'indisi (biggest_win - eng kattasi)"""
+        parts = [part for part in await self._gather(lambda shard: shard.get_global_counters()) if part]
+        if not parts:
+            return {}
+        counters = dict(parts[0])
+        for name, value in counters.items():
+            values = [part.get(name) for part in parts]
+            if name == 'biggest_win':
+                counters[name] = max(value or 0 for value in values)
+            elif name == 'reconciled_at':
+                counters[name] = min((value for value in values if value), default=None)
+            elif name != 'id':
+                counters[name] = sum(value or 0 for value in values)
+        return counters
+
+    async def reconcile_global_counters(self) -> Dict[str, int]:
+        drift: Dict[str, int] = {}
+        for part in await self._gather(lambda shard: shard.reconcile_global_counters()):
+            for name, value in part.items():
+                drift[name] = drift.get(name, 0) + value
+        return drift
+
+    async def get_user_statistics(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        return await self._shard(telegram_id).get_user_statistics(telegram_id)
+
+    async def get_daily_stats(self, days: int = 7, telegram_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Kunlik yig'indi: bitta foydalanuvchi - uy shardidan, umumiy - kun bo'yicha birlashtirib"""
+        if telegram_id is not None:
+            return await self._shard(telegram_id).get_daily_stats(days, telegram_id)
+        merged: Dict[str, Dict[str, Any]] = {}
+        for part in await self._gather(lambda shard: shard.get_daily_stats(days)):
+            for row in part:
+                day = merged.setdefault(row['day'], {
+                    'day': row['day'], 'players': 0, 'spins': 0, 'wins': 0, 'stars_won': 0, 'max_win': 0
+                })
+                for name in ('players', 'spins', 'wins', 'stars_won'):
+                    day[name] += row[name] or 0
+                day['max_win'] = max(day['max_win'], row['max_win'] or 0)
+        return sorted(merged.values(), key=lambda row: row['day'], reverse=True)
+
+    async def rebuild_daily_stats(self) -> int:
+        rows = await self._gather(lambda shard: shard.rebuild_daily_stats())
+        return -1 if any(count < 0 for count in rows) else sum(rows)
+
+    async def get_database_stats(self) -> Dict[str, Any]:
+        parts = [part for part in await self._gather(lambda shard: shard.get_database_stats()) if part]
+        if not parts:
+            return {}
+        stats = merge_metrics(parts)
+        # O'rtacha yutuq o'yinlar soni bo'yicha tortib qayta hisoblanadi
+        games = sum(part.get('total_games') or 0 for part in parts)
+        stats['avg_stars_won'] = (
+            sum((part.get('avg_stars_won') or 0) * (part.get('total_games') or 0) for part in parts) / games
+            if games else None
+        )
+        stats['shards'] = self.shard_count
+        return stats
+
+    async def cleanup_old_data(self, days: Optional[int] = None, progress=None) -> Dict[str, Dict[str, Any]]:
+        """Shardlar navbat bilan tozalanadi - disk bir vaqtda bitta katta o'chirish bilan band"""
+        report: Dict[str, Dict[str, Any]] = {}
+        for shard in self._shards:
+            for table, part in (await shard.cleanup_old_data(days, progress)).items():
+                merged = report.setdefault(table, {'deleted': 0, 'archive': None, 'seconds': 0.0,
+                                                   'dropped_partitions': []})
+                merged['deleted'] += part.get('deleted') or 0
+                merged['seconds'] = round(merged['seconds'] + (part.get('seconds') or 0), 2)
+                merged['archive'] = merged['archive'] or part.get('archive')
+                merged['dropped_partitions'] = sorted(
+                    set(merged['dropped_partitions']) | set(part.get('dropped_partitions') or [])
+                )
+        return report
+
+    # === TO'LOVLAR VA TRANZAKTSIYALAR ===
+
+    async def credit_payment(self, telegram_id: int, charge_id: str, attempts: int, total_amount: int,
+                             currency: str = "XTR", payload: Optional[str] = None,
+                             provider_charge_id: Optional[str] = None,
+                             description: Optional[str] = None) -> Dict[str, Any]:
+        return await self._shard(telegram_id).credit_payment(
+            telegram_id, charge_id, attempts, total_amount, currency, payload, provider_charge_id, description
+        )
+
+    async def add_transaction(self, telegram_id: int, transaction_type: str,
+                              stars_amount: int, attempts_amount: int = 0,
+                              description: str = None) -> bool:
+        return await self._shard(telegram_id).add_transaction(
+            telegram_id, transaction_type, stars_amount, attempts_amount, description
+        )
+
+    # === KONFIGURATSIYA (har bir shardda nusxa) ===
+
+    async def get_win_probability(self) -> float:
+        return await self._shards[0].get_win_probability()
+
+    async def set_win_probability(self, probability: float) -> bool:
+        # Har bir shard spin paytida o'z nusxasini o'qiydi
+        return all(await self._gather(lambda shard: shard.set_win_probability(probability)))
+
+    async def get_config_value(self, key: str, default: str = "") -> str:
+        return await self._shards[0].get_config_value(key, default)
+
+    async def set_config_value(self, key: str, value: str) -> bool:
+        return all(await self._gather(lambda shard: shard.set_config_value(key, value)))
+
+    # === KANAL OBUNASI ===
+
+    async def set_channel_subscription(self, telegram_id: int, subscribed: bool = True) -> bool:
+        return await self._shard(telegram_id).set_channel_subscription(telegram_id, subscribed)
+
+    async def set_channel_subscriptions(self, changes: Iterable[Tuple[int, bool]],
+                                        batch_size: int = 500) -> int:
+        """O'zgarishlar shardlar bo'yicha guruhlanib parallel yoziladi"""
+        grouped: Dict[int, List[Tuple[int, bool]]] = {}
+        for telegram_id, status in changes:
+            grouped.setdefault(telegram_id % self.shard_count, []).append((telegram_id, status))
+        counts = await asyncio.gather(*(
+            self._shards[index].set_channel_subscriptions(chunk, batch_size) for index, chunk in grouped.items()
+        ))
+        return sum(counts)
+
+    async def is_channel_subscribed(self, telegram_id: int) -> bool:
+        return await self._shard(telegram_id).is_channel_subscribed(telegram_id)
+
+    # === OPERATSION METODLAR (barcha shardlarga) ===
+
+    def get_user_cache_stats(self) -> Dict[str, Any]:
+        parts = [shard.get_user_cache_stats() for shard in self._shards]
+        stats = merge_metrics(parts)
+        stats['max_size'] = sum(part['max_size'] for part in parts)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups * 100, 1) if lookups else 0.0
+        return stats
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Yozuvchilar va o'quvchilar barcha shardlar bo'yicha (writer.size - yozuvchilar soni)"""
+        stats = merge_metrics([shard.get_pool_stats() for shard in self._shards])
+        # Avtomatik o'lcham chegaralari har bir shard uchun alohida
+        stats['autosize'] = self._shards[0].get_pool_stats()['autosize']
+        stats['shards'] = self.shard_count
+        return stats
+
+    def resize_pool(self, max_connections: int) -> bool:
+        """Chegarani shardlar orasida qayta bo'lish - biror shard puli ochilgan bo'lsa False"""
+        if any(shard._pool_initialized for shard in self._shards):
+            return False
+        self.max_connections = max_connections
+        per_shard = self._per_shard_connections(max_connections)
+        for shard in self._shards:
+            shard.resize_pool(per_shard)
+        return True
+
+    def get_conflict_stats(self) -> Dict[str, Any]:
+        stats = merge_metrics([shard.get_conflict_stats() for shard in self._shards])
+        attempts = stats['writes'] + stats['conflicts']
+        stats['conflict_rate'] = round(stats['conflicts'] / attempts * 100, 2) if attempts else 0.0
+        return stats
+
+    def start_pool_monitor(self, interval: float = 10.0, autosizer=None):
+        for shard in self._shards:
+            # Autosizer oxirgi kuzatuvni saqlaydi - har shardga alohida nusxa
+            shard.start_pool_monitor(interval, copy.copy(autosizer) if autosizer else None)
+
+    async def stop_pool_monitor(self):
+        await self._gather(lambda shard: shard.stop_pool_monitor())
+
+    async def optimize(self) -> bool:
+        return all(await self._gather(lambda shard: shard.optimize()))
+
+    def start_maintenance(self):
+        for shard in self._shards:
+            shard.start_maintenance()
+
+    async def stop_maintenance(self):
+        await self._gather(lambda shard: shard.stop_maintenance())
+
+    async def run_maintenance(self, job: str) -> Any:
+        """Ish har bir shardda ketma-ket bajariladi. Qaytariladi: {shard fayli: natija}"""
+        return {shard.db_path: await shard.run_maintenance(job) for shard in self._shards}
+
+    def get_maintenance_stats(self) -> Dict[str, Any]:
+        return merge_metrics([shard.get_maintenance_stats() for shard in self._shards])
+
+    async def backup(self, dest: str, pages_per_step: int = 256, sleep: float = 0.02,
+                     max_restarts: int = 3) -> Dict[str, Any]:
+        """Har bir shard dest yonidagi o'z fayliga: <dest>.shardN"""
+        reports = {}
+        for path, shard in zip(shard_paths(dest, self.shard_count), self._shards):
+            reports[path] = await shard.backup(path, pages_per_step, sleep, max_restarts)
+        return reports
+
+    def start_write_behind(self, flush_interval_ms: int = 200, max_batch: int = 500,
+                           max_pending: int = 10000):
+        for shard in self._shards:
+            shard.start_write_behind(flush_interval_ms, max_batch, max_pending)
+
+    async def stop_write_behind(self) -> Dict[str, Any]:
+        return merge_metrics(await self._gather(lambda shard: shard.stop_write_behind()))
+
+    async def flush_write_behind(self) -> int:
+        return sum(await self._gather(lambda shard: shard.flush_write_behind()))
+
+    def get_write_behind_stats(self) -> Dict[str, Any]:
+        return merge_metrics([shard.get_write_behind_stats() for shard in self._shards])
+
+    async def start_config_watcher(self, interval: float = 5.0):
+        await self._gather(lambda shard: shard.start_config_watcher(interval))
+
+    async def stop_config_watcher(self):
+        await self._gather(lambda shard: shard.stop_config_watcher())
+
+
+# === QAYTA BO'LISH (RESHARD) ===
+
+# Foydalanuvchiga tegishli jadvallar: (jadval, foydalanuvchi ustuni, id ko'chiriladimi)
+USER_TABLES = (
+    ('users', 'telegram_id', True),
+    ('transactions', 'telegram_id', False),
+    ('payments', 'telegram_id', False),
+    ('user_daily_stats', 'telegram_id', True),
+    ('referrals', 'referrer_id', False),
+    (HistoryPartitions.LEGACY_TABLE, 'telegram_id', False),
+)
+
+
+async def _columns(conn, schema: str, table: str) -> List[str]:
+    cursor = await conn.execute(f"PRAGMA {schema}.table_info({table})")
+    return [row[1] for row in await cursor.fetchall()]
+
+
+async def _move_users(source: Database, target: Database, telegram_ids: List[int], tables: List[str]) -> int:
+    """
+    Foydalanuvchilar qatorlarini source dan target ga ko'chirish. target da
+    avval shu foydalanuvchilar qatorlari o'chiriladi - uzilgan ishni qayta
+    ishga tushirish xavfsiz. source dan faqat target commit qilgandan keyin o'chiriladi.
+    """
+    placeholders = ",".join("?" * len(telegram_ids))
+    plan = [(table, column, keep_id) for table, column, keep_id in USER_TABLES]
+    plan += [(table, 'telegram_id', False) for table in tables]
+
+    async with target._get_connection("_move_users") as conn:
+        await conn.execute("ATTACH DATABASE ? AS src", (source.db_path,))
+        try:
+            for table, column, keep_id in plan:
+                source_columns = set(await _columns(conn, 'src', table))
+                columns = [
+                    name for name in await _columns(conn, 'main', table)
+                    if name in source_columns and (keep_id or name != 'id')
+                ]
+                if not columns:
+                    continue
+                names = ", ".join(columns)
+                await conn.execute(f"DELETE FROM main.{table} WHERE {column} IN ({placeholders})", telegram_ids)
+                await conn.execute(f"""
+                    INSERT INTO main.{table} ({names})
+                    SELECT {names} FROM src.{table} WHERE {column} IN ({placeholders})
+                """, telegram_ids)
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+        finally:
+            await conn.execute("DETACH DATABASE src")
+
+    async with source._get_connection("_move_users") as conn:
+        for table, column, _ in plan:
+            if await _columns(conn, 'main', table):
+                await conn.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", telegram_ids)
+        await conn.commit()
+    return len(telegram_ids)
+
+
+async def reshard(db_path: str, old_count: int, new_count: int, batch_size: int = 500,
+                  progress: Optional[Callable[[str, int], None]] = None) -> Dict[str, Any]:
+    """
+    Foydalanuvchilarni old_count ta shard faylidan new_count ta faylga qayta
+    bo'lish (bot to'xtatilgan holda). Qatorlar foydalanuvchilar paketlari
+    bilan ko'chiriladi; uzilsa, xuddi shu buyruq bilan davom ettirish mumkin.
+    Bo'shab qolgan eski fayllar o'chirilmaydi - hisobotda qaytariladi.
+    """
+    started = time.perf_counter()
+    source_paths = shard_paths(db_path, old_count)
+    target_paths = shard_paths(db_path, new_count)
+    missing = [path for path in source_paths if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(f"Shard fayllari topilmadi: {', '.join(missing)}")
+    databases: Dict[str, Database] = {}
+    for path in dict.fromkeys(source_paths + target_paths):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        databases[path] = Database(path, max_connections=2)
+
+    moved = 0
+    try:
+        for database in databases.values():
+            await database.init_db()
+
+        # Konfiguratsiya (shard belgilaridan tashqari) barcha yangi fayllarga
+        async with databases[source_paths[0]]._get_read_connection("reshard") as conn:
+            cursor = await conn.execute("SELECT key, value FROM config")
+            config = [row for row in await cursor.fetchall() if row[0] not in SHARD_META_KEYS]
+
+        # Oylik o'yin tarixi bo'laklari nishonlarda oldindan yaratiladi
+        months = sorted({month for path in source_paths for month in databases[path]._history.months})
+        for path in target_paths:
+            for month in months:
+                await databases[path]._history.ensure(databases[path], month)
+
+        for source_path in source_paths:
+            source = databases[source_path]
+            partitions = [source._history.table(month) for month in source._history.months]
+            last_id = None
+            while True:
+                async with source._get_read_connection("reshard") as conn:
+                    cursor = await conn.execute(
+                        "SELECT telegram_id FROM users WHERE telegram_id > ? ORDER BY telegram_id LIMIT ?",
+                        (last_id if last_id is not None else -2 ** 63, batch_size)
+                    )
+                    telegram_ids = [row[0] for row in await cursor.fetchall()]
+                if not telegram_ids:
+                    break
+                last_id = telegram_ids[-1]
+
+                grouped: Dict[str, List[int]] = {}
+                for telegram_id in telegram_ids:
+                    target_path = target_paths[telegram_id % new_count]
+                    if target_path != source_path:
+                        grouped.setdefault(target_path, []).append(telegram_id)
+                for target_path, chunk in grouped.items():
+                    moved += await _move_users(source, databases[target_path], chunk, partitions)
+                if progress:
+                    progress(source_path, moved)
+
+        for index, path in enumerate(target_paths):
+            database = databases[path]
+            async with database._get_connection("reshard") as conn:
+                await conn.executemany(
+                    "INSERT OR REPLACE INTO config (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+                    config
+                )
+                if new_count > 1:
+                    await conn.executemany(
+                        "INSERT OR REPLACE INTO config (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+                        [(SHARD_INDEX_KEY, str(index)), (SHARD_COUNT_KEY, str(new_count))]
+                    )
+                else:
+                    await conn.execute(
+                        f"DELETE FROM config WHERE key IN ({','.join('?' * len(SHARD_META_KEYS))})",
+                        SHARD_META_KEYS
+                    )
+                await conn.commit()
+
+        # Qatorlar hisoblagichlarni chetlab ko'chirildi - har bir faylda qayta hisoblash
+        for database in databases.values():
+            await database.reconcile_global_counters()
+
+        users = {}
+        for path in target_paths:
+            async with databases[path]._get_read_connection("reshard") as conn:
+                cursor = await conn.execute("SELECT COUNT(*) FROM users")
+                users[path] = (await cursor.fetchone())[0]
+        report = {
+            'moved_users': moved,
+            'users': users,
+            'retired': [path for path in source_paths if path not in target_paths],
+            'seconds': round(time.perf_counter() - started, 1)
+        }
+        logger.info(f"Qayta bo'lish {old_count} -> {new_count} tugadi: {report}")
+        return report
+    finally:
+        for database in databases.values():
+            await database.close()
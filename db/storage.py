@@ -0,0 +1,349 @@
+"""
+🎰 Slot Game Bot — Ma'lumotlar ombori interfeysi (SQLite va xotiradagi dvigatellar uchun)
+"""
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple, Callable, AsyncIterator, Sequence, Iterable
+
+from config.settings import DAILY_BONUS_COOLDOWN
+from bot.reel_codec import Reels
+
+logger = logging.getLogger(__name__)
+
+# play_round(win_probability, user) -> (reels, is_winner, stars_won, extra_info)
+PlayRound = Callable[[float, Dict[str, Any]], Tuple[Reels, bool, int, Dict[str, Any]]]
+
+
+class Storage(ABC):
+    """
+    Handlerlar, middleware va fon vazifalari ishlatadigan ombor metodlari.
+
+    Amalga oshirishlar: db.database.Database (aiosqlite, diskda),
+    db.sharding.ShardedDatabase (telegram_id % N bo'yicha N ta Database) va
+    db.memory.MemoryDatabase (lug'at va ro'yxatlar, faqat xotirada).
+    Qaysi biri ishlatilishini STORAGE_BACKEND sozlamasi va get_database()
+    belgilaydi. Xatolar metodlar ichida loglanadi va False/None/{} qaytariladi.
+
+    Pul, backup, write-behind va config kuzatuvchisi kabi operatsion metodlar
+    bu yerda hech narsa qilmaydi - ularga ehtiyoji bor dvigatel qayta yozadi.
+    """
+
+    # Ma'lumotlar jarayon tugagach ham saqlanadimi (backup faqat shunda ma'noli)
+    persistent = True
+
+    @property
+    def shards(self) -> List['Storage']:
+        """Alohida fayl/ombor sifatida backup qilinadigan qismlar (shardlangan omborda - har bir shard)"""
+        return [self]
+
+    # === HAYOT SIKLI ===
+
+    @abstractmethod
+    async def init_db(self):
+        """Sxema/tuzilmalarni tayyorlash (ishga tushganda bir marta)"""
+
+    @abstractmethod
+    async def close(self):
+        """Barcha resurslarni yopish"""
+
+    # === FOYDALANUVCHILAR ===
+
+    @abstractmethod
+    async def register_user(self, telegram_id: int, username: str = None,
+                            first_name: str = None, referrer_id: int = None) -> bool:
+        """Yangi foydalanuvchini ro'yxatdan o'tkazish (mavjud bo'lsa o'zgarmaydi)"""
+
+    @abstractmethod
+    async def verify_user(self, telegram_id: int) -> bool:
+        """Foydalanuvchini tasdiqlangan deb belgilash"""
+
+    @abstractmethod
+    async def get_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Foydalanuvchi qatori (daily_streak hisoblangan) yoki None"""
+
+    @abstractmethod
+    async def update_user_balance(self, telegram_id: int, stars_delta: int, attempts_delta: int = 0) -> bool:
+        """Yulduz va urinishlarni o'zgartirish (manfiyga tushmaydi)"""
+
+    @abstractmethod
+    async def ban_user(self, telegram_id: int) -> bool:
+        """Foydalanuvchini bloklash"""
+
+    @abstractmethod
+    async def unban_user(self, telegram_id: int) -> bool:
+        """Foydalanuvchini blokdan chiqarish"""
+
+    @abstractmethod
+    async def get_all_users(self) -> List[Dict[str, Any]]:
+        """Tasdiqlangan foydalanuvchilar, yangilari birinchi (admin uchun)"""
+
+    @abstractmethod
+    def iter_users(self, batch_size: int = 1000, verified_only: bool = True,
+                   columns: Sequence[str] = ('telegram_id', 'username', 'first_name',
+                                             'channel_subscribed', 'is_banned')
+                   ) -> AsyncIterator[Any]:
+        """
+        Foydalanuvchilarni telegram_id tartibida sahifalab qaytarish.
+        verified_only - faqat tasdiqlanganlar (False - hammasi); boshqa shartlar
+        interfeysda yo'q, chunki har bir dvigatel ularni bir xil bajara olishi kerak.
+        """
+
+    # === O'YIN ===
+
+    @abstractmethod
+    async def record_game_result(self, telegram_id: int, reels: Reels, won: bool, stars_won: int = 0) -> bool:
+        """O'yin natijasini qayd qilish (urinish ayiriladi)"""
+
+    @abstractmethod
+    async def execute_spin(self, telegram_id: int, play_round: PlayRound) -> Dict[str, Any]:
+        """
+        Urinishni ayirish, natijani hisoblash va qayd qilish - bitta atomar amal.
+        Qaytariladi: {'success', 'user', 'reels', 'is_winner', 'stars_won',
+        'extra_info', 'win_probability'} yoki {'success': False, 'reason': ...}
+        """
+
+    @abstractmethod
+    async def claim_daily_bonus(self, telegram_id: int) -> bool:
+        """Kunlik bonusni olish"""
+
+    # === REFERAL ===
+
+    @abstractmethod
+    async def add_referral(self, referrer_id: int, referred_id: int) -> bool:
+        """Referal qo'shish va ikkala tomonga bonus berish"""
+
+    @abstractmethod
+    async def get_referral_stats(self, telegram_id: int) -> Dict[str, int]:
+        """{'referrals', 'total_bonus'}"""
+
+    # === STATISTIKA ===
+
+    @abstractmethod
+    async def rebuild_leaderboard(self) -> int:
+        """Reytingni qaytadan qurish, qaytariladi: reytingdagi o'yinchilar soni"""
+
+    @abstractmethod
+    async def get_leaderboard(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Eng boy tasdiqlangan va bloklanmagan foydalanuvchilar"""
+
+    @abstractmethod
+    async def get_user_rank(self, telegram_id: int) -> Dict[str, Optional[int]]:
+        """{'rank': N yoki None, 'total': M}"""
+
+    @abstractmethod
+    async def get_global_counters(self) -> Dict[str, Any]:
+        """global_counters qiymatlari"""
+
+    @abstractmethod
+    async def reconcile_global_counters(self) -> Dict[str, int]:
+        """Hisoblagichlarni ma'lumotlardan qayta hisoblash, qaytariladi: farqlar"""
+
+    @abstractmethod
+    async def get_user_statistics(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Profil statistikasi (oxirgi oylar o'yinlari va tranzaksiyalar bilan)"""
+
+    @abstractmethod
+    async def get_daily_stats(self, days: int = 7, telegram_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Oxirgi days kun yig'indisi (user_daily_stats), yangidan eskiga"""
+
+    @abstractmethod
+    async def rebuild_daily_stats(self) -> int:
+        """Kunlik yig'indini o'yin tarixidan qayta qurish"""
+
+    @abstractmethod
+    async def get_database_stats(self) -> Dict[str, Any]:
+        """Admin paneli uchun ombor statistikasi"""
+
+    @abstractmethod
+    async def cleanup_old_data(self, days: Optional[int] = None, progress=None) -> Dict[str, Dict[str, Any]]:
+        """Retention qoidalari bo'yicha eski yozuvlarni o'chirish"""
+
+    # === TRANZAKSIYALAR VA KONFIGURATSIYA ===
+
+    @abstractmethod
+    async def credit_payment(self, telegram_id: int, charge_id: str, attempts: int, total_amount: int,
+                             currency: str = "XTR", payload: Optional[str] = None,
+                             provider_charge_id: Optional[str] = None,
+                             description: Optional[str] = None) -> Dict[str, Any]:
+        """To'lovni charge id bo'yicha bir marta hisobga yozish: {'success', 'duplicate', 'user'}"""
+
+    @abstractmethod
+    async def add_transaction(self, telegram_id: int, transaction_type: str,
+                              stars_amount: int, attempts_amount: int = 0,
+                              description: str = None) -> bool:
+        """Tranzaksiya qo'shish"""
+
+    @abstractmethod
+    async def get_win_probability(self) -> float:
+        """G'alaba ehtimoli"""
+
+    @abstractmethod
+    async def set_win_probability(self, probability: float) -> bool:
+        """G'alaba ehtimolini o'rnatish (0..1)"""
+
+    @abstractmethod
+    async def get_config_value(self, key: str, default: str = "") -> str:
+        """Konfiguratsiya qiymati"""
+
+    @abstractmethod
+    async def set_config_value(self, key: str, value: str) -> bool:
+        """Konfiguratsiya qiymatini o'rnatish"""
+
+    # === KANAL OBUNASI ===
+
+    @abstractmethod
+    async def set_channel_subscription(self, telegram_id: int, subscribed: bool = True) -> bool:
+        """Kanal obunasini belgilash"""
+
+    @abstractmethod
+    async def set_channel_subscriptions(self, changes: Iterable[Tuple[int, bool]],
+                                        batch_size: int = 500) -> int:
+        """Ko'p foydalanuvchining obunasini yozish, qaytariladi: o'zgarganlar soni"""
+
+    @abstractmethod
+    async def is_channel_subscribed(self, telegram_id: int) -> bool:
+        """Kanal obunasi holati"""
+
+    # === UMUMIY AMALLAR (faqat yuqoridagi metodlar orqali) ===
+
+    def _prepare_user_row(self, row) -> Dict[str, Any]:
+        """Foydalanuvchi qatorini handlerlar uchun tayyorlash - daily streak bilan"""
+        user_data = dict(row)
+
+        # Daily streak hisoblash
+        if user_data.get('last_daily_bonus'):
+            last_bonus = datetime.fromisoformat(user_data['last_daily_bonus'])
+            today = datetime.now()
+
+            if (today - last_bonus).days == 1:
+                # Ketma-ket kun
+                user_data['daily_streak'] = user_data.get('daily_streak', 0) + 1
+            elif (today - last_bonus).days > 1:
+                # Ketma-ketlik uzildi
+                user_data['daily_streak'] = 0
+            else:
+                # Bugun bonus olgan
+                user_data['daily_streak'] = user_data.get('daily_streak', 0)
+        else:
+            user_data['daily_streak'] = 0
+
+        # channel_subscribed maydonini to'g'rilash
+        if 'channel_subscribed' not in user_data:
+            user_data['channel_subscribed'] = False
+
+        return user_data
+
+    @staticmethod
+    def _daily_bonus_due(last_daily_bonus) -> bool:
+        """Oxirgi bonus vaqtidan kutish muddati o'tganmi (hali olinmagan bo'lsa - ha)"""
+        if not last_daily_bonus:
+            return True
+        if not isinstance(last_daily_bonus, datetime):
+            last_daily_bonus = datetime.fromisoformat(last_daily_bonus)
+        return (datetime.now() - last_daily_bonus) >= DAILY_BONUS_COOLDOWN
+
+    async def can_claim_daily_bonus(self, telegram_id: int) -> bool:
+        """Kunlik bonusni olish mumkinligini tekshirish"""
+        try:
+            user = await self.get_user(telegram_id)
+            if not user:
+                return True
+            return self._daily_bonus_due(user.get('last_daily_bonus'))
+        except Exception as e:
+            logger.error(f"Kunlik bonus tekshirishda xato {telegram_id}: {e}")
+            return False
+
+    async def get_next_daily_bonus_time(self, telegram_id: int) -> Optional[datetime]:
+        """Keyingi kunlik bonus vaqtini olish"""
+        try:
+            user = await self.get_user(telegram_id)
+            if not user or not user.get('last_daily_bonus'):
+                return None
+
+            last_bonus = datetime.fromisoformat(user['last_daily_bonus'])
+            return last_bonus + DAILY_BONUS_COOLDOWN
+        except Exception as e:
+            logger.error(f"Keyingi bonus vaqti olishda xato {telegram_id}: {e}")
+            return None
+
+    async def get_total_stats(self) -> Dict[str, int]:
+        """
+        Umumiy statistikalar (global_counters dan, O(1)). total_users - tasdiqlangan
+        foydalanuvchilar, registered_users - barchasi; o'yin, yulduz va bloklanganlar
+        hisoblagichlari barcha foydalanuvchilar bo'yicha (tasdiqlanmaganlar ham).
+        """
+        counters = await self.get_global_counters()
+        if not counters:
+            return {}
+        return {
+            'total_users': counters['users_verified'],
+            'registered_users': counters['users_total'],
+            'total_spins': counters['total_spins'],
+            'total_wins': counters['total_wins'],
+            'total_losses': counters['total_losses'],
+            'total_stars': counters['total_stars'],
+            'biggest_win': counters['biggest_win'],
+            'banned_users': counters['users_banned']
+        }
+
+    # === OPERATSION METODLAR (standart - hech narsa qilmaydi) ===
+
+    def get_user_cache_stats(self) -> Dict[str, Any]:
+        return {}
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        return {}
+
+    def resize_pool(self, max_connections: int) -> bool:
+        """Pul ochilishidan oldin ulanishlar chegarasini o'zgartirish (ochilgan bo'lsa False)"""
+        self.max_connections = max_connections
+        return True
+
+    def get_conflict_stats(self) -> Dict[str, Any]:
+        return {}
+
+    def start_pool_monitor(self, interval: float = 10.0, autosizer=None):
+        pass
+
+    async def stop_pool_monitor(self):
+        pass
+
+    async def optimize(self) -> bool:
+        return True
+
+    def start_maintenance(self):
+        pass
+
+    async def stop_maintenance(self):
+        pass
+
+    async def run_maintenance(self, job: str) -> Any:
+        return None
+
+    def get_maintenance_stats(self) -> Dict[str, Any]:
+        return {}
+
+    async def backup(self, dest: str, pages_per_step: int = 256, sleep: float = 0.02,
+                     max_restarts: int = 3) -> Dict[str, Any]:
+        logger.warning(f"{type(self).__name__} backup ni qo'llab-quvvatlamaydi")
+        return {}
+
+    def start_write_behind(self, flush_interval_ms: int = 200, max_batch: int = 500,
+                           max_pending: int = 10000):
+        pass
+
+    async def stop_write_behind(self) -> Dict[str, Any]:
+        return {'enabled': False}
+
+    async def flush_write_behind(self) -> int:
+        return 0
+
+    def get_write_behind_stats(self) -> Dict[str, Any]:
+        return {'enabled': False}
+
+    async def start_config_watcher(self, interval: float = 5.0):
+        pass
+
+    async def stop_config_watcher(self):
+        pass
@@ -0,0 +1,434 @@
+"""
+🎰 Slot Game Bot — Ma'lumotlarni oqim bilan eksport/import qilish
+
+    python -m db.tools export users users.ndjson.gz
+    python -m db.tools export game_history history.csv.gz
+    python -m db.tools import transactions ledger.ndjson.gz --resume
+    python -m db.tools rollup
+    python -m db.tools reshard --from 1 --to 4
+    python -m db.tools vacuum
+
+Shardlangan bazada (DB_SHARD_COUNT > 1, yoki --shards) eksport barcha
+shardlarni bitta faylga yozadi, import esa har yozuvni telegram_id % N
+bo'yicha uy shardiga joylaydi.
+
+Fayllar gzip bilan siqilgan NDJSON yoki CSV (format kengaytmadan yoki
+--format dan olinadi). Xotira sarfi paket hajmiga bog'liq, jadval hajmiga emas.
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# python db/tools.py ko'rinishida ham ishlashi uchun
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import DATABASE_PATH, DB_SHARD_COUNT
+from db.database import Database
+from db.sharding import ShardedDatabase, reshard, shard_paths
+from db.storage import Storage
+
+logger = logging.getLogger(__name__)
+
+TABLES = ('users', 'game_history', 'transactions')
+DEFAULT_BATCH_SIZE = 5000
+
+
+def detect_format(path: str, explicit: Optional[str] = None) -> str:
+    if explicit:
+        return explicit
+    return 'csv' if '.csv' in os.path.basename(path).lower() else 'ndjson'
+
+
+def open_storage(db_path: str, shard_count: int) -> Storage:
+    """Bitta fayl yoki shardlangan baza - init_db shard sonini fayllar bilan solishtiradi"""
+    if shard_count > 1:
+        return ShardedDatabase(db_path, max_connections=2 * shard_count, shard_count=shard_count)
+    return Database(db_path, max_connections=2)
+
+
+# === EKSPORT ===
+
+async def export_sources(db: Database, table: str) -> List[Tuple[str, str, str]]:
+    """Keyset sahifalash manbalari: (jadval, ustunlar, kalit) - kalit bo'yicha o'sib boradi"""
+    if table == 'users':
+        return [('users', '*', 'telegram_id')]
+    if table == 'transactions':
+        return [('transactions', '*', 'rowid')]
+    # O'yin tarixi: eski jadval va oylik bo'laklar, game_history_all ustunlari bilan
+    await db._history.ensure(db)
+    return [(source, columns, 'rowid') for columns, source in db._history.sources()]
+
+
+class ExportCheckpoint:
+    """
+    Eksport holati fayl yonida (<fayl>.checkpoint): har paket alohida gzip
+    a'zosi bo'lib yoziladi va fayl hajmi saqlanadi. Uzilishdan keyin fayl
+    shu hajmgacha qisqartiriladi va oxirgi kalitdan davom etiladi.
+    """
+
+    def __init__(self, path: str):
+        self.path = f"{path}.checkpoint"
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding='utf-8') as checkpoint:
+            return json.load(checkpoint)
+
+    def save(self, state: Dict[str, Any]):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as checkpoint:
+            json.dump(state, checkpoint)
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _encode_batch(fmt: str, columns: List[str], rows: List[tuple], header: bool) -> bytes:
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        if header:
+            writer.writerow(columns)
+        writer.writerows(['' if value is None else value for value in row] for row in rows)
+    else:
+        for row in rows:
+            buffer.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str))
+            buffer.write("\n")
+    return buffer.getvalue().encode('utf-8')
+
+
+async def export_table(db: Storage, table: str, path: str, fmt: str,
+                       batch_size: int = DEFAULT_BATCH_SIZE, resume: bool = False) -> int:
+    """
+    Jadvalni faylga oqim bilan yozish, yozilgan qatorlar sonini qaytaradi.
+    Shardlangan bazada shardlar ketma-ket bitta faylga yoziladi.
+    """
+    shards = db.shards
+    checkpoint = ExportCheckpoint(path)
+    state = checkpoint.load() if resume else None
+    if state and (state['table'] != table or state['format'] != fmt or state.get('shards', 1) != len(shards)):
+        raise ValueError(f"{checkpoint.path} boshqa eksportga tegishli: {state['table']} / {state['format']} / "
+                         f"{state.get('shards', 1)} shard")
+
+    if state:
+        # Oxirgi tugallangan paketdan keyingi (chala) yozuvni olib tashlash
+        with open(path, 'r+b') as output:
+            output.truncate(state['offset'])
+        print(f"↩️ {table}: {state['rows']} qatordan davom etilmoqda")
+    else:
+        state = {'table': table, 'format': fmt, 'shards': len(shards), 'source': 0, 'last_key': None,
+                 'rows': 0, 'offset': 0}
+        open(path, 'wb').close()
+
+    started = time.perf_counter()
+    sources = [(shard, source) for shard in shards for source in await export_sources(shard, table)]
+    for index in range(state['source'], len(sources)):
+        shard, (source, columns, key) = sources[index]
+        if index != state['source']:
+            state.update(source=index, last_key=None)
+
+        while True:
+            where = f"WHERE {key} > ?" if state['last_key'] is not None else ""
+            params = (state['last_key'], batch_size) if state['last_key'] is not None else (batch_size,)
+            async with shard._get_read_connection("export_table") as conn:
+                cursor = await conn.execute(
+                    f"SELECT {key} AS _key, {columns} FROM {source} {where} ORDER BY {key} LIMIT ?", params
+                )
+                names = [column[0] for column in cursor.description][1:]
+                rows = await cursor.fetchall()
+            if not rows:
+                break
+
+            data = _encode_batch(fmt, names, [tuple(row)[1:] for row in rows], header=state['offset'] == 0)
+            with gzip.open(path, 'ab') as output:
+                output.write(data)
+            state.update(last_key=rows[-1][0], rows=state['rows'] + len(rows), offset=os.path.getsize(path))
+            checkpoint.save(state)
+            print(f"⏳ {table}: {state['rows']} qator", end="\r", flush=True)
+            if len(rows) < batch_size:
+                break
+
+    checkpoint.clear()
+    print(f"✅ {table}: {state['rows']} qator -> {path} ({time.perf_counter() - started:.1f}s)")
+    return state['rows']
+
+
+# === IMPORT ===
+
+def read_records(path: str, fmt: str) -> Iterator[Dict[str, Any]]:
+    """Fayldagi yozuvlarni birma-bir o'qish (CSV da bo'sh qiymat - NULL)"""
+    with gzip.open(path, 'rt', encoding='utf-8', newline='') as source:
+        if fmt == 'csv':
+            for record in csv.DictReader(source):
+                yield {name: (value if value != '' else None) for name, value in record.items()}
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+
+async def _table_columns(db: Database, table: str) -> List[str]:
+    async with db._get_read_connection("_table_columns") as conn:
+        cursor = await conn.execute(f"PRAGMA table_info({table})")
+        return [row[1] for row in await cursor.fetchall()]
+
+
+async def _insert_plan(db: Database, table: str, columns: List[str], batch: List[Dict[str, Any]],
+                       replace: bool) -> Dict[str, Tuple[str, List[tuple]]]:
+    """Paketni jadval(lar) bo'yicha INSERT so'rovi va qiymatlarga ajratish"""
+    if table == 'game_history':
+        # Har yozuv o'z oyining bo'lagiga (vaqt belgisi saqlanadi)
+        history = db._history
+        history_columns = [name.strip() for name in history.COLUMNS.split(',')]
+        plan: Dict[str, Tuple[str, List[tuple]]] = {}
+        for record in batch:
+            timestamp = record.get('timestamp')
+            month = f"{timestamp[:4]}{timestamp[5:7]}" if timestamp else None
+            target = await history.ensure(db, month)
+            names = [name for name in history_columns if record.get(name) is not None]
+            sql = f"INSERT INTO {target} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+            plan.setdefault(sql, (sql, []))[1].append(tuple(record[name] for name in names))
+        return plan
+
+    if table == 'users':
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+    else:
+        # Jurnal yozuvlari yangi id bilan qo'shiladi
+        verb = "INSERT"
+        columns = [name for name in columns if name != 'id']
+    sql = f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    return {sql: (sql, [tuple(record.get(name) for name in columns) for record in batch])}
+
+
+async def import_table(db: Storage, table: str, path: str, fmt: str,
+                       batch_size: int = DEFAULT_BATCH_SIZE, resume: bool = False,
+                       replace: bool = False) -> int:
+    """
+    Fayldan jadvalga executemany paketlari bilan yozish. Har paket va
+    import_checkpoints dagi o'qilgan qatorlar soni bitta tranzaksiyada
+    commit qilinadi, shuning uchun --resume aynan to'xtagan joydan davom etadi.
+
+    Shardlangan bazada fayl har shard uchun bir marta o'qiladi va shard faqat
+    o'z foydalanuvchilarini (telegram_id % N) yozadi - har shardning
+    checkpointi o'z faylida.
+    """
+    shards = db.shards
+    imported = 0
+    for index, shard in enumerate(shards):
+        route = (index, len(shards)) if len(shards) > 1 else None
+        imported += await _import_shard(shard, table, path, fmt, batch_size, resume, replace, route)
+    return imported
+
+
+async def _import_shard(db: Database, table: str, path: str, fmt: str, batch_size: int, resume: bool,
+                        replace: bool, route: Optional[Tuple[int, int]]) -> int:
+    """Bitta faylga import; route=(indeks, N) bo'lsa faqat shu shard yozuvlari"""
+    source_key = f"{table}:{os.path.abspath(path)}"
+    done = 0
+    if resume:
+        async with db._get_read_connection("import_table") as conn:
+            cursor = await conn.execute("SELECT rows_done FROM import_checkpoints WHERE source = ?", (source_key,))
+            row = await cursor.fetchone()
+            done = row[0] if row else 0
+        if done:
+            print(f"↩️ {table}: {done} qatordan davom etilmoqda")
+
+    existing = await _table_columns(db, table)
+    started = time.perf_counter()
+    records = read_records(path, fmt)
+    columns: Optional[List[str]] = None
+    imported = 0
+    batch: List[Dict[str, Any]] = []
+    position = 0
+
+    async def write(batch: List[Dict[str, Any]], position: int):
+        plan = await _insert_plan(db, table, columns, batch, replace)
+        async with db._get_connection("import_table") as conn:
+            for sql, values in plan.values():
+                await conn.executemany(sql, values)
+            await conn.execute("""
+                INSERT INTO import_checkpoints (source, table_name, rows_done) VALUES (?, ?, ?)
+                ON CONFLICT(source) DO UPDATE SET rows_done = excluded.rows_done,
+                                                  updated_at = CURRENT_TIMESTAMP
+            """, (source_key, table, position))
+            await conn.commit()
+
+    for record in records:
+        position += 1
+        if position <= done:
+            continue
+        if route and int(record['telegram_id']) % route[1] != route[0]:
+            continue
+        if columns is None:
+            columns = [name for name in record if name in existing]
+            unknown = [name for name in record if name not in existing]
+            if unknown and table != 'game_history':
+                print(f"⚠️ {table}: jadvalda yo'q ustunlar o'tkazib yuborildi: {', '.join(unknown)}")
+        batch.append(record)
+        if len(batch) >= batch_size:
+            await write(batch, position)
+            imported += len(batch)
+            batch = []
+            print(f"⏳ {table}: {position} qator", end="\r", flush=True)
+    if batch:
+        await write(batch, position)
+        imported += len(batch)
+
+    async with db._get_connection("import_table") as conn:
+        await conn.execute("DELETE FROM import_checkpoints WHERE source = ?", (source_key,))
+        await conn.commit()
+    target = f" [{db.db_path}]" if route else ""
+    print(f"✅ {table}{target}: {imported} qator <- {path} ({time.perf_counter() - started:.1f}s)")
+    return imported
+
+
+# === CLI ===
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m db.tools",
+                                     description="users, game_history va transactions eksport/import")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for command, help_text in (('export', "jadvalni faylga yozish"), ('import', "fayldan jadvalga yozish")):
+        sub = commands.add_parser(command, help=help_text)
+        sub.add_argument('table', choices=TABLES)
+        sub.add_argument('path', help="*.ndjson.gz yoki *.csv.gz")
+        sub.add_argument('--format', choices=('ndjson', 'csv'), help="standart: fayl kengaytmasidan")
+        sub.add_argument('--db', default=DATABASE_PATH, help=f"standart: {DATABASE_PATH}")
+        sub.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        sub.add_argument('--resume', action='store_true', help="uzilgan eksport/importni davom ettirish")
+        sub.add_argument('--shards', type=int, default=DB_SHARD_COUNT, help="shard soni (standart: DB_SHARD_COUNT)")
+        if command == 'import':
+            sub.add_argument('--replace', action='store_true', help="users: mavjud foydalanuvchini almashtirish")
+    sub = commands.add_parser('rollup', help="user_daily_stats ni o'yin tarixidan qayta qurish")
+    sub.add_argument('--db', default=DATABASE_PATH, help=f"standart: {DATABASE_PATH}")
+    sub.add_argument('--shards', type=int, default=DB_SHARD_COUNT, help="shard soni (standart: DB_SHARD_COUNT)")
+    sub = commands.add_parser('reshard', help="foydalanuvchilarni boshqa shard soniga ko'chirish (bot to'xtatilgan holda)")
+    sub.add_argument('--from', dest='old_count', type=int, required=True, help="hozirgi shard soni (1 - bitta fayl)")
+    sub.add_argument('--to', dest='new_count', type=int, required=True, help="yangi shard soni (DB_SHARD_COUNT)")
+    sub.add_argument('--db', default=DATABASE_PATH, help=f"asosiy fayl nomi, standart: {DATABASE_PATH}")
+    sub.add_argument('--batch-size', type=int, default=500, help="bitta tranzaksiyada ko'chiriladigan foydalanuvchilar")
+    sub = commands.add_parser('vacuum', help="bir martalik to'liq VACUUM, auto_vacuum=INCREMENTAL (bot to'xtatilgan holda)")
+    sub.add_argument('--db', default=DATABASE_PATH, help=f"asosiy fayl nomi, standart: {DATABASE_PATH}")
+    sub.add_argument('--shards', type=int, default=DB_SHARD_COUNT, help="shard soni (standart: DB_SHARD_COUNT)")
+    return parser
+
+
+async def run(args: argparse.Namespace) -> int:
+    if args.command == 'rollup':
+        return await rebuild_rollup(args.db, args.shards)
+    if args.command == 'reshard':
+        return await run_reshard(args.db, args.old_count, args.new_count, args.batch_size)
+    if args.command == 'vacuum':
+        return await run_vacuum(args.db, args.shards)
+    fmt = detect_format(args.path, args.format)
+    if args.command == 'export':
+        for path in shard_paths(args.db, args.shards):
+            if not os.path.exists(path):
+                print(f"❌ Baza topilmadi: {path}")
+                return 1
+    if args.command == 'import' and os.path.dirname(args.db):
+        os.makedirs(os.path.dirname(args.db), exist_ok=True)
+
+    db = open_storage(args.db, args.shards)
+    try:
+        await db.init_db()
+        if args.command == 'export':
+            await export_table(db, args.table, args.path, fmt, args.batch_size, args.resume)
+        else:
+            await import_table(db, args.table, args.path, fmt, args.batch_size, args.resume, args.replace)
+            # Import jadvallarni chetlab yozadi - umumiy hisoblagichlar va kunlik yig'indini qayta hisoblash
+            await db.reconcile_global_counters()
+            if args.table == 'game_history':
+                await db.rebuild_daily_stats()
+        return 0
+    except Exception as e:
+        logger.error(f"db.tools {args.command} {args.table} xatosi: {e}")
+        print(f"❌ {args.command} {args.table}: {e}")
+        return 1
+    finally:
+        await db.close()
+
+
+async def rebuild_rollup(db_path: str, shard_count: int = 1) -> int:
+    """Kunlik yig'indini (user_daily_stats) butun o'yin tarixidan qayta qurish"""
+    for path in shard_paths(db_path, shard_count):
+        if not os.path.exists(path):
+            print(f"❌ Baza topilmadi: {path}")
+            return 1
+    db = open_storage(db_path, shard_count)
+    try:
+        await db.init_db()
+        started = time.perf_counter()
+        rows = await db.rebuild_daily_stats()
+        if rows < 0:
+            print("❌ rollup: qayta qurib bo'lmadi (logga qarang)")
+            return 1
+        print(f"✅ user_daily_stats: {rows} qator ({time.perf_counter() - started:.1f}s)")
+        return 0
+    finally:
+        await db.close()
+
+
+async def run_reshard(db_path: str, old_count: int, new_count: int, batch_size: int) -> int:
+    """Shard sonini o'zgartirish; keyin DB_SHARD_COUNT=new_count bilan botni ishga tushirish"""
+    if old_count < 1 or new_count < 1:
+        print("❌ reshard: shard soni 1 dan kichik bo'lmasin")
+        return 1
+    try:
+        report = await reshard(
+            db_path, old_count, new_count, batch_size,
+            progress=lambda source, moved: print(f"  {source}: {moved} ta foydalanuvchi ko'chirildi", end="\r")
+        )
+    except Exception as e:
+        logger.error(f"db.tools reshard xatosi: {e}")
+        print(f"❌ reshard {old_count} -> {new_count}: {e}")
+        return 1
+    print(f"✅ {old_count} -> {new_count}: {report['moved_users']} ta foydalanuvchi ko'chirildi "
+          f"({report['seconds']}s)")
+    for path, users in report['users'].items():
+        print(f"   {path}: {users} ta foydalanuvchi")
+    for path in report['retired']:
+        print(f"   {path}: endi ishlatilmaydi (foydalanuvchilar ko'chirildi, faylni arxivlash mumkin)")
+    print(f"   .env: DB_SHARD_COUNT={new_count}")
+    return 0
+
+
+async def run_vacuum(db_path: str, shard_count: int) -> int:
+    """Har bir fayl (shard) uchun to'liq VACUUM - migratsiya 9 dagi auto_vacuum rejimini kuchga kiritadi"""
+    paths = shard_paths(db_path, shard_count) if shard_count > 1 else [db_path]
+    for path in paths:
+        if not os.path.exists(path):
+            print(f"❌ Baza topilmadi: {path}")
+            return 1
+        db = Database(path, max_connections=1)
+        try:
+            await db.init_db()
+            result = await db.vacuum()
+        finally:
+            await db.close()
+        if not result:
+            print(f"❌ vacuum {path}: bajarilmadi (logga qarang)")
+            return 1
+        print(f"✅ {path}: {result['bytes_before']} -> {result['bytes_after']} bayt, "
+              f"auto_vacuum={result['auto_vacuum']} ({result['seconds']}s)")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    return asyncio.run(run(build_parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+🎰 Slot Game Bot — O'yin tarixi uchun write-behind (guruhli commit) buferi
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DeltaBatch:
+    """Bitta flush ga tushadigan foydalanuvchi hisoblagichlari o'zgarishlari"""
+    __slots__ = ('deltas', 'versions', 'retired')
+
+    def __init__(self):
+        self.deltas: Dict[int, Dict[str, int]] = {}
+        # Flush UPDATE dan keyingi users.version - commitdan oldin to'ldiriladi
+        self.versions: Dict[int, int] = {}
+        # Boshqa paketga qo'shib yuborilgan - o'quvchilar uni hisobga olmaydi
+        self.retired = False
+
+
+class GameHistoryBuffer:
+    """
+    game_history yozuvlari va foydalanuvchi hisoblagichlari o'zgarishlarini
+    xotirada yig'ib, bitta tranzaksiyada yozuvchi bufer.
+
+    Fon vazifasi buferni har flush_interval_ms da yoki max_batch qatorga
+    yetganda tozalaydi. Bufer max_pending qatordan oshsa, yozuvchi flush
+    tugashini kutadi (backpressure).
+
+    Urinishlar bu yerda ayirilmaydi: chaqiruvchi ularni bazada shartli UPDATE
+    bilan oldindan ayiradi, bufer faqat natija va hisoblagichlarni yozadi.
+    """
+
+    def __init__(self, database, flush_interval_ms: int = 200,
+                 max_batch: int = 500, max_pending: int = 10000):
+        self.database = database
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self.max_pending = max(max_pending, max_batch)
+
+        self._rows: List[Tuple[int, int, int, bool]] = []
+        self._pending = DeltaBatch()
+        self._flushing: Optional[DeltaBatch] = None
+        self._flush_lock = asyncio.Lock()
+        self._batch_ready = asyncio.Event()
+        self._space_available = asyncio.Event()
+        self._space_available.set()
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+        # Metrikalar
+        self._flush_latencies: deque = deque(maxlen=100)
+        self._batch_sizes: deque = deque(maxlen=100)
+        self.total_flushes = 0
+        self.total_rows_flushed = 0
+        self.failed_flushes = 0
+
+    # === HAYOTIY SIKL ===
+
+    def start(self):
+        """Fon flush vazifasini ishga tushirish"""
+        if self._running:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Write-behind bufer ishga tushdi: {int(self.flush_interval * 1000)}ms / {self.max_batch} qator")
+
+    async def stop(self):
+        """Fon vazifasini to'xtatish va qolgan yozuvlarni yozib yuborish"""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        logger.info("Write-behind bufer to'xtatildi")
+
+    async def _flush_loop(self):
+        """Vaqt yoki hajm bo'yicha buferni tozalash"""
+        while self._running:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self.flush()
+
+    # === YOZISH ===
+
+    async def add(self, telegram_id: int, reels: int, won: bool, stars_won: int = 0):
+        """
+        O'yin natijasini buferga qo'shish. reels - bot.reel_codec kodi.
+        Urinish chaqiruvchi tomonidan allaqachon ayirilgan bo'lishi kerak.
+        """
+        while self._running and self.pending_rows >= self.max_pending:
+            # Bufer to'lgan - flush tugashini kutish
+            self._space_available.clear()
+            self._batch_ready.set()
+            await self._space_available.wait()
+
+        self._rows.append((telegram_id, reels, stars_won, won))
+
+        delta = self._pending.deltas.setdefault(telegram_id, {
+            'wins': 0, 'losses': 0, 'total_spins': 0,
+            'stars': 0, 'biggest_win': 0
+        })
+        delta['total_spins'] += 1
+        if won:
+            delta['wins'] += 1
+            delta['stars'] += stars_won
+            delta['biggest_win'] = max(delta['biggest_win'], stars_won)
+        else:
+            delta['losses'] += 1
+
+        if not self._running:
+            # Fon flush yo'q (start dan oldin yoki stop dan keyin): kutish osilib qolardi,
+            # buferda qolgan yozuv esa hech qachon yozilmasdi - shu yerning o'zida yoziladi
+            await self.flush()
+        elif len(self._rows) >= self.max_batch:
+            self._batch_ready.set()
+
+    async def flush(self) -> int:
+        """Buferdagi barcha yozuvlarni bitta tranzaksiyada yozish"""
+        async with self._flush_lock:
+            if not self._rows:
+                return 0
+
+            rows, self._rows = self._rows, []
+            batch, self._pending = self._pending, DeltaBatch()
+            deltas = batch.deltas
+            # Commit tugaguncha o'qishlar bu o'zgarishlarni ko'rib turishi kerak
+            self._flushing = batch
+            started = time.perf_counter()
+
+            try:
+                history_table = await self.database._history.ensure(self.database)
+                async with self.database._get_connection("flush") as conn:
+                    await conn.executemany(f"""
+                        INSERT INTO {history_table} (telegram_id, reels, win_amount, is_win)
+                        VALUES (?, ?, ?, ?)
+                    """, rows)
+                    await conn.executemany("""
+                        UPDATE users
+                        SET wins = wins + ?, losses = losses + ?, total_spins = total_spins + ?,
+                            stars = stars + ?, biggest_win = MAX(biggest_win, ?),
+                            version = version + 1
+                        WHERE telegram_id = ?
+                    """, [
+                        (d['wins'], d['losses'], d['total_spins'], d['stars'],
+                         d['biggest_win'], telegram_id)
+                        for telegram_id, d in deltas.items()
+                    ])
+                    # Commit ko'rinadigan paytda o'quvchilar qator bu paketni o'z ichiga
+                    # olgan-olmaganini users.version bo'yicha aniqlay olishi kerak
+                    cursor = await conn.execute(f"""
+                        SELECT telegram_id, version FROM users
+                        WHERE telegram_id IN ({','.join('?' * len(deltas))})
+                    """, list(deltas))
+                    batch.versions = {row[0]: row[1] for row in await cursor.fetchall()}
+                    await self.database._bump_counters(
+                        conn,
+                        total_spins=sum(d['total_spins'] for d in deltas.values()),
+                        total_wins=sum(d['wins'] for d in deltas.values()),
+                        total_losses=sum(d['losses'] for d in deltas.values()),
+                        total_stars=sum(d['stars'] for d in deltas.values()),
+                        biggest_win=max(d['biggest_win'] for d in deltas.values()),
+                        history_games=len(rows),
+                        history_wins=sum(1 for row in rows if row[3]),
+                        history_stars_won=sum(row[2] for row in rows if row[3])
+                    )
+                    await self.database._bump_daily_stats(conn, [
+                        (telegram_id, d['total_spins'], d['wins'], d['stars'], d['biggest_win'])
+                        for telegram_id, d in deltas.items()
+                    ])
+                    await conn.commit()
+                # Keshdagi qatorlar endi eskirgan - bazadan qayta o'qilsin
+                self.database._user_cache.invalidate_many(deltas.keys())
+                for telegram_id, delta in deltas.items():
+                    self.database._leaderboard.adjust(telegram_id, delta['stars'])
+                self._flushing = None
+            except Exception as e:
+                # Yozuvlarni yo'qotmaslik uchun buferga qaytarish
+                self._flushing = None
+                self._restore(rows, batch)
+                self.failed_flushes += 1
+                logger.error(f"Write-behind flush xatosi ({len(rows)} qator): {e}")
+                return 0
+            finally:
+                if self.pending_rows < self.max_pending:
+                    self._space_available.set()
+
+            self._flush_latencies.append(time.perf_counter() - started)
+            self._batch_sizes.append(len(rows))
+            self.total_flushes += 1
+            self.total_rows_flushed += len(rows)
+            return len(rows)
+
+    def _restore(self, rows: List[Tuple[int, int, int, bool]], batch: DeltaBatch):
+        """
+        Muvaffaqiyatsiz flushdan keyin yozuvlarni qaytarish. Flush paytida
+        kelgan o'zgarishlar qaytgan paketga qo'shiladi va u yana kutayotgan
+        paketga aylanadi - shu bilan har bir o'zgarish faqat bitta paketda turadi.
+        """
+        self._rows = rows + self._rows
+        batch.versions = {}
+        newer = self._pending
+        for telegram_id, delta in newer.deltas.items():
+            current = batch.deltas.get(telegram_id)
+            if current is None:
+                batch.deltas[telegram_id] = delta
+                continue
+            for field, value in delta.items():
+                if field == 'biggest_win':
+                    current[field] = max(current[field], value)
+                else:
+                    current[field] += value
+        newer.retired = True
+        self._pending = batch
+
+    # === O'QISH ===
+
+    @property
+    def pending_rows(self) -> int:
+        return len(self._rows)
+
+    def snapshot(self) -> Tuple[Optional[DeltaBatch], DeltaBatch]:
+        """
+        Yozilayotgan va kutayotgan paketlar. Bazadan o'qishdan oldin olinadi:
+        o'qish davomida flush tugasa ham paketlar yo'qolmaydi.
+        """
+        return self._flushing, self._pending
+
+    def apply_pending(self, user_data: Dict[str, Any],
+                      snapshot: Optional[Tuple[Optional[DeltaBatch], DeltaBatch]] = None) -> Dict[str, Any]:
+        """
+        Hali yozilmagan o'zgarishlarni foydalanuvchi qatoriga qo'shish.
+
+        Qatorning users.version qiymati paket commit qilgan versiyadan kichik
+        bo'lmasa, qator o'sha paketdan keyin o'qilgan - o'zgarish qayta qo'shilmaydi.
+        """
+        telegram_id = user_data.get('telegram_id')
+        version = user_data.get('version')
+        for batch in snapshot or self.snapshot():
+            if batch is None or batch.retired:
+                continue
+            delta = batch.deltas.get(telegram_id)
+            if not delta:
+                continue
+            flushed_version = batch.versions.get(telegram_id)
+            if flushed_version is not None and version is not None and version >= flushed_version:
+                continue
+
+            for field in ('wins', 'losses', 'total_spins', 'stars'):
+                if field in user_data:
+                    user_data[field] = (user_data[field] or 0) + delta[field]
+            if 'biggest_win' in user_data:
+                user_data['biggest_win'] = max(user_data['biggest_win'] or 0, delta['biggest_win'])
+        return user_data
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Flush kechikishi va paket hajmi metrikalari"""
+        latencies = list(self._flush_latencies)
+        sizes = list(self._batch_sizes)
+        return {
+            'pending_rows': self.pending_rows,
+            'pending_users': len(self._pending.deltas),
+            'total_flushes': self.total_flushes,
+            'total_rows_flushed': self.total_rows_flushed,
+            'failed_flushes': self.failed_flushes,
+            'avg_flush_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0,
+            'max_flush_ms': round(max(latencies) * 1000, 2) if latencies else 0,
+            'avg_batch_size': round(sum(sizes) / len(sizes), 1) if sizes else 0,
+            'max_batch_size': max(sizes) if sizes else 0
+        }
@@ -8,13 +8,13 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from db.database import Database
+from db.database import get_database
 from keyboards.inline import get_admin_menu, get_close_keyboard, get_main_menu
 from config.settings import ADMIN_IDS
 
 logger = logging.getLogger(__name__)
 router = Router()
-db = Database()
+db = get_database()
 
 
 class AdminStates(StatesGroup):
@@ -71,8 +71,8 @@ async def show_admin_users(callback: CallbackQuery):
 👥 **USER STATISTICS** 👥
 
 📊 **Overview:**
-• Total Registered Users: {stats.get('total_users', 0)}
-• Active Players: {stats.get('total_users', 0)}
+• Total Registered Users: {stats.get('registered_users', 0)}
+• Verified Players: {stats.get('total_users', 0)}
 
 🎮 **Activity:**
 • Total Game Sessions: {stats.get('total_spins', 0):,}
@@ -80,10 +80,10 @@ async def show_admin_users(callback: CallbackQuery):
 • Total Losses: {stats.get('total_losses', 0):,}
 
 💰 **Economy:**
-• Stars in Circulation: {stats.get('total_stars', 0):,} ⭐
+• Stars in Circulation (all accounts): {stats.get('total_stars', 0):,} ⭐
 
 📈 **Performance:**
-• Average Spins per User: {(stats.get('total_spins', 0) / max(stats.get('total_users', 1), 1)):.1f}
+• Average Spins per User: {(stats.get('total_spins', 0) / max(stats.get('registered_users', 1), 1)):.1f}
 """
     
     await callback.message.edit_text(
@@ -125,12 +125,12 @@ async def show_admin_stats(callback: CallbackQuery):
 • Losses: {total_losses:,} ({(total_losses/max(total_spins,1)*100):.1f}%)
 
 💰 **Economy Health:**
-• Total Stars Distributed: {stats.get('total_stars', 0):,} ⭐
-• Average Stars per User: {(stats.get('total_stars', 0) / max(stats.get('total_users', 1), 1)):.1f}
+• Total Stars Distributed (all accounts): {stats.get('total_stars', 0):,} ⭐
+• Average Stars per User: {(stats.get('total_stars', 0) / max(stats.get('registered_users', 1), 1)):.1f}
 
 👥 **User Base:**
-• Total Users: {stats.get('total_users', 0)}
-• Engagement Rate: {(total_spins / max(stats.get('total_users', 1), 1)):.1f} spins/user
+• Total Users: {stats.get('registered_users', 0)} ({stats.get('total_users', 0)} verified)
+• Engagement Rate: {(total_spins / max(stats.get('registered_users', 1), 1)):.1f} spins/user
 """
     
     await callback.message.edit_text(
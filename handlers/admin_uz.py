@@ -10,13 +10,14 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.exceptions import TelegramBadRequest
 
-from db.database import Database
+from db.database import get_database
 from keyboards.inline import get_admin_menu, get_back_to_admin_keyboard
 from config.settings import ADMIN_IDS
 from bot.security import security_manager
 from bot.logging_config import monitor_performance, log_exception
 
 router = Router()
+db = get_database()
 
 class AdminStates(StatesGroup):
     """Admin operation states"""
@@ -35,7 +36,6 @@ async def show_admin_menu(callback: CallbackQuery):
             return
         
         # Get system statistics
-        db = Database()
         db_stats = await db.get_database_stats()
         
         # Get security statistics
@@ -173,7 +173,6 @@ async def show_game_settings(callback: CallbackQuery):
             await callback.answer("❌ Bu funksiya faqat adminlar uchun!", show_alert=True)
             return
         
-        db = Database()
         win_prob = await db.get_win_probability()
         
         message = "🎰 **O'YIN SOZLAMALARI** 🎰\n\n"
@@ -243,7 +242,6 @@ async def process_win_probability(message: Message, state: FSMContext):
                 return
             
             # Update win probability
-            db = Database()
             success = await db.set_win_probability(new_prob)
             
             if success:
@@ -272,7 +270,6 @@ async def show_system_stats(callback: CallbackQuery):
             await callback.answer("❌ Bu funksiya faqat adminlar uchun!", show_alert=True)
             return
         
-        db = Database()
         db_stats = await db.get_database_stats()
         
         # Get performance summary
@@ -292,8 +289,61 @@ async def show_system_stats(callback: CallbackQuery):
         message += f"🎮 Jami o'yinlar: {db_stats.get('total_games', 0)}\n"
         message += f"🏆 Jami g'alabalar: {db_stats.get('total_wins', 0)}\n"
         message += f"💰 O'rtacha yutish: {db_stats.get('avg_stars_won', 0):.1f} yulduz\n"
-        message += f"💾 DB hajmi: {db_stats.get('database_size_mb', 0)} MB\n\n"
-        
+        message += f"💾 DB hajmi: {db_stats.get('database_size_mb', 0)} MB"
+        if db_stats.get('shards'):
+            message += f" ({db_stats['shards']} ta shard)"
+        message += "\n\n"
+
+        # Kunlik yig'indidan (user_daily_stats) - xom o'yin tarixi skanerlanmaydi
+        daily_stats = await db.get_daily_stats(7)
+        if daily_stats:
+            message += "📅 **Oxirgi 7 kun:**\n"
+            for day in daily_stats:
+                message += (
+                    f"{day['day']}: 👥 {day['players']}, 🎮 {day['spins']}, 🏆 {day['wins']}, "
+                    f"⭐ {day['stars_won']} (max {day['max_win']})\n"
+                )
+            message += "\n"
+
+        # Xotiradagi omborda kesh va ulanishlar puli yo'q - bo'limlar ko'rsatilmaydi
+        cache_stats = db.get_user_cache_stats()
+        if cache_stats:
+            message += "🗂 **Foydalanuvchi keshi:**\n"
+            message += f"📦 Hajmi: {cache_stats['size']}/{cache_stats['max_size']}\n"
+            message += f"🎯 Hit rate: {cache_stats['hit_rate']}% ({cache_stats['hits']} hit, {cache_stats['misses']} miss)\n"
+            message += f"♻️ Chiqarilgan: {cache_stats['evictions']}\n\n"
+
+        pool_stats = db.get_pool_stats()
+        if pool_stats:
+            message += "🔌 **Ulanishlar puli:**\n"
+            for name, title in (('writer', "Yozuvchi"), ('readers', "O'quvchilar")):
+                stats = pool_stats[name]
+                message += (
+                    f"{title}: {stats['in_use']}/{stats['size']} band (cho'qqi {stats['peak_in_use']}), "
+                    f"kutish p95 {stats['acquire_wait']['p95_ms']}ms, ushlash p95 {stats['hold']['p95_ms']}ms\n"
+                )
+                if stats['timeouts'] or stats['leaks']:
+                    message += f"⚠️ Timeout: {stats['timeouts']}, uzoq ushlangan: {stats['leaks']}\n"
+            message += "\n"
+
+        conflict_stats = db.get_conflict_stats()
+        if conflict_stats and conflict_stats['writes'] + conflict_stats['exhausted']:
+            message += "🔁 **Optimistik yozuvlar:**\n"
+            message += (
+                f"✍️ {conflict_stats['writes']} yozuv, {conflict_stats['conflicts']} to'qnashuv "
+                f"({conflict_stats['conflict_rate']}%), bekor qilingan: {conflict_stats['exhausted']}\n\n"
+            )
+
+        maintenance_stats = db.get_maintenance_stats()
+        if maintenance_stats:
+            message += f"🧹 **Texnik xizmat** (-wal {maintenance_stats['wal_bytes'] / 1024 / 1024:.1f} MB):\n"
+            for name, stats in maintenance_stats['jobs'].items():
+                last = f"{stats['last_ms']}ms" if stats['last_ms'] is not None else "-"
+                message += f"{name}: {stats['runs']} marta, oxirgi {last}, max {stats['max_ms']}ms\n"
+                if stats['errors']:
+                    message += f"⚠️ {name} xatolari: {stats['errors']}\n"
+            message += "\n"
+
         if perf_summary:
             message += "⚡ **Ishlash statistikasi:**\n"
             for operation, stats in perf_summary.items():
@@ -325,13 +375,35 @@ async def cleanup_old_data(callback: CallbackQuery):
         
         await callback.answer("🧹 Tozalash boshlandi...")
         
-        db = Database()
-        success = await db.cleanup_old_data(days=30)
+        loop = asyncio.get_running_loop()
+        last_edit = 0.0
         
-        if success:
+        async def report_progress(table: str, deleted: int, total: int):
+            # Telegram limitiga tushmaslik uchun xabar 2 soniyada bir marta yangilanadi
+            nonlocal last_edit
+            if deleted < total and loop.time() - last_edit < 2:
+                return
+            last_edit = loop.time()
+            try:
+                await callback.message.edit_text(
+                    f"🧹 Tozalanmoqda: {table}\n\n"
+                    f"🗑 {deleted:,} / {total:,} qator ({deleted * 100 // max(total, 1)}%)"
+                )
+            except TelegramBadRequest:
+                pass
+        
+        report = await db.cleanup_old_data(progress=report_progress)
+        
+        if report:
+            message = "✅ Eski ma'lumotlar muvaffaqiyatli tozalandi!\n\n"
+            for table, result in report.items():
+                message += f"• {table}: {result['deleted']:,} qator ({result['seconds']}s)\n"
+                if result['dropped_partitions']:
+                    message += f"  🗂 O'chirilgan oylar: {', '.join(result['dropped_partitions'])}\n"
+                if result['archive']:
+                    message += f"  📦 Arxiv: {result['archive']}\n"
             await callback.message.edit_text(
-                "✅ Eski ma'lumotlar muvaffaqiyatli tozalandi!\n\n"
-                "30 kundan eski ma'lumotlar o'chirildi.",
+                message,
                 reply_markup=get_back_to_admin_keyboard()
             )
         else:
@@ -6,7 +6,7 @@ from aiogram import Router, F, Bot
 from aiogram.types import CallbackQuery
 from datetime import datetime, timedelta
 
-from db.database import Database
+from db.database import get_database
 from keyboards.inline import (
     get_daily_bonus_keyboard, get_referral_keyboard, 
     get_main_menu, get_back_to_admin_keyboard
@@ -15,7 +15,7 @@ from config.settings import DAILY_BONUS_MESSAGE, REFERRAL_MESSAGE, DAILY_BONUS_A
 
 logger = logging.getLogger(__name__)
 router = Router()
-db = Database()
+db = get_database()
 
 
 @router.callback_query(F.data == "daily_bonus")
@@ -5,13 +5,13 @@ import logging
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 
-from db.database import Database
+from db.database import get_database
 from bot.game_logic import slot_game
 from keyboards.inline import get_play_again_keyboard, get_main_menu, get_buy_attempts_keyboard
 
 logger = logging.getLogger(__name__)
 router = Router()
-db = Database()
+db = get_database()
 
 
 @router.callback_query(F.data == "play_slot")
@@ -5,19 +5,37 @@ import logging
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 
-from db.database import Database
+from db.database import get_database
 from bot.game_logic import slot_game
+from bot.single_flight import spin_guard
 from keyboards.inline import get_play_again_keyboard, get_main_menu, get_buy_stars_keyboard
 
 logger = logging.getLogger(__name__)
 router = Router()
-db = Database()
+db = get_database()
+
+
+def play_round(win_probability: float, spin_user: dict):
+    """execute_spin uchun o'yin raundi: admin ehtimoli asos, SlotGame uni foydalanuvchi statistikasi bilan moslaydi"""
+    return slot_game.play_round(spin_user, win_probability)
 
 
 @router.callback_query(F.data == "play_slot")
 async def play_slot_game(callback: CallbackQuery):
     """Slot o'yinini o'ynash"""
     user_id = callback.from_user.id
+    
+    # Bitta foydalanuvchining aylantirishlari ustma-ust tushmaydi: aylantirish
+    # davomidagi qo'shimcha bosishlarga darhol javob beriladi va ular tashlanadi
+    async with spin_guard.hold(user_id) as acquired:
+        if not acquired:
+            await callback.answer("⏳ O'yin davom etmoqda...")
+            return
+        await _play_slot(callback, user_id)
+
+
+async def _play_slot(callback: CallbackQuery, user_id: int):
+    """Bitta aylantirish: tekshiruvlar, execute_spin va natija xabari"""
     user = await db.get_user(user_id)
     
     if not user or not user.get('is_verified'):
@@ -40,36 +58,32 @@ async def play_slot_game(callback: CallbackQuery):
         await callback.answer("⚠️ O'ynash uchun kanal obunasi talab qilinadi!", show_alert=True)
         return
     
-    # Urinishlar mavjudligini tekshirish
-    if user['attempts'] <= 0:
-        await callback.message.edit_text(
-            "😔 **Urinishlar tugadi!**\n\n"
-            "O'ynash uchun Telegram Stars bilan urinishlar sotib oling.\n\n"
-            "💫 1 Yulduz = 1 Urinish 💫",
-            reply_markup=get_buy_stars_keyboard()
-        )
-        await callback.answer()
+    # Urinishni tekshirish, ayirish, o'ynash va qayd qilish - bitta tranzaksiyada
+    spin = await db.execute_spin(user_id, play_round)
+    
+    if not spin['success']:
+        if spin['reason'] == 'no_attempts':
+            await callback.message.edit_text(
+                "😔 **Urinishlar tugadi!**\n\n"
+                "O'ynash uchun Telegram Stars bilan urinishlar sotib oling.\n\n"
+                "💫 1 Yulduz = 1 Urinish 💫",
+                reply_markup=get_buy_stars_keyboard()
+            )
+            await callback.answer()
+        else:
+            await callback.answer("❌ Xato yuz berdi, qaytadan urinib ko'ring!", show_alert=True)
         return
     
-    # Joriy g'alaba ehtimolini olish
-    win_probability = await db.get_win_probability()
-    
-    # O'yinni o'ynash - yangilangan algoritm bilan
-    reels, is_winner, stars_won, extra_info = slot_game.play_round(
-        win_probability, 
-        user.get('total_spins', 0),
-        user.get('daily_streak', 0)
-    )
-    
-    # Natijani qayd qilish
-    symbols_str = "".join(reels)
-    await db.record_game_result(user_id, symbols_str, is_winner, stars_won)
+    reels = spin['reels']
+    is_winner = spin['is_winner']
+    stars_won = spin['stars_won']
+    extra_info = spin['extra_info']
     
     # Natija xabarini formatlash - yangilangan
     result_message = slot_game.format_reels_message(reels, is_winner, stars_won, extra_info)
     
     # Joriy statistikalarni qo'shish
-    updated_user = await db.get_user(user_id)
+    updated_user = spin['user']
     stats_text = f"\n💰 **Sizning statistikangiz:**\n"
     stats_text += f"⭐ Yulduzlar: {updated_user['stars']}\n"
     stats_text += f"🎮 Qolgan urinishlar: {updated_user['attempts']}\n"
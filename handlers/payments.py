@@ -7,13 +7,13 @@ from aiogram.types import CallbackQuery, LabeledPrice, PreCheckoutQuery
 from aiogram.types import Message
 from aiogram.filters import Command
 
-from db.database import Database
+from db.database import get_database
 from keyboards.inline import get_buy_attempts_keyboard, get_main_menu
 from config.settings import STAR_TO_ATTEMPT_RATIO
 
 logger = logging.getLogger(__name__)
 router = Router()
-db = Database()
+db = get_database()
 
 
 @router.callback_query(F.data == "buy_attempts")
@@ -113,20 +113,24 @@ async def process_successful_payment(message: Message):
             logger.error(f"User ID mismatch: {user_id} vs {payload_user_id}")
             return
         
-        # Credit attempts to user
-        success = await db.update_user_balance(user_id, 0, amount)
+        # Credit attempts, ledger row and transaction atomically; a redelivered
+        # update is recognised by its charge id and writes nothing
+        result = await db.credit_payment(
+            user_id,
+            payment.telegram_payment_charge_id,
+            attempts=amount,
+            total_amount=payment.total_amount,
+            currency=payment.currency,
+            payload=payment.invoice_payload,
+            provider_charge_id=payment.provider_payment_charge_id
+        )
         
-        if success:
-            # Record transaction
-            await db.add_transaction(
-                user_id, 
-                "purchase", 
-                amount,  # stars spent
-                amount   # attempts gained
-            )
-            
-            # Get updated user data
-            user = await db.get_user(user_id)
+        if result['success'] and result['duplicate']:
+            logger.info(f"Ignored duplicate payment update for user {user_id}: {payment.telegram_payment_charge_id}")
+            return
+        
+        if result['success']:
+            user = result['user']
             
             success_message = f"""
 ✅ **PAYMENT SUCCESSFUL!** ✅
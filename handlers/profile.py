@@ -6,12 +6,12 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from datetime import datetime
 
-from db.database import Database
+from db.database import get_database
 from keyboards.inline import get_profile_keyboard, get_main_menu
 
 logger = logging.getLogger(__name__)
 router = Router()
-db = Database()
+db = get_database()
 
 
 @router.callback_query(F.data == "profile")
@@ -89,7 +89,7 @@ async def show_statistics(callback: CallbackQuery):
 • Global Win Rate: {global_win_rate:.1f}%
 
 💰 **Economy:**
-• Stars in Circulation: {stats.get('total_stars', 0):,} ⭐
+• Stars in Circulation (all accounts): {stats.get('total_stars', 0):,} ⭐
 
 🎰 Join the fun and climb the leaderboard! 🎰
 """
@@ -6,12 +6,13 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from datetime import datetime
 
-from db.database import Database
+from db.database import get_database
 from keyboards.inline import get_profile_keyboard, get_main_menu
+from config.settings import GAME_HISTORY_STATS_MONTHS
 
 logger = logging.getLogger(__name__)
 router = Router()
-db = Database()
+db = get_database()
 
 
 @router.callback_query(F.data == "profile")
@@ -60,7 +61,15 @@ async def show_profile(callback: CallbackQuery):
         win_rate=win_rate,
         biggest_win=user['biggest_win']
     )
-    
+
+    # So'nggi oylar natijalari - kunlik yig'indidan (user_daily_stats), xom tarix o'qilmaydi
+    recent = await db.get_user_statistics(user_id)
+    if recent and recent['total_games']:
+        profile_text += (
+            f"\n📅 So'nggi {GAME_HISTORY_STATS_MONTHS} oy: {recent['total_games']} o'yin, "
+            f"{recent['wins']} g'alaba, {recent['total_stars_won']} ⭐ yutuq"
+        )
+
     await callback.message.edit_text(
         profile_text,
         reply_markup=get_profile_keyboard()
@@ -111,11 +120,11 @@ async def show_statistics(callback: CallbackQuery):
 • Global g'alaba foizi: {global_win_rate:.1f}%
 
 💰 **Iqtisodiyot:**
-• Aylanayotgan yulduzlar: {stats.get('total_stars', 0):,} ⭐
+• Aylanayotgan yulduzlar (barcha hisoblar): {stats.get('total_stars', 0):,} ⭐
 • Eng katta g'alaba: {stats.get('biggest_win', 0)} ⭐
 
 👮 **Boshqaruv:**
-• Bloklangan foydalanuvchilar: {stats.get('banned_users', 0)}
+• Bloklangan foydalanuvchilar (barcha hisoblar): {stats.get('banned_users', 0)}
 
 🎰 O'yinga qo'shiling va yuqori o'rinlarga chiqing! 🎰
 """
@@ -168,6 +177,11 @@ async def show_leaderboard(callback: CallbackQuery):
                 leaderboard_text += f" | 💎 {biggest_win} max"
             leaderboard_text += f"\n   🎮 {total_spins} o'yin\n\n"
     
+    # Foydalanuvchining o'z o'rni
+    user_rank = await db.get_user_rank(user_id)
+    if user_rank['rank']:
+        leaderboard_text += f"📍 Sizning o'rningiz: **#{user_rank['rank']}** / {user_rank['total']}\n\n"
+    
     leaderboard_text += "💫 Yuqori o'rinlarga chiqing va slot chempioni bo'ling! 💫"
     
     await callback.message.edit_text(
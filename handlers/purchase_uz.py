@@ -6,13 +6,13 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery, LabeledPrice, PreCheckoutQuery, Message
 from aiogram.filters import Command
 
-from db.database import Database
+from db.database import get_database
 from keyboards.inline import get_buy_stars_keyboard, get_main_menu
 from config.settings import PURCHASE_MESSAGE, STAR_TO_ATTEMPT_RATIO
 
 logger = logging.getLogger(__name__)
 router = Router()
-db = Database()
+db = get_database()
 
 
 @router.callback_query(F.data == "buy_stars")
@@ -141,21 +141,25 @@ async def process_successful_payment(message: Message):
             logger.error(f"Foydalanuvchi ID mosligi yo'q: {user_id} vs {payload_user_id}")
             return
         
-        # Foydalanuvchiga urinishlar berish (1 yulduz = 1 urinish)
-        success = await db.update_user_balance(user_id, 0, amount)
+        # Urinishlar, daftar va tranzaksiya bitta atomar amalda (1 yulduz = 1 urinish);
+        # qayta yetkazilgan yangilanish charge id bo'yicha aniqlanadi va hech narsa yozilmaydi
+        result = await db.credit_payment(
+            user_id,
+            payment.telegram_payment_charge_id,
+            attempts=amount,
+            total_amount=payment.total_amount,
+            currency=payment.currency,
+            payload=payment.invoice_payload,
+            provider_charge_id=payment.provider_payment_charge_id,
+            description=f"Telegram Stars orqali {amount} urinish sotib olindi"
+        )
         
-        if success:
-            # Tranzaktsiyani qayd qilish
-            await db.add_transaction(
-                user_id, 
-                "purchase", 
-                amount,  # sarflangan yulduzlar
-                amount,  # olingan urinishlar
-                f"Telegram Stars orqali {amount} urinish sotib olindi"
-            )
-            
-            # Yangilangan foydalanuvchi ma'lumotlarini olish
-            user = await db.get_user(user_id)
+        if result['success'] and result['duplicate']:
+            logger.info(f"Takroriy to'lov yangilanishi e'tiborsiz qoldirildi: {user_id}, {payment.telegram_payment_charge_id}")
+            return
+        
+        if result['success']:
+            user = result['user']
             
             success_message = f"""
 ✅ **TO'LOV MUVAFFAQIYATLI!** ✅
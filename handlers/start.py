@@ -9,13 +9,13 @@ from aiogram.filters import CommandStart, Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from db.database import Database
+from db.database import get_database
 from keyboards.inline import get_verification_keyboard, get_main_menu
 from config.settings import WELCOME_MESSAGE, VERIFICATION_SUCCESS, MAIN_MENU_MESSAGE
 
 logger = logging.getLogger(__name__)
 router = Router()
-db = Database()
+db = get_database()
 
 
 class RegistrationStates(StatesGroup):
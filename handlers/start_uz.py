@@ -9,16 +9,16 @@ from aiogram.filters import CommandStart, Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from db.database import Database
+from db.database import get_database
 from keyboards.inline import get_verification_keyboard, get_main_menu, get_channel_subscription_keyboard
 from config.settings import (
     WELCOME_MESSAGE, VERIFICATION_SUCCESS, MAIN_MENU_MESSAGE, REQUIRED_CHANNEL, CHANNEL_URL,
-    CHANNEL_SUBSCRIPTION_REQUIRED, SUBSCRIPTION_SUCCESS, SUBSCRIPTION_FAILED
+    CHANNEL_SUBSCRIPTION_REQUIRED, SUBSCRIPTION_SUCCESS, SUBSCRIPTION_FAILED, SUBSCRIPTION_WRITE_BATCH
 )
 
 logger = logging.getLogger(__name__)
 router = Router()
-db = Database()
+db = get_database()
 
 
 class RegistrationStates(StatesGroup):
@@ -253,16 +253,21 @@ async def check_all_subscriptions(message: Message):
         await message.answer("❌ Bu buyruq faqat adminlar uchun!")
         return
     
-    # Barcha foydalanuvchilarni olish
-    users = await db.get_all_users()
+    # Foydalanuvchilarni sahifalab o'qish - xotirada faqat dastlabki 10 ta obunasiz
+    total_users = 0
+    subscribed_users = 0
+    unsubscribed_list = []
+    async for user in db.iter_users():
+        total_users += 1
+        if user['channel_subscribed']:
+            subscribed_users += 1
+        elif len(unsubscribed_list) < 10:
+            unsubscribed_list.append(user)
     
-    if not users:
+    if not total_users:
         await message.answer("📊 Hali foydalanuvchilar yo'q!")
         return
     
-    # Obuna statistikasini hisoblash
-    total_users = len(users)
-    subscribed_users = sum(1 for user in users if user.get('channel_subscribed', False))
     unsubscribed_users = total_users - subscribed_users
     
     stats_text = f"""
@@ -277,15 +282,13 @@ async def check_all_subscriptions(message: Message):
 """
     
     # Obuna bo'lmagan foydalanuvchilarni ko'rsatish
-    unsubscribed_list = [user for user in users if not user.get('channel_subscribed', False)]
-    
     if unsubscribed_list:
-        for i, user in enumerate(unsubscribed_list[:10], 1):  # Faqat dastlabki 10 tasini
-            username = user.get('username') or user.get('first_name') or 'Noma\'lum'
+        for i, user in enumerate(unsubscribed_list, 1):  # Faqat dastlabki 10 tasini
+            username = user['username'] or user['first_name'] or 'Noma\'lum'
             stats_text += f"{i}. {username} (ID: {user['telegram_id']})\n"
         
-        if len(unsubscribed_list) > 10:
-            stats_text += f"\n... va yana {len(unsubscribed_list) - 10} ta"
+        if unsubscribed_users > 10:
+            stats_text += f"\n... va yana {unsubscribed_users - 10} ta"
     else:
         stats_text += "Barcha foydalanuvchilar obuna bo'lgan! 🎉"
     
@@ -306,29 +309,28 @@ async def force_check_subscriptions(message: Message):
     await message.answer("🔄 Barcha foydalanuvchilarning kanal obunasi tekshirilmoqda...")
     
     try:
-        # Barcha foydalanuvchilarni olish
-        users = await db.get_all_users()
-        
-        if not users:
-            await message.answer("📊 Hali foydalanuvchilar yo'q!")
-            return
-        
         # Obuna statistikasini hisoblash
-        total_users = len(users)
+        total_users = 0
         updated_count = 0
         errors_count = 0
+        changes = []
         
-        for user in users:
+        # Foydalanuvchilarni sahifalab o'qish (hammasini xotiraga yuklamasdan)
+        async for user in db.iter_users():
+            total_users += 1
             try:
                 user_id_check = user['telegram_id']
-                current_status = user.get('channel_subscribed', False)
+                current_status = bool(user['channel_subscribed'])
                 
                 # Kanal obunasini tekshirish
                 is_subscribed = await check_channel_subscription(message.bot, user_id_check)
                 
                 # Status o'zgargan bo'lsa yangilash
                 if is_subscribed != current_status:
-                    await db.set_channel_subscription(user_id_check, is_subscribed)
+                    changes.append((user_id_check, is_subscribed))
+                    if len(changes) >= SUBSCRIPTION_WRITE_BATCH:
+                        await db.set_channel_subscriptions(changes, SUBSCRIPTION_WRITE_BATCH)
+                        changes = []
                     updated_count += 1
                     
                     # Agar obuna bekor qilingan bo'lsa, foydalanuvchiga xabar yuborish
@@ -347,9 +349,16 @@ async def force_check_subscriptions(message: Message):
                             errors_count += 1
                             
             except Exception as e:
-                logger.error(f"Foydalanuvchi {user.get('telegram_id', 'Noma\'lum')} obunasini tekshirishda xato: {e}")
+                logger.error(f"Foydalanuvchi {user['telegram_id']} obunasini tekshirishda xato: {e}")
                 errors_count += 1
         
+        if changes:
+            await db.set_channel_subscriptions(changes, SUBSCRIPTION_WRITE_BATCH)
+        
+        if not total_users:
+            await message.answer("📊 Hali foydalanuvchilar yo'q!")
+            return
+        
         # Natijani xabar qilish
         result_text = f"""
 ✅ **OBUNA TEKSHIRISH TUGALLANDI!**
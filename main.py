@@ -13,7 +13,7 @@ from aiogram.enums import ParseMode
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from config.settings import BOT_TOKEN
-from db.database import Database
+from db.database import get_database
 from bot.logging_config import setup_logging
 
 # Import handlers
@@ -49,7 +49,7 @@ async def main():
     dp.include_router(contact.router)
     
     # Initialize database
-    db = Database()
+    db = get_database()
     await db.init_db()
     logger.info("Database initialized")
     
@@ -7,8 +7,12 @@ Features: Performance monitoring, error tracking, health checks, and advanced lo
 import asyncio
 import os
 import sys
+import time
 from pathlib import Path
 
+# Startup benchmark: everything below is measured from here
+PROCESS_STARTED = time.perf_counter()
+
 # Add project root to path
 sys.path.append(str(Path(__file__).parent))
 
@@ -20,8 +24,18 @@ from aiogram.client.default import DefaultBotProperties
 # Import enhanced modules
 from bot.logging_config import setup_logging, monitor_performance, log_exception
 from bot.security import setup_middleware, verify_all_channel_subscriptions
-from db.database import Database
-from config.settings import BOT_TOKEN, ADMIN_IDS
+from bot.single_flight import spin_guard
+from db.database import get_database, close_all_databases
+from db.storage import Storage
+from db.pool import PoolAutosizer
+from db.backup import BackupManager
+from config.settings import (
+    BOT_TOKEN, ADMIN_IDS, GAME_HISTORY_WRITE_BEHIND, CONFIG_REFRESH_INTERVAL_SECONDS,
+    WRITE_BEHIND_FLUSH_INTERVAL_MS, WRITE_BEHIND_MAX_BATCH, WRITE_BEHIND_MAX_PENDING,
+    DB_POOL_MONITOR_INTERVAL_SECONDS, DB_POOL_AUTOSIZE, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE,
+    DB_POOL_GROW_WAIT_MS, BACKUP_DIR, BACKUP_INTERVAL_HOURS,
+    BACKUP_KEEP, BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP_MS
+)
 
 # Import handlers
 from handlers import (
@@ -32,8 +46,24 @@ from handlers import (
 # Global variables
 bot: Bot = None
 dp: Dispatcher = None
-db: Database = None
+db: Storage = None
 logger, performance_monitor, error_tracker = None, None, None
+startup_timings = {}
+first_update_seen = False
+backup_task: asyncio.Task = None
+
+def elapsed_ms() -> float:
+    """Milliseconds since process start"""
+    return round((time.perf_counter() - PROCESS_STARTED) * 1000, 1)
+
+async def first_update_benchmark(handler, event, data):
+    """Outer middleware: report time-to-first-update once, then just pass updates through"""
+    global first_update_seen
+    if not first_update_seen:
+        first_update_seen = True
+        startup_timings['first_update_ms'] = elapsed_ms()
+        logger.info("Startup benchmark", startup_timings)
+    return await handler(event, data)
 
 @monitor_performance("bot_initialization")
 async def initialize_bot():
@@ -43,6 +73,7 @@ async def initialize_bot():
     try:
         # Setup enhanced logging
         logger, performance_monitor, error_tracker = setup_logging()
+        startup_timings['imports_ms'] = elapsed_ms()
         
         # Initialize bot with enhanced properties
         bot = Bot(
@@ -56,14 +87,42 @@ async def initialize_bot():
         # Initialize dispatcher with memory storage
         dp = Dispatcher(storage=MemoryStorage())
         
-        # Initialize database with connection pooling
-        db = Database(max_connections=20)
+        # Jarayon bo'yicha yagona database nusxasi (handlerlar ham shuni ishlatadi)
+        db_started = time.perf_counter()
+        db = get_database(max_connections=20)
         await db.init_db()
+        startup_timings['db_init_ms'] = round((time.perf_counter() - db_started) * 1000, 1)
         logger.info("Database initialized with connection pooling")
         
+        # Leak detection for connections held too long, optional reader pool autosizing
+        db.start_pool_monitor(
+            DB_POOL_MONITOR_INTERVAL_SECONDS,
+            PoolAutosizer(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_GROW_WAIT_MS) if DB_POOL_AUTOSIZE else None
+        )
+        
+        # WAL checkpoint on size thresholds, PRAGMA optimize / ANALYZE, incremental vacuum
+        db.start_maintenance()
+        
+        # Config snapshot: spins read it without I/O, other processes' edits are picked up
+        await db.start_config_watcher(CONFIG_REFRESH_INTERVAL_SECONDS)
+        
+        # In-memory leaderboard: top-K and user rank without sorting the users table
+        await db.rebuild_leaderboard()
+        
+        if GAME_HISTORY_WRITE_BEHIND:
+            db.start_write_behind(
+                flush_interval_ms=WRITE_BEHIND_FLUSH_INTERVAL_MS,
+                max_batch=WRITE_BEHIND_MAX_BATCH,
+                max_pending=WRITE_BEHIND_MAX_PENDING
+            )
+            logger.info("Game history write-behind buffer enabled")
+        
         # Setup security middleware
         channel_middleware, admin_middleware = setup_middleware(db)
         
+        # Time-to-first-update is logged once by this outer middleware
+        dp.update.outer_middleware(first_update_benchmark)
+        
         # Apply middleware
         dp.message.middleware(channel_middleware)
         dp.callback_query.middleware(channel_middleware)
@@ -80,6 +139,7 @@ async def initialize_bot():
         # Create necessary directories
         create_directories()
         
+        startup_timings['ready_ms'] = elapsed_ms()
         return True
         
     except Exception as e:
@@ -145,7 +205,13 @@ async def periodic_cleanup():
             await asyncio.sleep(86400)  # 24 hours
             
             # Cleanup old database data
-            await db.cleanup_old_data(days=30)
+            await db.cleanup_old_data()
+            
+            # Return pages freed by retention to the filesystem in small steps
+            await db.run_maintenance('incremental_vacuum')
+            
+            # Recompute global counters from the tables to correct any drift
+            await db.reconcile_global_counters()
             
             # Cleanup security data
             if hasattr(security_manager, 'cleanup_expired_data'):
@@ -156,6 +222,30 @@ async def periodic_cleanup():
                 perf_summary = performance_monitor.get_performance_summary()
                 logger.info("Performance summary", perf_summary)
             
+            # Log user cache metrics
+            logger.info("User cache summary", db.get_user_cache_stats())
+            
+            # Log connection pool metrics (wait/hold histograms, saturation, timeouts, leaks)
+            logger.info("Connection pool summary", db.get_pool_stats())
+            
+            # Log spin single-flight guard (taps dropped while a spin was in progress)
+            logger.info("Spin guard summary", spin_guard.get_stats())
+            
+            # Log optimistic write conflicts (version mismatches, retries, given-up writes)
+            conflict_stats = db.get_conflict_stats()
+            if conflict_stats:
+                logger.info("Optimistic write summary", conflict_stats)
+            
+            # Log maintenance job timings (checkpoint, optimize, analyze, incremental vacuum)
+            maintenance_stats = db.get_maintenance_stats()
+            if maintenance_stats:
+                logger.info("Maintenance summary", maintenance_stats)
+            
+            # Log write-behind buffer metrics
+            write_behind_stats = db.get_write_behind_stats()
+            if write_behind_stats.get('enabled'):
+                logger.info("Write-behind buffer summary", write_behind_stats)
+            
             # Log error summary
             if error_tracker:
                 error_tracker.log_error_summary()
@@ -166,6 +256,26 @@ async def periodic_cleanup():
             log_exception(logger, "Periodic cleanup failed", e)
             await asyncio.sleep(3600)  # Wait 1 hour before retrying
 
+async def periodic_backup():
+    """Online backup in small page steps, gzip snapshots rotated to the newest BACKUP_KEEP"""
+    # One manager per shard file - snapshot names are prefixed with the shard's file name
+    managers = [
+        BackupManager(shard, BACKUP_DIR, keep=BACKUP_KEEP, pages_per_step=BACKUP_PAGES_PER_STEP,
+                      step_sleep_ms=BACKUP_STEP_SLEEP_MS)
+        for shard in db.shards
+    ]
+    while True:
+        try:
+            await asyncio.sleep(BACKUP_INTERVAL_HOURS * 3600)
+            for manager in managers:
+                report = await manager.run()
+                if report:
+                    logger.info("Backup summary", report)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log_exception(logger, "Periodic backup failed", e)
+
 @monitor_performance("health_check")
 async def health_check():
     """Periodic health check"""
@@ -208,6 +318,21 @@ async def graceful_shutdown():
     try:
         logger.info("Starting graceful shutdown...")
         
+        # Flush buffered game history before tasks are cancelled
+        if db:
+            write_behind_stats = await db.stop_write_behind()
+            if write_behind_stats.get('enabled'):
+                logger.info("Write-behind buffer flushed", write_behind_stats)
+        
+        # Stop the backup first and wait for it, so no snapshot step runs against closed connections
+        if backup_task and not backup_task.done():
+            backup_task.cancel()
+            try:
+                await backup_task
+            except asyncio.CancelledError:
+                pass
+            logger.info("Periodic backup stopped")
+        
         # Stop periodic tasks
         for task in asyncio.all_tasks():
             if not task.done():
@@ -215,7 +340,7 @@ async def graceful_shutdown():
         
         # Close database connections
         if db:
-            await db.close()
+            await close_all_databases()
             logger.info("Database connections closed")
         
         # Close bot
@@ -230,6 +355,7 @@ async def graceful_shutdown():
 
 async def main():
     """Main bot function with enhanced error handling"""
+    global backup_task
     try:
         # Initialize bot
         if not await initialize_bot():
@@ -240,11 +366,14 @@ async def main():
         subscription_task = asyncio.create_task(periodic_subscription_check())
         cleanup_task = asyncio.create_task(periodic_cleanup())
         health_task = asyncio.create_task(health_check())
+        if BACKUP_INTERVAL_HOURS > 0 and db.persistent:
+            backup_task = asyncio.create_task(periodic_backup())
         
         logger.info("Periodic tasks started")
         
         # Start bot polling
-        logger.info("Starting bot polling...")
+        startup_timings['polling_ms'] = elapsed_ms()
+        logger.info("Starting bot polling...", startup_timings)
         await dp.start_polling(bot)
         
     except KeyboardInterrupt:
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Config snapshot tests (in-process config copy + config_version watcher)
+"""
+import asyncio
+import sqlite3
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db.database import Database
+
+
+def test_watcher_reloads_only_on_external_config_change(tmp_path):
+    """O'yin yozuvlari nusxani qayta yuklatmaydi, boshqa jarayondagi config o'zgarishi yuklatadi"""
+    path = str(tmp_path / "config.db")
+
+    async def scenario():
+        db = Database(path, max_connections=2)
+        await db.init_db()
+        try:
+            await db.register_user(1, "player", "Player")
+            await db.start_config_watcher(interval=0.02)
+            reloads = db._config.reloads
+
+            for _ in range(10):
+                await db.update_user_balance(1, 1, 1)
+                await asyncio.sleep(0.02)
+            assert db._config.reloads == reloads
+
+            external = sqlite3.connect(path)
+            external.execute("UPDATE config SET value = '0.25' WHERE key = 'win_probability'")
+            external.commit()
+            external.close()
+
+            for _ in range(50):
+                await asyncio.sleep(0.02)
+                if db._config.reloads > reloads:
+                    break
+            assert db._config.reloads == reloads + 1
+            assert await db.get_win_probability() == 0.25
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
@@ -5,17 +5,38 @@ Database functionality test script
 import asyncio
 import sys
 import os
+import tempfile
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-async def test_database():
-    """Test database functionality"""
+async def test_database(backend: str):
+    """Test database functionality (backend: sqlite, sharded or memory)"""
+    # Ishchi data/ bazasiga tegmaslik uchun har bir ishga tushirish vaqtinchalik katalogda
+    data_dir = tempfile.TemporaryDirectory()
+    db_path = os.path.join(data_dir.name, "slot_game.db")
     try:
-        from db.database import Database
+        from db.database import Database, get_database
+        from db.memory import MemoryDatabase
+        from db.sharding import ShardedDatabase
+        
+        print(f"\n=== Storage backend: {backend} ===")
+        print("🔄 Testing shared database registry...")
+        engine, shard_count = ("sqlite", 2) if backend == "sharded" else (backend, 1)
+        if (get_database(db_path, backend=engine, shard_count=shard_count)
+                is get_database(db_path, backend=engine, shard_count=shard_count)):
+            print("✅ Shared database registry: OK")
+        else:
+            print("❌ Shared database registry: FAILED")
+            return False
         
         print("🔄 Testing database initialization...")
-        db = Database()
+        if backend == "sqlite":
+            db = Database(db_path)
+        elif backend == "sharded":
+            db = ShardedDatabase(db_path, shard_count=2)
+        else:
+            db = MemoryDatabase()
         await db.init_db()
         print("✅ Database initialization: OK")
         
@@ -49,6 +70,17 @@ async def test_database():
             print("❌ Game result recording: FAILED")
             return False
         
+        print("🔄 Testing atomic spin transaction...")
+        attempts_before = (await db.get_user(test_user_id))['attempts']
+        spin = await db.execute_spin(
+            test_user_id, lambda probability, user: (["🍀", "⭐", "🔔"], False, 0, {})
+        )
+        if spin['success'] and spin['user']['attempts'] == attempts_before - 1:
+            print("✅ Atomic spin transaction: OK")
+        else:
+            print(f"❌ Atomic spin transaction: FAILED - {spin}")
+            return False
+        
         print("🔄 Testing statistics...")
         stats = await db.get_total_stats()
         if stats:
@@ -112,6 +144,14 @@ async def test_database():
             print("❌ User unbanning: FAILED")
             return False
         
+        print("🔄 Testing global counters...")
+        drift = await db.reconcile_global_counters()
+        if not drift:
+            print("✅ Global counters: OK")
+        else:
+            print(f"❌ Global counters: FAILED - drift {drift}")
+            return False
+        
         print("🔄 Testing all users retrieval...")
         all_users = await db.get_all_users()
         if all_users:
@@ -120,7 +160,8 @@ async def test_database():
             print("❌ All users retrieval: FAILED")
             return False
         
-        print("\n🎉 All database tests passed successfully!")
+        await db.close()
+        print(f"\n🎉 All database tests passed successfully ({backend})!")
         return True
         
     except Exception as e:
@@ -128,7 +169,9 @@ async def test_database():
         import traceback
         traceback.print_exc()
         return False
+    finally:
+        data_dir.cleanup()
 
 if __name__ == "__main__":
-    success = asyncio.run(test_database())
+    success = all([asyncio.run(test_database(backend)) for backend in ("sqlite", "sharded", "memory")])
     sys.exit(0 if success else 1)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Global counter tests (global_counters / get_total_stats)
+"""
+import sys
+import os
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def test_total_stats_scope_and_no_drift(backend, storage):
+    """total_users - tasdiqlanganlar, qolgan hisoblagichlar barcha hisoblar; qayta hisoblashda farq yo'q"""
+    async with storage(backend) as db:
+        for telegram_id in (1, 2, 3):
+            await db.register_user(telegram_id, f"user{telegram_id}", "User")
+        await db.verify_user(1)
+        await db.verify_user(2)
+        await db.update_user_balance(1, 30, 2)
+        await db.update_user_balance(3, 7, 0)
+        await db.ban_user(3)
+        await db.record_game_result(1, "💎💎💎", True, 100)
+        await db.record_game_result(2, "🍀⭐🔔", False, 0)
+
+        stats = await db.get_total_stats()
+        assert stats['total_users'] == 2
+        assert stats['registered_users'] == 3
+        assert stats['banned_users'] == 1
+        assert stats['total_spins'] == 2
+        assert stats['total_wins'] == 1 and stats['total_losses'] == 1
+        users = [await db.get_user(telegram_id) for telegram_id in (1, 2, 3)]
+        assert stats['total_stars'] == sum(user['stars'] for user in users)
+        assert stats['biggest_win'] == 100
+
+        assert await db.reconcile_global_counters() == {}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Leaderboard tests (indexable skip list + rank queries)
+"""
+import random
+import sys
+import os
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db.leaderboard import IndexableSkipList, Leaderboard
+
+
+def test_skip_list_matches_sorted_list():
+    """Tasodifiy qo'shish/o'chirishdan keyin tartib va o'rinlar saralangan ro'yxat bilan bir xil"""
+    rnd = random.Random(42)
+    skip_list = IndexableSkipList()
+    reference = []
+    for _ in range(2000):
+        key = rnd.randrange(500)
+        if key in reference and rnd.random() < 0.5:
+            skip_list.remove(key)
+            reference.remove(key)
+        elif key not in reference:
+            skip_list.insert(key)
+            reference.append(key)
+    reference.sort()
+
+    assert len(skip_list) == len(reference)
+    assert skip_list.first(len(reference)) == reference
+    for position, key in enumerate(reference, start=1):
+        assert skip_list.rank(key) == position
+    assert skip_list.count_below(250) == sum(1 for key in reference if key < 250)
+
+
+def test_leaderboard_orders_by_stars_then_id():
+    """Ko'p yulduz yuqorida, teng bo'lsa kichik ID oldinda; chiqarilganlar reytingda yo'q"""
+    board = Leaderboard()
+    board.load([(10, 50), (11, 70), (12, 50), (13, 5)])
+    assert board.top(3) == [(11, 70), (10, 50), (12, 50)]
+    assert board.rank(12) == 3
+
+    board.adjust(13, 100)
+    assert board.rank(13) == 1
+    board.update(11, 70, eligible=False)
+    assert board.rank(11) is None
+    assert len(board) == 3
+
+
+async def test_rank_follows_balance_updates(backend, storage):
+    """Baza reytingi balans, blok va tasdiqlash o'zgarishlarini kuzatadi"""
+    async with storage(backend) as db:
+        for telegram_id in (1, 2, 3):
+            await db.register_user(telegram_id, f"user{telegram_id}", "User")
+            await db.verify_user(telegram_id)
+        await db.update_user_balance(2, 500, 0)
+        await db.update_user_balance(3, 200, 0)
+
+        top = [player['telegram_id'] for player in await db.get_leaderboard(3)]
+        assert top == [2, 3, 1]
+        assert (await db.get_user_rank(3))['rank'] == 2
+
+        await db.ban_user(2)
+        top = [player['telegram_id'] for player in await db.get_leaderboard(3)]
+        assert top == [3, 1]
+        assert (await db.get_user_rank(1))['rank'] == 2
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Schema migration tests (PRAGMA user_version)
+"""
+import sqlite3
+import sys
+import os
+
+import aiosqlite
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db.database import Database
+from db.migrations import Migration, run_migrations, backfill, _add_columns, LATEST_VERSION
+
+
+def create_legacy_database(path):
+    """Migratsiyalardan oldingi sxema: balance/total_wins, user_id, config(id, win_probability)"""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE users (
+            telegram_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            balance INTEGER DEFAULT 0,
+            total_wins INTEGER DEFAULT 0,
+            total_losses INTEGER DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            is_verified BOOLEAN DEFAULT 0
+        );
+        CREATE TABLE game_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            symbols TEXT,
+            stars_won INTEGER,
+            is_winner BOOLEAN,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            transaction_type TEXT NOT NULL,
+            amount INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE config (id INTEGER PRIMARY KEY, win_probability REAL);
+        INSERT INTO users (telegram_id, username, balance, total_wins, total_losses, is_verified)
+            VALUES (7, 'legacy', 120, 4, 6, 1);
+        INSERT INTO game_history (user_id, symbols, stars_won, is_winner) VALUES (7, '💎💎💎', 100, 1);
+        INSERT INTO transactions (user_id, transaction_type, amount) VALUES (7, 'purchase', 50);
+        INSERT INTO config (id, win_probability) VALUES (1, 0.42);
+    """)
+    conn.commit()
+    conn.close()
+
+
+async def test_legacy_database_migrates_without_vacuum(tmp_path):
+    """Eski baza oxirgi versiyaga ko'chadi, ishga tushishda VACUUM bajarilmaydi"""
+    path = str(tmp_path / "legacy.db")
+    create_legacy_database(path)
+
+    db = Database(path, max_connections=2)
+    await db.init_db()
+    try:
+        user = await db.get_user(7)
+        assert user['stars'] == 120
+        assert user['wins'] == 4 and user['losses'] == 6
+        assert user['version'] == 0
+        assert await db.get_win_probability() == pytest.approx(0.42)
+
+        async with db._get_read_connection("test") as conn:
+            cursor = await conn.execute("PRAGMA user_version")
+            assert (await cursor.fetchone())[0] == LATEST_VERSION
+            cursor = await conn.execute("SELECT telegram_id, win_amount, is_win FROM game_history")
+            assert tuple(await cursor.fetchone()) == (7, 100, 1)
+            # auto_vacuum rejimi faqat to'liq VACUUM dan keyin kuchga kiradi
+            cursor = await conn.execute("PRAGMA auto_vacuum")
+            assert (await cursor.fetchone())[0] == 0
+
+        result = await db.vacuum()
+        assert result['auto_vacuum'] == 2
+    finally:
+        await db.close()
+
+
+async def test_failed_migration_rolls_back_whole_step(tmp_path):
+    """Xato bergan migratsiyaning DDL va versiyasi birga bekor qilinadi"""
+    async def broken(conn):
+        await conn.execute("ALTER TABLE t ADD COLUMN extra INTEGER")
+        raise RuntimeError("boom")
+
+    async def create(conn):
+        await conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+
+    async with aiosqlite.connect(str(tmp_path / "broken.db")) as conn:
+        migrations = [Migration(1, "t", create), Migration(2, "broken", broken)]
+        with pytest.raises(RuntimeError):
+            await run_migrations(conn, migrations)
+
+        cursor = await conn.execute("PRAGMA user_version")
+        assert (await cursor.fetchone())[0] == 1
+        cursor = await conn.execute("PRAGMA table_info(t)")
+        assert [row[1] for row in await cursor.fetchall()] == ['id']
+
+
+async def test_interrupted_backfill_resumes_from_committed_chunks(tmp_path):
+    """backfill bo'laklari alohida commit qilinadi; qayta ishga tushirish faqat qolganini to'ldiradi"""
+    interrupt = True
+
+    async def create(conn):
+        await conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, old INTEGER)")
+        await conn.executemany("INSERT INTO t (id, old) VALUES (?, ?)", [(i, i * 10) for i in range(1, 11)])
+
+    async def rename(conn):
+        await _add_columns(conn, 't', {'new': "INTEGER"})
+        await backfill(conn, 't', "new = old + IFNULL(new, 0)", "new IS NULL", batch_size=3)
+        if interrupt:
+            raise RuntimeError("process killed")
+
+    async with aiosqlite.connect(str(tmp_path / "backfill.db")) as conn:
+        migrations = [Migration(1, "t", create), Migration(2, "rename", rename)]
+        with pytest.raises(RuntimeError):
+            await run_migrations(conn, migrations)
+
+        cursor = await conn.execute("PRAGMA user_version")
+        assert (await cursor.fetchone())[0] == 1
+        cursor = await conn.execute("SELECT COUNT(*) FROM t WHERE new = old")
+        assert (await cursor.fetchone())[0] == 10
+
+        interrupt = False
+        assert await run_migrations(conn, migrations) == [2]
+        cursor = await conn.execute("SELECT COUNT(*) FROM t WHERE new = old")
+        assert (await cursor.fetchone())[0] == 10
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Payment idempotency tests (credit_payment by telegram_payment_charge_id)
+"""
+import asyncio
+import sys
+import os
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def test_redelivered_payment_is_credited_once(backend, storage):
+    """Bir xil charge id ikki marta (ketma-ket va bir vaqtda) kelsa urinishlar bir marta qo'shiladi"""
+    async with storage(backend) as db:
+        await db.register_user(1, "buyer", "Buyer")
+        attempts_before = (await db.get_user(1))['attempts']
+
+        first = await db.credit_payment(1, "charge-1", 10, 50)
+        assert first['success'] and not first['duplicate']
+        assert first['user']['attempts'] == attempts_before + 10
+
+        again = await db.credit_payment(1, "charge-1", 10, 50)
+        assert again == {'success': True, 'duplicate': True}
+
+        results = await asyncio.gather(
+            db.credit_payment(1, "charge-2", 5, 25),
+            db.credit_payment(1, "charge-2", 5, 25)
+        )
+        assert sorted(result['duplicate'] for result in results) == [False, True]
+
+        assert (await db.get_user(1))['attempts'] == attempts_before + 15
+        counters = await db.get_global_counters()
+        assert counters['purchases'] == 2
+        assert counters['purchased_stars'] == 75
+
+
+async def test_payment_for_unknown_user_is_not_recorded(backend, storage):
+    """Foydalanuvchi topilmasa to'lov daftarga yozilmaydi - keyingi yetkazish uni hisobga oladi"""
+    async with storage(backend) as db:
+        assert await db.credit_payment(2, "charge-3", 10, 50) == {'success': False, 'reason': 'no_user'}
+
+        await db.register_user(2, "late", "Late")
+        result = await db.credit_payment(2, "charge-3", 10, 50)
+        assert result['success'] and not result['duplicate']
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Reel codec tests (bot/reel_codec.py + SlotGame)
+"""
+import itertools
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bot.game_logic import SlotGame, slot_game
+from bot.reel_codec import SYMBOLS, CODE_COUNT, encode, decode, to_code, to_emoji
+
+
+def test_codes_round_trip_for_every_combination():
+    """Har bir uchlik kod <-> emoji ikki tomonga bir xil o'giriladi"""
+    for symbol_ids in itertools.product(range(len(SYMBOLS)), repeat=3):
+        code = encode(symbol_ids)
+        assert 0 <= code < CODE_COUNT
+        assert decode(code) == symbol_ids
+        emoji = [SYMBOLS[symbol_id] for symbol_id in symbol_ids]
+        assert to_emoji(code) == emoji
+        assert to_code(emoji) == code
+        assert to_code("".join(emoji)) == code
+
+
+def test_check_win_matches_for_code_and_emoji():
+    """check_win kod va eski emoji ro'yxati uchun bir xil natija beradi"""
+    for symbol_ids in itertools.product(range(len(SYMBOLS)), repeat=3):
+        code = encode(symbol_ids)
+        # 💎💎💎 progressiv jekpotni o'zgartiradi - har tekshiruv yangi o'yin bilan
+        assert SlotGame().check_win(code) == SlotGame().check_win(to_emoji(code))
+
+    is_winner, payout, combo, _ = SlotGame().check_win(["💎", "💎", "💎"])
+    assert is_winner and combo == "💎💎💎" and payout >= 100
+
+
+def test_play_round_returns_code_that_formats():
+    """play_round kod qaytaradi, format_reels_message uni emoji ga aylantiradi"""
+    reels, is_winner, stars_won, extra_info = slot_game.play_round({'total_spins': 3})
+    assert isinstance(reels, int) and 0 <= reels < CODE_COUNT
+    assert extra_info['reels'] == reels
+    message = slot_game.format_reels_message(reels, is_winner, stars_won, extra_info)
+    assert "".join(to_emoji(reels)) in message.replace(" ", "").replace("|", "")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Resharding tests (db.sharding.reshard 1 -> N -> 1)
+"""
+import sys
+import os
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db.database import Database
+from db.sharding import ShardedDatabase, reshard, shard_paths
+
+
+async def populate(db):
+    await db.init_db()
+    for telegram_id in range(100, 130):
+        await db.register_user(telegram_id, f"user{telegram_id}", "User")
+        await db.verify_user(telegram_id)
+        await db.update_user_balance(telegram_id, telegram_id % 17, 2)
+        await db.execute_spin(
+            telegram_id,
+            lambda probability, user, won=telegram_id % 3 == 0: (["💎", "💎", "💎"] if won else ["🍀", "⭐", "🔔"],
+                                                                 won, 10 if won else 0, {})
+        )
+    await db.add_referral(101, 102)
+    await db.credit_payment(103, "charge-1", 10, 10)
+    await db.set_win_probability(0.3)
+
+
+async def snapshot(db):
+    users = sorted(
+        (user['telegram_id'], user['stars'], user['attempts'], user['total_spins'])
+        for user in await db.get_all_users()
+    )
+    counters = await db.get_global_counters()
+    counters.pop('reconciled_at', None)
+    return {
+        'users': users,
+        'leaderboard': [(player['telegram_id'], player['stars']) for player in await db.get_leaderboard(10)],
+        'counters': counters,
+        'win_probability': await db.get_win_probability(),
+        'referrals': await db.get_referral_stats(101)
+    }
+
+
+async def test_reshard_round_trip_preserves_users(tmp_path):
+    """1 -> 3 -> 1 qayta bo'lishdan keyin foydalanuvchilar, reyting va hisoblagichlar o'zgarmaydi"""
+    path = str(tmp_path / "bot.db")
+    db = Database(path, max_connections=2)
+    await populate(db)
+    before = await snapshot(db)
+    await db.close()
+
+    report = await reshard(path, 1, 3, batch_size=7)
+    assert sum(report['users'].values()) == 30
+    assert report['retired'] == [path]
+    sharded = ShardedDatabase(path, 6, 3)
+    await sharded.init_db()
+    try:
+        assert await snapshot(sharded) == before
+        assert await sharded.reconcile_global_counters() == {}
+    finally:
+        await sharded.close()
+
+    report = await reshard(path, 3, 1, batch_size=7)
+    assert report['users'] == {path: 30}
+    assert report['retired'] == shard_paths(path, 3)
+    db = Database(path, max_connections=2)
+    await db.init_db()
+    try:
+        assert await snapshot(db) == before
+    finally:
+        await db.close()
+
+
+async def test_mismatched_shard_count_is_refused(tmp_path):
+    """Fayllar boshqa shard soni bilan yozilgan bo'lsa baza ochilmaydi"""
+    path = str(tmp_path / "bot.db")
+    db = Database(path, max_connections=2)
+    await populate(db)
+    await db.close()
+    await reshard(path, 1, 3)
+
+    sharded = ShardedDatabase(path, 4, 2)
+    try:
+        with pytest.raises(RuntimeError):
+            await sharded.init_db()
+    finally:
+        await sharded.close()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Retention tests (monthly partition drop + archive)
+"""
+import gzip
+import json
+import sys
+import os
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def test_expired_partition_is_archived_and_dropped(storage, tmp_path):
+    """Muddati o'tgan oy bo'lagi to'liq arxivlanadi, DROP qilinadi va hisoblagichlardan ayiriladi"""
+    async with storage("sqlite") as db:
+        db._retention.archive_dir = str(tmp_path / "archive")
+        db._retention.chunk_size = 7
+        db._retention.pause = 0
+
+        table = await db._history.ensure(db, "202001")
+        async with db._get_connection("test") as conn:
+            await conn.executemany(
+                f"INSERT INTO {table} (telegram_id, reels, win_amount, is_win, timestamp) "
+                f"VALUES (?, 0, ?, ?, '2020-01-15 12:00:00')",
+                [(1, 5 if i % 2 else 0, i % 2) for i in range(20)]
+            )
+            await db._bump_counters(conn, history_games=20, history_wins=10, history_stars_won=50)
+            await conn.commit()
+
+        report = await db.cleanup_old_data(days=30)
+        assert report['game_history']['dropped_partitions'] == [table]
+        assert "202001" not in db._history.months
+
+        with gzip.open(tmp_path / "archive" / f"{table}.ndjson.gz", "rt", encoding="utf-8") as archive:
+            rows = [json.loads(line) for line in archive]
+        assert len(rows) == 20
+        assert sum(row['win_amount'] for row in rows) == 50
+
+        counters = await db.get_global_counters()
+        assert counters['history_games'] == 0
+        assert counters['history_wins'] == 0
+        assert counters['history_stars_won'] == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
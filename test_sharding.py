@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Sharded storage tests (ShardedDatabase routing across shard files)
+"""
+import sys
+import os
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config.settings import REFERRAL_BONUS, REFERRAL_FRIEND_BONUS
+from db.database import get_database, close_all_databases
+
+
+async def test_referral_is_credited_on_the_referrer_shard(backend, storage):
+    """Taklif qiluvchi boshqa shardda bo'lsa ham bonus va referal soni uning hisobiga tushadi"""
+    async with storage(backend) as db:
+        await db.register_user(2, "referrer", "Referrer")
+        referrer_before = await db.get_user(2)
+
+        # 2 va 3 ikki shardli omborda turli fayllarda
+        assert await db.register_user(3, "friend", "Friend", referrer_id=2)
+
+        referrer = await db.get_user(2)
+        friend = await db.get_user(3)
+        assert referrer['stars'] == referrer_before['stars'] + REFERRAL_BONUS
+        assert referrer['referral_count'] == 1
+        assert friend['referrer_id'] == 2
+        assert friend['stars'] == referrer_before['stars'] + REFERRAL_FRIEND_BONUS
+        assert await db.get_referral_stats(2) == {'referrals': 1, 'total_bonus': REFERRAL_BONUS}
+        assert await db.reconcile_global_counters() == {}
+
+
+async def test_shared_sharded_instance_is_resized_before_open(tmp_path):
+    """Import paytida yaratilgan shardlangan nusxa keyingi max_connections bo'yicha qayta bo'linadi"""
+    path = str(tmp_path / "shared.db")
+    db = get_database(path, backend="sqlite", shard_count=2)
+    try:
+        assert get_database(path, max_connections=20, backend="sqlite", shard_count=2) is db
+        assert db.max_connections == 20
+        assert [shard.max_connections for shard in db.shards] == [10, 10]
+
+        await db.init_db()
+        get_database(path, max_connections=6, backend="sqlite", shard_count=2)
+        assert db.max_connections == 20
+        assert [shard.max_connections for shard in db.shards] == [10, 10]
+    finally:
+        await close_all_databases()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Single-flight guard tests (bot.single_flight.KeyedSingleFlight)
+"""
+import asyncio
+import sys
+import os
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bot.single_flight import KeyedSingleFlight
+
+
+async def test_busy_key_is_dropped_and_other_keys_run():
+    """Band kalitga kelgan ikkinchi chaqiruv darhol rad etiladi, boshqa kalit kutmaydi"""
+    guard = KeyedSingleFlight("test")
+    release = asyncio.Event()
+    entered = asyncio.Event()
+    results = []
+
+    async def worker(key):
+        async with guard.hold(key) as acquired:
+            results.append((key, acquired))
+            if acquired and key == 1:
+                entered.set()
+                await release.wait()
+
+    first = asyncio.create_task(worker(1))
+    await entered.wait()
+    assert guard.is_busy(1)
+    await worker(1)
+    await worker(2)
+    release.set()
+    await first
+
+    assert results == [(1, True), (1, False), (2, True)]
+    stats = guard.get_stats()
+    assert stats['acquired'] == 2 and stats['dropped'] == 1
+    assert stats['max_in_flight'] == 2
+
+
+async def test_lock_is_released_after_error():
+    """Ish xato bilan tugasa ham kalit bo'shatiladi va xarita tozalanadi"""
+    guard = KeyedSingleFlight("test")
+    with pytest.raises(ValueError):
+        async with guard.hold(1) as acquired:
+            assert acquired
+            raise ValueError("handler failed")
+
+    assert not guard.is_busy(1)
+    assert guard.get_stats()['in_flight'] == 0
+    async with guard.hold(1) as acquired:
+        assert acquired
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Spin transaction tests (execute_spin + SlotGame.play_round)
+"""
+import sys
+import os
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bot.game_logic import slot_game
+from bot.reel_codec import CODE_COUNT
+from handlers.game_uz import play_round
+
+
+async def test_execute_spin_with_real_play_round(backend, storage):
+    """O'yin handleri ishlatadigan play_round bilan aylantirish muvaffaqiyatli bo'lishi kerak"""
+    async with storage(backend) as db:
+        await db.register_user(1, "player", "Player")
+        await db.verify_user(1)
+        await db.update_user_balance(1, 0, 3)
+
+        for expected_attempts in (2, 1, 0):
+            spin = await db.execute_spin(1, play_round)
+            assert spin['success'], spin
+            assert 0 <= spin['reels'] < CODE_COUNT
+            assert spin['user']['attempts'] == expected_attempts
+
+        user = await db.get_user(1)
+        assert user['total_spins'] == 3
+        assert user['wins'] + user['losses'] == 3
+
+        spin = await db.execute_spin(1, play_round)
+        assert spin == {'success': False, 'reason': 'no_attempts'}
+
+
+async def test_admin_win_probability_drives_the_spin(backend, storage, monkeypatch):
+    """Admin o'rnatgan g'alaba ehtimoli execute_spin orqali SlotGame hisobiga asos bo'ladi"""
+    used = []
+    calculate = slot_game.calculate_dynamic_win_probability
+
+    def spy(user_stats, base_probability=None):
+        used.append(calculate(user_stats, base_probability))
+        return used[-1]
+
+    monkeypatch.setattr(slot_game, "calculate_dynamic_win_probability", spy)
+    async with storage(backend) as db:
+        await db.register_user(1, "player", "Player")
+        await db.verify_user(1)
+        await db.update_user_balance(1, 0, 2)
+
+        # Yangi o'yinchi va yaqinda yutuq yo'q: asosga +0.05 va +0.1
+        await db.set_win_probability(0.0)
+        spin = await db.execute_spin(1, play_round)
+        assert spin['win_probability'] == 0.0
+        assert used[-1] == pytest.approx(0.15)
+
+        await db.set_win_probability(1.0)
+        spin = await db.execute_spin(1, play_round)
+        assert spin['win_probability'] == 1.0
+        assert used[-1] == 1.0
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
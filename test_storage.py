@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Storage interface tests (the same contract on every engine)
+"""
+import sys
+import os
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def test_iter_users_filters_and_orders_the_same_everywhere(backend, storage):
+    """iter_users: telegram_id tartibi, sahifalar chegarasida yo'qotishsiz, verified_only har joyda bir xil"""
+    async with storage(backend) as db:
+        for telegram_id in (7, 3, 12, 5, 9, 1):
+            await db.register_user(telegram_id, f"user{telegram_id}", "User")
+        for telegram_id in (3, 9, 12, 1):
+            await db.verify_user(telegram_id)
+
+        verified = [row['telegram_id'] async for row in db.iter_users(batch_size=2)]
+        assert verified == [1, 3, 9, 12]
+
+        everyone = [row['telegram_id'] async for row in db.iter_users(batch_size=4, verified_only=False)]
+        assert everyone == [1, 3, 5, 7, 9, 12]
+
+        rows = [row async for row in db.iter_users(columns=('telegram_id', 'username'))]
+        assert [(row['telegram_id'], row['username']) for row in rows][:2] == [(1, "user1"), (3, "user3")]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+db.tools export/import tests on single-file and sharded storage
+"""
+import sys
+import os
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db.tools import build_parser, export_table, import_table, run
+
+USER_IDS = range(1, 9)
+
+
+async def _user_ids(db):
+    ids = []
+    for shard in db.shards:
+        async with shard._get_read_connection("test_tools") as conn:
+            cursor = await conn.execute("SELECT telegram_id FROM users")
+            ids.extend(row[0] for row in await cursor.fetchall())
+    return sorted(ids)
+
+
+@pytest.mark.parametrize("source,target", [("sharded", "sqlite"), ("sqlite", "sharded"), ("sharded", "sharded")])
+async def test_export_import_covers_every_shard(storage, tmp_path, source, target):
+    """Eksport barcha shardlarni oladi, import har foydalanuvchini uy shardiga yozadi"""
+    path = str(tmp_path / "users.ndjson.gz")
+    async with storage(source, "source.db") as db:
+        for telegram_id in USER_IDS:
+            await db.register_user(telegram_id, f"user{telegram_id}", "User")
+        assert await export_table(db, 'users', path, 'ndjson', batch_size=3) == len(USER_IDS)
+
+    async with storage(target, "target.db") as db:
+        assert await import_table(db, 'users', path, 'ndjson', batch_size=3) == len(USER_IDS)
+        assert await _user_ids(db) == list(USER_IDS)
+        for index, shard in enumerate(db.shards):
+            async with shard._get_read_connection("test_tools") as conn:
+                cursor = await conn.execute("SELECT telegram_id FROM users")
+                assert all(row[0] % len(db.shards) == index for row in await cursor.fetchall())
+        assert (await db.get_user(5))['username'] == "user5"
+
+
+async def test_cli_export_refuses_missing_shard_files(storage, tmp_path, capsys):
+    """--shards shard fayllari bilan mos kelmasa eksport bitta shard bilan jim yakunlanmaydi"""
+    db_path = str(tmp_path / "bot.db")
+    async with storage("sharded", "bot.db") as db:
+        for telegram_id in USER_IDS:
+            await db.register_user(telegram_id, f"user{telegram_id}", "User")
+
+    output = str(tmp_path / "users.csv.gz")
+    assert await run(build_parser().parse_args(['export', 'users', output, '--db', db_path, '--shards', '1'])) == 1
+    assert "Baza topilmadi" in capsys.readouterr().out
+    assert await run(build_parser().parse_args(['export', 'users', output, '--db', db_path, '--shards', '2'])) == 0
+    assert "8 qator" in capsys.readouterr().out
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+User row cache tests (LRU + TTL + read tokens)
+"""
+import sys
+import os
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db.cache import UserCache
+
+
+def test_lru_eviction_and_ttl_expiry():
+    """Hajm oshsa eng eski yozuv chiqariladi, TTL o'tgach yozuv qaytarilmaydi"""
+    cache = UserCache(max_size=2, ttl=30.0)
+    cache.put(1, {'telegram_id': 1})
+    cache.put(2, {'telegram_id': 2})
+    assert cache.get(1) == {'telegram_id': 1}
+    cache.put(3, {'telegram_id': 3})
+
+    assert cache.get(2) is None
+    assert cache.get(1) is not None and cache.get(3) is not None
+    assert cache.get_stats()['evictions'] == 1
+
+    expired = UserCache(max_size=10, ttl=0)
+    expired.put(1, {'telegram_id': 1})
+    assert expired.get(1) is None
+    assert expired.get_stats()['expirations'] == 1
+
+
+def test_invalidate_during_read_drops_stale_row():
+    """O'qish davomida invalidatsiya bo'lsa, eski qator keshga yozilmaydi"""
+    cache = UserCache()
+    token = cache.begin_read(1)
+    cache.invalidate(1)
+    cache.put(1, {'telegram_id': 1, 'stars': 0}, token)
+    assert cache.get(1) is None
+
+    token = cache.begin_read(1)
+    cache.put(1, {'telegram_id': 1, 'stars': 5}, token)
+    assert cache.get(1)['stars'] == 5
+
+
+async def test_database_reads_see_writes_through_cache(storage):
+    """Keshlangan foydalanuvchi yozuvdan keyin yangi qiymat bilan o'qiladi"""
+    async with storage("sqlite") as db:
+        await db.register_user(1, "player", "Player")
+        stars = (await db.get_user(1))['stars']
+        hits = db.get_user_cache_stats()['hits']
+        assert (await db.get_user(1))['stars'] == stars
+        assert db.get_user_cache_stats()['hits'] == hits + 1
+
+        await db.update_user_balance(1, 25, 4)
+        user = await db.get_user(1)
+        assert user['stars'] == stars + 25
+        assert user['attempts'] == 4
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
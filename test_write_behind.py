@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Write-behind buffer tests (attempt check + pending deltas overlay + flush without the loop)
+"""
+import asyncio
+import sys
+import os
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db.write_behind import GameHistoryBuffer
+
+
+async def prepare_buffered(db, attempts):
+    # Fon flush ishlamasin - testlar buferni o'zi tozalaydi
+    db.start_write_behind(flush_interval_ms=60000, max_batch=1000)
+    await db.register_user(1, "player", "Player")
+    await db.verify_user(1)
+    await db.update_user_balance(1, 0, attempts)
+
+
+async def read_raw_user(db, telegram_id):
+    async with db._get_read_connection("test") as conn:
+        cursor = await conn.execute("SELECT * FROM users WHERE telegram_id = ?", (telegram_id,))
+        return dict(await cursor.fetchone())
+
+
+async def test_buffered_record_game_result_checks_attempts(storage):
+    """Buferli rejimda urinish darhol ayiriladi, urinish qolmasa natija navbatga qo'yilmaydi"""
+    async with storage("sqlite") as db:
+        await prepare_buffered(db, attempts=1)
+        assert await db.record_game_result(1, "💎💎💎", True, 100)
+        assert (await read_raw_user(db, 1))['attempts'] == 0
+
+        assert not await db.record_game_result(1, "🍀⭐🔔", False, 0)
+        assert db.get_write_behind_stats()['pending_rows'] == 1
+
+        await db.flush_write_behind()
+        user = await db.get_user(1)
+        assert user['attempts'] == 0
+        assert user['total_spins'] == 1 and user['stars'] == 100
+
+
+async def test_pending_deltas_are_applied_once_across_flush(storage):
+    """O'qish paytida flush tugasa ham har bir o'zgarish qatorga bir marta qo'shiladi"""
+    async with storage("sqlite") as db:
+        await prepare_buffered(db, attempts=5)
+        for _ in range(3):
+            assert await db.record_game_result(1, "💎💎💎", True, 10)
+
+        # Qator flushdan oldin o'qilgan, overlay esa flushdan keyin qo'llanadi
+        pending = db._write_buffer.snapshot()
+        stale_row = await read_raw_user(db, 1)
+        await db.flush_write_behind()
+        user = db._prepare_user_row(stale_row, pending)
+        assert user['total_spins'] == 3 and user['stars'] == 30
+
+        # Qator flush commitidan keyin o'qilgan, paketlar esa undan oldin olingan
+        assert await db.record_game_result(1, "🍀⭐🔔", False, 0)
+        pending = db._write_buffer.snapshot()
+        await db.flush_write_behind()
+        fresh_row = await read_raw_user(db, 1)
+        user = db._prepare_user_row(fresh_row, pending)
+        assert user['total_spins'] == 4 and user['losses'] == 1
+        assert user['attempts'] == 1
+
+
+async def test_failed_flush_keeps_each_delta_once(storage):
+    """Flush xatosidan keyin yozuvlar qaytariladi va keyingi flushda bir marta yoziladi"""
+    async with storage("sqlite") as db:
+        await prepare_buffered(db, attempts=5)
+        bump_daily_stats = db._bump_daily_stats
+        assert await db.record_game_result(1, "💎💎💎", True, 10)
+        pending = db._write_buffer.snapshot()
+
+        async def broken(conn, rows):
+            # Flush paytida yangi natija keladi, keyin tranzaksiya yiqiladi
+            await db._write_buffer.add(1, 0, True, 5)
+            raise RuntimeError("disk full")
+
+        db._bump_daily_stats = broken
+        try:
+            assert await db.flush_write_behind() == 0
+        finally:
+            db._bump_daily_stats = bump_daily_stats
+
+        user = db._prepare_user_row(await read_raw_user(db, 1), pending)
+        assert user['total_spins'] == 2 and user['stars'] == 15
+        assert (await db.get_user(1))['stars'] == 15
+
+        assert await db.flush_write_behind() == 2
+        raw = await read_raw_user(db, 1)
+        assert raw['total_spins'] == 2 and raw['stars'] == 15
+        assert (await db.get_user(1))['stars'] == 15
+
+
+async def test_add_without_flush_loop_writes_inline(storage):
+    """Fon vazifasi ishlamayotgan buferga qo'shish osilib qolmaydi va yozuvni yo'qotmaydi"""
+    async with storage("sqlite") as db:
+        await prepare_buffered(db, attempts=0)
+        await db.stop_write_behind()
+
+        # start dan oldin: max_pending=1 to'la bo'lsa ham kutilmaydi
+        buffer = GameHistoryBuffer(db, max_batch=1, max_pending=1)
+        for _ in range(3):
+            await asyncio.wait_for(buffer.add(1, 0, False), timeout=5)
+        assert buffer.pending_rows == 0
+
+        # stop dan keyin kelgan natija (parallel aylantirish) ham yoziladi
+        buffer.start()
+        await buffer.stop()
+        await asyncio.wait_for(buffer.add(1, 0, True, 7), timeout=5)
+        assert buffer.pending_rows == 0
+
+        raw = await read_raw_user(db, 1)
+        assert raw['total_spins'] == 4 and raw['biggest_win'] == 7
+        assert raw['wins'] == 1 and raw['losses'] == 3
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))